@@ -1,16 +1,29 @@
 """Core agent loop — gather -> act -> verify -> iterate."""
 
 import logging
+import time
+from collections.abc import Callable
 from dataclasses import dataclass, field
 
-from agentkit.claude import ClaudeError, ToolMode, invoke_claude
+from agentkit.claude import MODEL, SESSION_NOT_FOUND, ClaudeError, ToolMode, invoke_claude
 from agentkit.config import Config
 from agentkit.context import ContextBuilder
-from agentkit.mailbox import Mailbox
-from agentkit.memory import Memory
+from agentkit.hooks import traced
+from agentkit.mailbox import Mailbox, lane_for
+from agentkit.memory import FsyncPolicy, Memory
+from agentkit.memory_index import MemoryIndex
+from agentkit.metrics import CLAUDE_INVOCATIONS, TASK_DURATION
+from agentkit.response_cache import ResponseCache, cache_key
+from agentkit.retry import CircuitBreaker, RetryPolicy
+from agentkit.sessions import SessionStore
+from agentkit.telemetry import TaskMetrics
+from agentkit.timeouts import TimeoutPolicy
+from agentkit.warm_pool import WarmPool
 
 log = logging.getLogger(__name__)
 
+PROGRESS_FILES_KEPT = 20  # per-task progress files kept for spy.sh and debugging
+
 
 @dataclass
 class TaskResult:
@@ -19,37 +32,284 @@ class TaskResult:
 
 
 class Agent:
-    def __init__(self, config: Config):
+    def __init__(self, config: Config, *, pool: WarmPool | None = None):
         self.config = config
-        self.memory = Memory(config.memory_dir)
+        self.memory = Memory(
+            config.memory_dir,
+            fsync=FsyncPolicy(config.memory_fsync),
+            index=MemoryIndex(config.memory_index_path, config.memory_dir),
+        )
         self.mailbox = Mailbox(config.db_path)
         self.context = ContextBuilder(config, self.memory)
+        # Owned and closed by the caller. Only the long-running daemon sets one:
+        # a one-shot CLI run would exit while the pool's spare process starts up.
+        self.pool = pool
+        self.cache = (
+            ResponseCache(
+                config.response_cache_path,
+                ttl=config.response_cache_ttl,
+                max_entries=config.response_cache_size,
+            )
+            if config.response_cache_ttl
+            else None
+        )
+        self.timeouts = TimeoutPolicy(
+            default=config.claude_timeout,
+            inactivity=config.claude_inactivity_timeout,
+            per_source=config.source_timeouts,
+        )
+        self.retry = RetryPolicy(retries=config.claude_retries)
+        self.breaker = CircuitBreaker(
+            config.breaker_threshold, config.breaker_cooldown_seconds
+        )
+        self.sessions = (
+            SessionStore(config.session_limit, config.session_idle_seconds)
+            if config.session_limit
+            else None
+        )
+
+    @traced("agent.process_next")
+    def process_next(
+        self, *, tool_mode: ToolMode = ToolMode.READONLY, task_id: int | None = None
+    ) -> TaskResult | None:
+        """Process the next task, or the pending task `task_id` when given.
 
-    def process_next(self, *, tool_mode: ToolMode = ToolMode.READONLY) -> TaskResult | None:
-        """Process the next task. Returns TaskResult or None."""
-        task = self.mailbox.dequeue()
+        Returns TaskResult, or None when there is nothing to do, the task
+        failed, or the circuit breaker is open. Callers that just enqueued a
+        task pass its id: the weighted lanes may otherwise hand them another.
+        """
+        if not self.breaker.allow():
+            log.warning("Circuit breaker open; not dequeuing")
+            return None
+        started = time.monotonic()
+        task = self.mailbox.dequeue() if task_id is None else self.mailbox.claim(task_id)
         if task is None:
+            self.breaker.release()
             return None
+        metrics = self.new_metrics(task)
+        metrics.dequeue_ms = 1000 * (time.monotonic() - started)
+        return self.process_task(task, tool_mode=tool_mode, metrics=metrics)
+
+    def new_metrics(self, task: dict) -> TaskMetrics:
+        return TaskMetrics(task["id"], task["source"], self.config.profile)
+
+    @traced("agent.process_task")
+    def process_task(
+        self,
+        task: dict,
+        *,
+        tool_mode: ToolMode = ToolMode.READONLY,
+        on_event: Callable[[dict], None] | None = None,
+        session_key: str | None = None,
+        metrics: TaskMetrics | None = None,
+    ) -> TaskResult | None:
+        """Process an already-claimed task. Returns TaskResult or None on failure.
 
+        on_event receives Claude's stream-json events as they arrive.
+        Tasks sharing a session_key (e.g. a Telegram chat id) continue one
+        Claude session while it stays in self.sessions.
+        Phase timings and token usage are stored in the mailbox's task_metrics.
+        """
         log.info("Processing task %d: %s", task["id"], task["content"][:80])
+        metrics = metrics or self.new_metrics(task)
+        started = time.monotonic()
 
+        timeout = self.timeouts.timeout_for(
+            task["source"], self.mailbox.recent_durations(task["source"])
+        )
         try:
-            system_prompt = self.context.build_system_prompt()
-            task_prompt = self.context.build_task_prompt(task["content"])
-            response = invoke_claude(
-                task_prompt, system_prompt=system_prompt, tool_mode=tool_mode,
-                progress_path=self.config.progress_path,
-            )
-            pending_messages = self._extract_directives(response)
-            clean = self._clean_response(response)
-            self.mailbox.complete(task["id"], result=response[:500])
-            self.memory.append_today(f"Task: {task['content'][:100]}\nResult: {response[:200]}")
+            with metrics.phase("claude"):
+                response = self._invoke(
+                    task["content"], tool_mode, on_event, session_key, timeout, metrics
+                )
+            with metrics.phase("memory"):
+                pending_messages = self._extract_directives(response)
+                clean = self._clean_response(response)
+                self.mailbox.complete(task["id"], result=response[:500])
+                self.memory.append_today(
+                    f"Task: {task['content'][:100]}\nResult: {response[:200]}"
+                )
+            metrics.status = "done"
+            if metrics.cache_hit:
+                self.breaker.release()  # says nothing about whether Claude recovered
+            else:
+                self.breaker.record_success()
             log.info("Task %d completed", task["id"])
             return TaskResult(response=clean, pending_messages=pending_messages)
         except ClaudeError as e:
+            # One failure per task, however many attempts it took, so a single
+            # bad task cannot open the breaker for everyone.
+            self.breaker.record_failure()
             self.mailbox.fail(task["id"], error=str(e))
             log.error("Task %d failed: %s", task["id"], e)
             return None
+        finally:
+            self._prune_progress()
+            metrics.total_ms = metrics.dequeue_ms + 1000 * (time.monotonic() - started)
+            self.mailbox.record_metrics(metrics.as_row())
+            TASK_DURATION.observe(
+                metrics.total_ms / 1000, source=task["source"], status=metrics.status
+            )
+
+    def _prune_progress(self) -> None:
+        """Keep only the newest PROGRESS_FILES_KEPT progress files."""
+        files = []
+        for path in self.config.progress_dir.glob("progress-*.jsonl"):
+            try:
+                files.append((path.stat().st_mtime, path))
+            except FileNotFoundError:  # pruned by a concurrent task
+                continue
+        files.sort(reverse=True)
+        for _, path in files[PROGRESS_FILES_KEPT:]:
+            path.unlink(missing_ok=True)
+
+    def _invoke(
+        self,
+        content: str,
+        tool_mode: ToolMode,
+        on_event: Callable[[dict], None] | None,
+        session_key: str | None,
+        timeout: float,
+        metrics: TaskMetrics,
+    ) -> str:
+        """Run one task through Claude, resuming the session for session_key if any."""
+        if self.sessions is None or session_key is None:
+            return self._call(content, tool_mode, on_event, timeout, metrics)
+        session_id = self.sessions.get(session_key)
+        if session_id:
+            try:
+                return self._call(
+                    content, tool_mode, on_event, timeout, metrics, session_key,
+                    resume=session_id,
+                )
+            except ClaudeError as e:
+                # Only a session the CLI no longer knows is worth a fresh start;
+                # anything else (timeouts, crashes) would just run the task twice.
+                if SESSION_NOT_FOUND not in str(e).lower():
+                    raise
+                log.warning("Session %s not found; starting a new one", session_id)
+                self.sessions.drop(session_key)
+        return self._call(content, tool_mode, on_event, timeout, metrics, session_key)
+
+    def _call(
+        self,
+        content: str,
+        tool_mode: ToolMode,
+        on_event: Callable[[dict], None] | None,
+        timeout: float,
+        metrics: TaskMetrics,
+        session_key: str | None = None,
+        resume: str | None = None,
+    ) -> str:
+        captured: list[str] = []
+
+        def capture(event: dict) -> None:
+            if not captured and event.get("session_id"):
+                captured.append(event["session_id"])
+            if event.get("type") == "result":
+                metrics.record_result(event)
+            if on_event:
+                on_event(event)
+
+        with metrics.phase("prompt"):
+            if resume:
+                # The resumed session already holds identity, tools and memory context.
+                system_prompt = self.context.build_stable_system_prompt()
+                task_prompt = self.context.build_task_prompt(content)
+            else:
+                system_prompt, task_prompt = self._build_prompts(
+                    content, stable=session_key is not None
+                )
+
+            key = None
+            if self.cache is not None and tool_mode == ToolMode.READONLY and not resume:
+                # Read-only tasks have no side effects, so an identical question
+                # against unchanged identity and memory can reuse the last answer.
+                # Scheduled tasks review recent activity, so it is part of their key.
+                basis = self.context.build_cache_basis(
+                    content, include_recent=lane_for(metrics.source) == "cron"
+                )
+                key = cache_key(
+                    MODEL, tool_mode.value, basis, self.context.build_task_prompt(content)
+                )
+                cached = self.cache.get(key)
+                if cached is not None:
+                    log.info("Response cache hit")
+                    metrics.cache_hit = True
+                    return cached
+
+        response = self._invoke_with_retry(
+            task_prompt, system_prompt=system_prompt, tool_mode=tool_mode,
+            progress_path=self.config.progress_path(metrics.task_id), on_event=capture,
+            timeout=timeout, inactivity_timeout=self.timeouts.inactivity or None,
+            metrics=metrics,
+            # A --resume command line never matches a warm process.
+            pool=None if resume else self.pool, resume=resume,
+        )
+        if session_key is not None and captured:
+            self.sessions.put(session_key, captured[0])
+        if key is not None:
+            # Directives were acted on when this response arrived; a cache hit
+            # must not save the same memories or send the same messages again.
+            self.cache.put(key, self._clean_response(response))
+        return response
+
+    def _invoke_with_retry(
+        self,
+        prompt: str,
+        *,
+        tool_mode: ToolMode,
+        on_event: Callable[[dict], None] | None = None,
+        **kwargs,
+    ) -> str:
+        """invoke_claude, retrying retryable failures with jittered backoff.
+
+        A read-write run may already have changed files or sent messages when
+        it fails, so it is only retried if it failed before emitting any
+        stream event (spawn and auth failures); read-only runs always are.
+        """
+        attempt = 0
+        while True:
+            started: list[bool] = []
+
+            def watch(event: dict) -> None:
+                if not started:
+                    started.append(True)
+                if on_event:
+                    on_event(event)
+
+            try:
+                response = invoke_claude(prompt, tool_mode=tool_mode, on_event=watch, **kwargs)
+            except ClaudeError as e:
+                CLAUDE_INVOCATIONS.inc(outcome="retryable_error" if e.retryable else "fatal_error")
+                repeatable = tool_mode == ToolMode.READONLY or not started
+                if (
+                    not e.retryable
+                    or not repeatable
+                    or attempt >= self.retry.retries
+                    or self.breaker.is_open()
+                ):
+                    raise
+                delay = self.retry.delay(attempt)
+                attempt += 1
+                log.warning("Claude attempt %d failed (%s); retrying in %.1fs", attempt, e, delay)
+                time.sleep(delay)
+                continue
+            CLAUDE_INVOCATIONS.inc(outcome="ok")
+            return response
+
+    def _build_prompts(self, content: str, *, stable: bool = False) -> tuple[str, str]:
+        """Return (system prompt, task prompt) for a task."""
+        task_prompt = self.context.build_task_prompt(content)
+        if self.pool is None and not stable:
+            return self.context.build_system_prompt(content), task_prompt
+        # Warm processes are spawned with a fixed command line, and resumed
+        # sessions keep their first system prompt, so memory (which changes
+        # every task) travels with the task instead of the system prompt.
+        memory_context = self.context.build_memory_context(content)
+        if memory_context:
+            task_prompt = f"{memory_context}\n\n---\n\n{task_prompt}"
+        return self.context.build_stable_system_prompt(), task_prompt
 
     def _extract_directives(self, response: str) -> list[str]:
         """Extract directives from Claude's response. Returns pending messages."""
@@ -72,8 +332,24 @@ class Agent:
                 lines.append(line)
         return "\n".join(lines).strip()
 
-    def run_all(self, *, tool_mode: ToolMode = ToolMode.READONLY) -> int:
-        """Process all pending tasks. Returns count processed."""
+    def run_all(
+        self,
+        *,
+        tool_mode: ToolMode = ToolMode.READONLY,
+        workers: int = 1,
+        processes: bool = False,
+    ) -> int:
+        """Process all pending tasks. Returns count processed.
+
+        With workers > 1 the mailbox is drained by a worker pool (threads, or
+        processes when processes=True) — see agentkit.workers.
+        """
+        if workers > 1:
+            from agentkit.workers import run_pool
+
+            stats = run_pool(self, workers=workers, tool_mode=tool_mode, processes=processes)
+            return sum(s.processed for s in stats)
+
         count = 0
         while self.process_next(tool_mode=tool_mode):
             count += 1
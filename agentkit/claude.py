@@ -1,13 +1,30 @@
 """Claude Code CLI wrapper — ALWAYS enforces Opus 4.6. READ-ONLY by default."""
 
+import asyncio
 import json
 import subprocess
+import threading
+import time
+from collections.abc import AsyncIterator, Callable
 from enum import Enum
 from pathlib import Path
 
+from agentkit.hooks import traced
+from agentkit.telemetry import TaskMetrics
+from agentkit.warm_pool import WarmPool, spawn
+
 
 class ClaudeError(Exception):
-    """Raised when Claude CLI invocation fails."""
+    """Raised when Claude CLI invocation fails.
+
+    `retryable` is False for failures another attempt cannot fix (missing CLI,
+    bad auth, unknown session) and for timeouts: a run killed for taking too
+    long would most likely be killed again. Crashes are worth retrying.
+    """
+
+    def __init__(self, message: str, *, retryable: bool = True):
+        super().__init__(message)
+        self.retryable = retryable
 
 
 class ToolMode(Enum):
@@ -18,23 +35,53 @@ class ToolMode(Enum):
 MODEL = "claude-opus-4-6"
 DEFAULT_TIMEOUT = 1800  # 30 minutes
 READONLY_TOOLS = "Read,Glob,Grep,WebSearch,WebFetch"
+SESSION_NOT_FOUND = "no conversation found"  # --resume of an unknown or expired session
+# CLI error output that means retrying is pointless (matched case-insensitively).
+FATAL_ERROR_MARKERS = (
+    "invalid api key",
+    "not logged in",
+    "please run /login",
+    "authentication",
+    "unauthorized",
+    SESSION_NOT_FOUND,
+    "unknown option",
+    "prompt is too long",
+)
+
 
+def _failure(error: str) -> ClaudeError:
+    lowered = error.lower()
+    retryable = not any(marker in lowered for marker in FATAL_ERROR_MARKERS)
+    return ClaudeError(f"Claude CLI failed: {error}", retryable=retryable)
 
+
+@traced("claude.invoke")
 def invoke_claude(
     prompt: str,
     *,
     context: str | None = None,
     system_prompt: str | None = None,
-    timeout: int = DEFAULT_TIMEOUT,
+    timeout: float = DEFAULT_TIMEOUT,
     output_format: str | None = None,
     tool_mode: ToolMode = ToolMode.READONLY,
     progress_path: Path | None = None,
+    on_event: Callable[[dict], None] | None = None,
+    pool: WarmPool | None = None,
+    resume: str | None = None,
+    inactivity_timeout: float | None = None,
+    metrics: TaskMetrics | None = None,
 ) -> str:
     """Invoke Claude Code CLI and return the output.
 
     Model is ALWAYS claude-opus-4-6. No override possible.
     Default tool_mode is READONLY — write access requires explicit opt-in.
     When progress_path is set, streams output to that file for live monitoring.
+    When on_event is set, it is called with each stream-json event as it arrives.
+    When pool is set, the streaming invocation takes a pre-spawned process from it.
+    When resume is set, the prompt continues that CLI session instead of starting one.
+    When inactivity_timeout is set, a streaming run that goes that many seconds
+    without output is killed instead of waiting out the full timeout.
+    When metrics is set, streaming runs add their spawn and first-event times to it.
     """
     cmd = ["claude", "-p", "--model", MODEL]
 
@@ -46,12 +93,17 @@ def invoke_claude(
     if system_prompt:
         cmd.extend(["--system-prompt", system_prompt])
 
-    if progress_path:
+    if resume:
+        cmd.extend(["--resume", resume])
+
+    if progress_path or on_event or pool:
         cmd.extend(["--verbose", "--output-format", "stream-json"])
         # With --verbose, prompt must go via stdin, not as argument
         stdin_text = prompt if not context else f"{prompt}\n\n{context}"
         return _invoke_with_progress(cmd, stdin_text=stdin_text, timeout=timeout,
-                                     progress_path=progress_path)
+                                     progress_path=progress_path, on_event=on_event,
+                                     pool=pool, inactivity_timeout=inactivity_timeout,
+                                     metrics=metrics)
 
     if output_format:
         cmd.extend(["--output-format", output_format])
@@ -67,47 +119,144 @@ def invoke_claude(
         )
         return result.stdout
     except subprocess.TimeoutExpired:
-        raise ClaudeError(f"Claude CLI timed out after {timeout}s")
+        raise ClaudeError(f"Claude CLI timed out after {timeout}s", retryable=False)
     except subprocess.CalledProcessError as e:
-        error = e.stderr or e.stdout or f"exit code {e.returncode}"
-        raise ClaudeError(f"Claude CLI failed: {error}")
+        raise _failure(e.stderr or e.stdout or f"exit code {e.returncode}")
+    except OSError as e:
+        raise ClaudeError(f"Claude CLI could not start: {e}", retryable=False)
 
 
-def _invoke_with_progress(cmd, *, stdin_text, timeout, progress_path):
-    """Run Claude CLI streaming progress to a file for live monitoring."""
-    progress_path = Path(progress_path)
-    progress_path.parent.mkdir(parents=True, exist_ok=True)
+def _invoke_with_progress(cmd, *, stdin_text, timeout, progress_path, on_event=None,
+                          pool=None, inactivity_timeout=None, metrics=None):
+    """Run Claude CLI, parsing stream-json events as they arrive.
 
-    with open(progress_path, "w") as pf:
-        process = subprocess.Popen(
-            cmd,
-            stdin=subprocess.PIPE,
-            stdout=pf,
-            stderr=subprocess.PIPE,
-            text=True,
+    Each stdout line is teed to progress_path (when set) for live monitoring,
+    parsed, and handed to on_event. The final result comes from the `result`
+    event, so the progress file is never re-read.
+
+    A watchdog kills the process once `timeout` seconds have passed, or once
+    `inactivity_timeout` seconds pass without a line of output — a hung CLI
+    is given up on long before its overall deadline.
+    """
+    pf = None
+    if progress_path:
+        progress_path = Path(progress_path)
+        progress_path.parent.mkdir(parents=True, exist_ok=True)
+        pf = open(progress_path, "w")
+
+    try:
+        started = time.monotonic()
+        try:
+            process, warm = pool.acquire(cmd) if pool else (spawn(cmd), False)
+        except OSError as e:
+            raise ClaudeError(f"Claude CLI could not start: {e}", retryable=False)
+        spawned = time.monotonic()
+        if metrics:
+            metrics.spawn_ms += 1000 * (spawned - started)
+
+        last_output = [spawned]
+        first_line = [True]
+
+        def on_line() -> None:
+            last_output[0] = time.monotonic()
+            if first_line[0]:
+                first_line[0] = False
+                if pool:
+                    pool.record_first_event(warm, last_output[0] - started)
+                if metrics:
+                    metrics.first_event_ms += 1000 * (last_output[0] - spawned)
+
+        # Drain stderr concurrently so a chatty CLI can't block on a full pipe.
+        stderr_chunks: list[str] = []
+        stderr_reader = threading.Thread(
+            target=lambda: stderr_chunks.append(process.stderr.read()), daemon=True
         )
-        process.stdin.write(stdin_text)
-        process.stdin.close()
+        stderr_reader.start()
+
+        killed_for: list[str] = []
+        finished = threading.Event()
+        poll = min(1.0, timeout / 4, (inactivity_timeout or 4.0) / 4)
 
+        def watchdog() -> None:
+            while not finished.wait(poll):
+                now = time.monotonic()
+                if now - started >= timeout:
+                    killed_for.append(f"Claude CLI timed out after {timeout}s")
+                elif inactivity_timeout and now - last_output[0] >= inactivity_timeout:
+                    killed_for.append(f"Claude CLI produced no output for {inactivity_timeout}s")
+                else:
+                    continue
+                process.kill()
+                return
+
+        watcher = threading.Thread(target=watchdog, daemon=True)
+        watcher.start()
         try:
-            process.wait(timeout=timeout)
-        except subprocess.TimeoutExpired:
-            process.kill()
+            try:
+                process.stdin.write(stdin_text)
+                process.stdin.close()
+            except BrokenPipeError:
+                pass  # the process already exited; its return code tells us why
+            result_text = _consume_stream(process.stdout, pf, on_event, on_line)
             process.wait()
-            raise ClaudeError(f"Claude CLI timed out after {timeout}s")
+        finally:
+            finished.set()
+            watcher.join()
+        stderr_reader.join()
+    finally:
+        if pf:
+            pf.close()
 
+    if killed_for:
+        raise ClaudeError(killed_for[0], retryable=False)
     if process.returncode != 0:
-        stderr = process.stderr.read()
-        raise ClaudeError(f"Claude CLI failed: {stderr or f'exit code {process.returncode}'}")
+        stderr = "".join(stderr_chunks)
+        raise _failure(stderr or f"exit code {process.returncode}")
+    return result_text
+
 
-    # Parse final result from stream-json
+def _consume_stream(stdout, progress_file, on_event, on_line=None) -> str:
+    """Tee, parse and dispatch stream-json lines. Returns the final result text."""
     result_text = ""
-    with open(progress_path) as pf:
-        for line in pf:
-            try:
-                event = json.loads(line.strip())
-                if event.get("type") == "result":
-                    result_text = event.get("result", "")
-            except (json.JSONDecodeError, KeyError):
-                pass
+    for line in stdout:
+        if on_line:
+            on_line()
+        if progress_file:
+            progress_file.write(line)
+            progress_file.flush()
+        try:
+            event = json.loads(line)
+        except json.JSONDecodeError:
+            continue
+        if not isinstance(event, dict):
+            continue
+        if event.get("type") == "result":
+            result_text = event.get("result", "")
+        if on_event:
+            on_event(event)
     return result_text
+
+
+async def stream_claude(prompt: str, **kwargs) -> AsyncIterator[dict]:
+    """Async iterator over stream-json events of one Claude invocation.
+
+    Accepts the same keyword arguments as invoke_claude. The last event yielded
+    is the `result` event; failures raise ClaudeError once the stream ends.
+    """
+    loop = asyncio.get_running_loop()
+    queue: asyncio.Queue = asyncio.Queue()
+    done = object()
+
+    def on_event(event: dict) -> None:
+        loop.call_soon_threadsafe(queue.put_nowait, event)
+
+    def run() -> None:
+        try:
+            invoke_claude(prompt, on_event=on_event, **kwargs)
+        finally:
+            loop.call_soon_threadsafe(queue.put_nowait, done)
+
+    worker = asyncio.ensure_future(asyncio.to_thread(run))
+    while (event := await queue.get()) is not done:
+        yield event
+    await worker
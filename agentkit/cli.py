@@ -1,22 +1,75 @@
-"""CLI entry point — task, evaluate, run."""
+"""CLI entry point — task, evaluate, drain, archive, search, compact-memory, stats, run."""
 
 import argparse
 import logging
 import os
+from datetime import datetime, timedelta, timezone
 from pathlib import Path
 
+from agentkit import hooks
 from agentkit.agent import Agent, TaskResult
 from agentkit.claude import ToolMode
+from agentkit.compaction import CompactionPolicy, compact
 from agentkit.config import Config
+from agentkit.mailbox import Mailbox, RetentionPolicy
+from agentkit.memory import Memory
+from agentkit.memory_index import MemoryIndex
+from agentkit.outbox import Outbox, SendQueue
 from agentkit.telegram_bot import TelegramBot
+from agentkit.telemetry import summarize
 
 
 def _send_pending(config: Config, result: TaskResult | None) -> None:
     """Send pending TELEGRAM: messages if configured."""
     if result and result.pending_messages and config.telegram_bot_token:
+        # Queued in the outbox first: whatever can't be sent now is delivered
+        # by the daemon later instead of being lost.
+        outbox = Outbox(config.outbox_path)
         bot = TelegramBot(config.telegram_bot_token, config.telegram_chat_id)
-        for msg in result.pending_messages:
-            bot.send_sync(msg)
+        queue = SendQueue(bot, outbox, document_threshold=config.telegram_document_threshold)
+        bot.run_sync(_queue_and_flush(queue, result.pending_messages))
+        outbox.close()
+
+
+async def _queue_and_flush(queue: SendQueue, messages: list[str]) -> None:
+    for msg in messages:
+        await queue.send(msg)
+    await queue.flush()
+
+
+def _make_agent(config: Config, *, no_cache: bool = False) -> Agent:
+    agent = Agent(config)
+    if no_cache:
+        agent.cache = None
+    return agent
+
+
+def _log_cache_stats(agent: Agent) -> None:
+    if agent.cache is not None:
+        logging.getLogger(__name__).info("Response cache: %s", agent.cache.stats())
+
+
+def _print_stats(summaries: list[dict]) -> None:
+    if not summaries:
+        print("No task metrics recorded yet")
+        return
+    for s in summaries:
+        print(
+            f"{s['profile']}/{s['source']}: {s['tasks']} task(s), {s['failed']} failed, "
+            f"{s['cache_hits']} cached, {s['tasks_per_hour']:.1f}/h"
+        )
+        print(
+            f"  latency ms  p50 {s['p50_ms']:.0f}  p95 {s['p95_ms']:.0f}  p99 {s['p99_ms']:.0f}"
+        )
+        print(
+            f"  phase p50 ms  dequeue {s['dequeue_p50_ms']:.0f}  prompt {s['prompt_p50_ms']:.0f}"
+            f"  spawn {s['spawn_p50_ms']:.0f}  first event {s['first_event_p50_ms']:.0f}"
+            f"  claude {s['claude_p50_ms']:.0f}  memory {s['memory_p50_ms']:.0f}"
+        )
+        print(
+            f"  tokens  in {s['input_tokens']}  out {s['output_tokens']}"
+            f"  cache read {s['cache_read_tokens']}  cost ${s['cost_usd']:.2f}"
+        )
 
 
 def create_parser() -> argparse.ArgumentParser:
@@ -27,9 +80,66 @@ def create_parser() -> argparse.ArgumentParser:
     task_cmd.add_argument("prompt", help="Task to process")
     task_cmd.add_argument("--profile", default="playground")
     task_cmd.add_argument("--write", action="store_true", help="Enable READWRITE mode")
+    task_cmd.add_argument(
+        "--no-cache", action="store_true", help="Bypass the read-only response cache"
+    )
 
     eval_cmd = sub.add_parser("evaluate", help="Run evaluation cycle (always READONLY)")
     eval_cmd.add_argument("--profile", default="playground")
+    eval_cmd.add_argument(
+        "--no-cache", action="store_true", help="Bypass the read-only response cache"
+    )
+
+    drain_cmd = sub.add_parser("drain", help="Process all pending tasks in the mailbox")
+    drain_cmd.add_argument("--profile", default="playground")
+    drain_cmd.add_argument("--workers", type=int, default=1, help="Concurrent workers")
+    drain_cmd.add_argument(
+        "--processes", action="store_true", help="Use worker processes instead of threads"
+    )
+    drain_cmd.add_argument("--write", action="store_true", help="Enable READWRITE mode")
+
+    archive_cmd = sub.add_parser(
+        "archive", help="Archive old finished tasks and compact the database"
+    )
+    archive_cmd.add_argument("--profile", default="playground")
+    archive_cmd.add_argument(
+        "--max-age-days", type=int, default=RetentionPolicy.max_age_days,
+        help="Archive finished tasks older than this",
+    )
+    archive_cmd.add_argument(
+        "--keep-last", type=int, default=RetentionPolicy.keep_last,
+        help="Always keep this many most recent finished tasks live",
+    )
+
+    search_cmd = sub.add_parser("search", help="Search memory for relevant entries")
+    search_cmd.add_argument("query", help="Search terms")
+    search_cmd.add_argument("-k", type=int, default=5, help="Number of results")
+    search_cmd.add_argument("--profile", default="playground")
+
+    compact_cmd = sub.add_parser(
+        "compact-memory", help="Deduplicate long-term memory and roll up old daily files"
+    )
+    compact_cmd.add_argument("--profile", default="playground")
+    compact_cmd.add_argument(
+        "--keep-days", type=int, default=CompactionPolicy.keep_days,
+        help="Leave daily files newer than this untouched",
+    )
+    compact_cmd.add_argument(
+        "--period", choices=["week", "month"], default=CompactionPolicy.period,
+        help="Digest granularity",
+    )
+    compact_cmd.add_argument(
+        "--similarity", type=float, default=CompactionPolicy.similarity,
+        help="Jaccard similarity at which entries count as duplicates",
+    )
+
+    stats_cmd = sub.add_parser(
+        "stats", help="Latency, throughput and token usage by source and profile"
+    )
+    stats_cmd.add_argument("--profile", default=None, help="Only this profile (default: all)")
+    stats_cmd.add_argument(
+        "--hours", type=float, default=24 * 7, help="Only tasks from the last N hours"
+    )
 
     run_cmd = sub.add_parser("run", help="Start daemon (Telegram polling)")
     run_cmd.add_argument(
@@ -49,14 +159,24 @@ def main() -> None:
         datefmt="%H:%M:%S",
     )
 
+    # Profiling hooks (AGENT_HOOKS) wrap the whole command.
+    hook_config = Config(
+        profile=getattr(args, "profile", None) or "playground", project_root=Path.cwd()
+    )
+    with hooks.session(hook_config):
+        _run_command(parser, args)
+
+
+def _run_command(parser: argparse.ArgumentParser, args: argparse.Namespace) -> None:
     if args.command == "task":
         config = Config(profile=args.profile, project_root=Path.cwd())
-        agent = Agent(config)
+        agent = _make_agent(config, no_cache=args.no_cache)
         tool_mode = ToolMode.READWRITE if args.write else ToolMode.READONLY
-        agent.mailbox.enqueue(args.prompt, source="cli")
-        result = agent.process_next(tool_mode=tool_mode)
+        task_id = agent.mailbox.enqueue(args.prompt, source="cli")
+        result = agent.process_next(tool_mode=tool_mode, task_id=task_id)
         if result:
             print(result.response)
+        _log_cache_stats(agent)
         _send_pending(config, result)
 
     elif args.command == "evaluate":
@@ -65,12 +185,56 @@ def main() -> None:
         if not eval_path.exists():
             print(f"No evaluation.md found at {eval_path}")
             return
-        agent = Agent(config)
+        agent = _make_agent(config, no_cache=args.no_cache)
         eval_template = eval_path.read_text()
-        agent.mailbox.enqueue(eval_template, source="cron-evaluate")
-        result = agent.process_next(tool_mode=ToolMode.READONLY)
+        task_id = agent.mailbox.enqueue(eval_template, source="cron-evaluate")
+        result = agent.process_next(tool_mode=ToolMode.READONLY, task_id=task_id)
+        _log_cache_stats(agent)
         _send_pending(config, result)
 
+    elif args.command == "drain":
+        config = Config(profile=args.profile, project_root=Path.cwd())
+        agent = Agent(config)
+        tool_mode = ToolMode.READWRITE if args.write else ToolMode.READONLY
+        count = agent.run_all(tool_mode=tool_mode, workers=args.workers, processes=args.processes)
+        print(f"Processed {count} task(s)")
+
+    elif args.command == "archive":
+        config = Config(profile=args.profile, project_root=Path.cwd())
+        mailbox = Mailbox(config.db_path)
+        archived = mailbox.archive(
+            RetentionPolicy(max_age_days=args.max_age_days, keep_last=args.keep_last)
+        )
+        mailbox.vacuum()
+        print(f"Archived {archived} task(s)")
+
+    elif args.command == "search":
+        config = Config(profile=args.profile, project_root=Path.cwd())
+        memory = Memory(
+            config.memory_dir, index=MemoryIndex(config.memory_index_path, config.memory_dir)
+        )
+        for hit in memory.search(args.query, k=args.k):
+            print(f"[{hit['source']}] {hit['content']}\n")
+
+    elif args.command == "compact-memory":
+        config = Config(profile=args.profile, project_root=Path.cwd())
+        memory = Memory(
+            config.memory_dir, index=MemoryIndex(config.memory_index_path, config.memory_dir)
+        )
+        report = compact(memory, CompactionPolicy(
+            keep_days=args.keep_days, period=args.period, similarity=args.similarity,
+        ))
+        print(
+            f"Removed {report.duplicates_removed} duplicate(s), rolled "
+            f"{report.daily_files_rolled} daily file(s) into {len(report.digests)} digest(s)"
+        )
+
+    elif args.command == "stats":
+        config = Config(profile=args.profile or "playground", project_root=Path.cwd())
+        since = datetime.now(timezone.utc) - timedelta(hours=args.hours)
+        rows = Mailbox(config.db_path).metrics(since=since.isoformat(), profile=args.profile)
+        _print_stats(summarize(rows))
+
     elif args.command == "run":
         from agentkit.daemon import Daemon
 
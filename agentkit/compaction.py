@@ -0,0 +1,165 @@
+"""Memory compaction — deduplicate long-term memory and roll up old daily files.
+
+Near-duplicates are found with MinHash over word shingles, bucketed by LSH
+bands so each entry is only compared with likely matches, then confirmed
+with exact Jaccard similarity.
+"""
+
+import logging
+import random
+import zlib
+from dataclasses import dataclass, field
+from datetime import date, timedelta
+from pathlib import Path
+
+from agentkit.memory import Memory
+from agentkit.ranking import split_entries, tokenize
+
+log = logging.getLogger(__name__)
+
+SHINGLE_SIZE = 3
+NUM_PERM = 64
+BANDS = 16
+_PRIME = (1 << 61) - 1
+
+
+@dataclass
+class CompactionPolicy:
+    keep_days: int = 14  # daily files newer than this stay as they are
+    period: str = "week"  # digest granularity: "week" or "month"
+    similarity: float = 0.8  # Jaccard similarity at which entries count as duplicates
+
+
+@dataclass
+class CompactionReport:
+    duplicates_removed: int = 0
+    daily_files_rolled: int = 0
+    digests: list[str] = field(default_factory=list)
+
+
+def shingles(text: str, size: int = SHINGLE_SIZE) -> set[str]:
+    words = tokenize(text)
+    if len(words) <= size:
+        return {" ".join(words)}
+    return {" ".join(words[i:i + size]) for i in range(len(words) - size + 1)}
+
+
+class MinHash:
+    def __init__(self, num_perm: int = NUM_PERM, seed: int = 1):
+        rng = random.Random(seed)
+        self._params = [
+            (rng.randrange(1, _PRIME), rng.randrange(0, _PRIME)) for _ in range(num_perm)
+        ]
+
+    def signature(self, shingle_set: set[str]) -> tuple[int, ...]:
+        hashes = [zlib.crc32(s.encode()) for s in shingle_set] or [0]
+        return tuple(min((a * h + b) % _PRIME for h in hashes) for a, b in self._params)
+
+
+def _jaccard(a: set[str], b: set[str]) -> float:
+    return len(a & b) / len(a | b) if a or b else 1.0
+
+
+def dedupe_entries(entries: list[str], similarity: float = 0.8) -> list[str]:
+    """Drop exact and near-duplicate entries, keeping the newest of each group.
+
+    The result preserves the original order of the surviving entries.
+    """
+    return [entries[i] for i in _unique_indices(entries, similarity)]
+
+
+def _unique_indices(entries: list[str], similarity: float) -> list[int]:
+    minhash = MinHash()
+    rows = NUM_PERM // BANDS
+    buckets: dict[tuple, list[int]] = {}
+    seen_exact: set[str] = set()
+    shingle_sets: dict[int, set[str]] = {}
+    kept: list[int] = []
+
+    for i in reversed(range(len(entries))):
+        normalized = " ".join(tokenize(entries[i]))
+        if normalized in seen_exact:
+            continue
+        shingle_set = shingles(entries[i])
+        sig = minhash.signature(shingle_set)
+        keys = [(band, sig[band * rows:(band + 1) * rows]) for band in range(BANDS)]
+        candidates = {j for key in keys for j in buckets.get(key, ())}
+        if any(_jaccard(shingle_set, shingle_sets[j]) >= similarity for j in candidates):
+            continue
+        seen_exact.add(normalized)
+        shingle_sets[i] = shingle_set
+        for key in keys:
+            buckets.setdefault(key, []).append(i)
+        kept.append(i)
+
+    return sorted(kept)
+
+
+def _period_key(d: date, period: str) -> str:
+    if period == "month":
+        return f"{d.year}-{d.month:02d}"
+    year, week, _ = d.isocalendar()
+    return f"{year}-W{week:02d}"
+
+
+def dedupe_long_term(memory: Memory, similarity: float = 0.8) -> int:
+    """Deduplicate MEMORY.md in place. Returns the number of entries removed."""
+    removed = 0
+
+    def transform(text: str) -> str:
+        nonlocal removed
+        entries = split_entries(text)
+        kept = dedupe_entries(entries, similarity)
+        removed = len(entries) - len(kept)
+        return "\n\n".join(kept) if removed else text
+
+    memory.rewrite_long_term(transform)
+    return removed
+
+
+def roll_up_daily(memory: Memory, policy: CompactionPolicy) -> dict[str, int]:
+    """Merge daily files older than policy.keep_days into period digests.
+
+    Returns {digest key: number of daily files rolled into it}.
+    """
+    cutoff = date.today() - timedelta(days=policy.keep_days)
+    groups: dict[str, list[tuple[date, Path]]] = {}
+    for path in sorted(memory.daily_dir.glob("*.md")):
+        try:
+            day = date.fromisoformat(path.stem)
+        except ValueError:
+            continue
+        if day < cutoff:
+            groups.setdefault(_period_key(day, policy.period), []).append((day, path))
+
+    rolled = {}
+    for key, days in groups.items():
+        tagged = [
+            (day, entry)
+            for day, path in days
+            for entry in split_entries(memory.files.read(path))
+            if not entry.startswith("# ")
+        ]
+        kept = [tagged[i] for i in _unique_indices([e for _, e in tagged], policy.similarity)]
+        sections = []
+        for day, _ in days:
+            body = [entry for d, entry in kept if d == day]
+            if body:
+                sections.append(f"## {day.isoformat()}\n\n" + "\n\n".join(body) + "\n")
+        memory.roll_up(key, "\n".join(sections), [path for _, path in days])
+        rolled[key] = len(days)
+    return rolled
+
+
+def compact(memory: Memory, policy: CompactionPolicy | None = None) -> CompactionReport:
+    policy = policy or CompactionPolicy()
+    report = CompactionReport()
+    report.duplicates_removed = dedupe_long_term(memory, policy.similarity)
+    rolled = roll_up_daily(memory, policy)
+    report.daily_files_rolled = sum(rolled.values())
+    report.digests = sorted(rolled)
+    log.info(
+        "Memory compaction: %d duplicate(s) removed, %d daily file(s) rolled into %d digest(s)",
+        report.duplicates_removed, report.daily_files_rolled, len(report.digests),
+    )
+    return report
@@ -29,18 +29,142 @@ class Config:
     def db_path(self) -> Path:
         return self.project_root / "data" / "agentkit.db"
 
+    @property
+    def memory_index_path(self) -> Path:
+        return self.project_root / "data" / "memory_index.db"
+
     @property
     def schedule_path(self) -> Path:
         return self.project_root / "data" / "schedule.json"
 
     @property
-    def progress_path(self) -> Path:
-        return self.project_root / "data" / "progress.jsonl"
+    def progress_dir(self) -> Path:
+        return self.project_root / "data" / "progress"
+
+    def progress_path(self, task_id: int) -> Path:
+        """Stream-json tee of one task's run; concurrent tasks never share a file."""
+        return self.progress_dir / f"progress-{task_id}.jsonl"
 
     @property
     def evolution_log_path(self) -> Path:
         return self.project_root / "data" / "evolution-log.json"
 
+    @property
+    def memory_fsync(self) -> str:
+        """Memory fsync policy: "never" (default) or "always"."""
+        return os.environ.get("AGENT_MEMORY_FSYNC", "never")
+
+    @property
+    def warm_pool_size(self) -> int:
+        """Pre-spawned Claude CLI processes to keep ready (0 disables the pool)."""
+        return int(os.environ.get("CLAUDE_WARM_POOL", "0"))
+
+    @property
+    def response_cache_path(self) -> Path:
+        return self.project_root / "data" / "response_cache.db"
+
+    @property
+    def response_cache_ttl(self) -> int:
+        """Seconds a cached read-only response stays valid (0 disables the cache)."""
+        return int(os.environ.get("CLAUDE_CACHE_TTL", "0"))
+
+    @property
+    def response_cache_size(self) -> int:
+        """Maximum number of cached responses before LRU eviction."""
+        return int(os.environ.get("CLAUDE_CACHE_SIZE", "256"))
+
+    @property
+    def claude_timeout(self) -> int:
+        """Seconds a Claude run may take when there is no better estimate."""
+        return int(os.environ.get("CLAUDE_TIMEOUT", "1800"))
+
+    @property
+    def claude_inactivity_timeout(self) -> int:
+        """Seconds without stream output before a run is killed (0 disables)."""
+        return int(os.environ.get("CLAUDE_INACTIVITY_TIMEOUT", "0"))
+
+    @property
+    def source_timeouts(self) -> dict[str, int]:
+        """Per-source timeouts from CLAUDE_SOURCE_TIMEOUTS, e.g. "telegram=300,cron=3600"."""
+        timeouts = {}
+        for item in os.environ.get("CLAUDE_SOURCE_TIMEOUTS", "").split(","):
+            source, _, seconds = item.partition("=")
+            if source.strip() and seconds.strip():
+                timeouts[source.strip()] = int(seconds)
+        return timeouts
+
+    @property
+    def claude_retries(self) -> int:
+        """Extra attempts after a retryable Claude CLI failure."""
+        return int(os.environ.get("CLAUDE_RETRIES", "2"))
+
+    @property
+    def breaker_threshold(self) -> int:
+        """Consecutive failed attempts that pause dequeuing (0 disables the breaker)."""
+        return int(os.environ.get("CLAUDE_BREAKER_THRESHOLD", "5"))
+
+    @property
+    def breaker_cooldown_seconds(self) -> int:
+        """Seconds dequeuing stays paused once the breaker opens."""
+        return int(os.environ.get("CLAUDE_BREAKER_COOLDOWN", "300"))
+
+    @property
+    def session_limit(self) -> int:
+        """Chats whose Claude session is kept for resuming (0 disables sessions)."""
+        return int(os.environ.get("CLAUDE_SESSIONS", "64"))
+
+    @property
+    def session_idle_seconds(self) -> int:
+        """Idle seconds after which a chat starts a fresh Claude session."""
+        return int(os.environ.get("CLAUDE_SESSION_IDLE", "1800"))
+
+    @property
+    def metrics_port(self) -> int:
+        """Local port for the daemon's /metrics endpoint (0 disables it)."""
+        return int(os.environ.get("AGENT_METRICS_PORT", "0"))
+
+    @property
+    def hooks(self) -> list[str]:
+        """Profiling hooks to enable: any of "timers", "spans", "sampler"."""
+        return [h.strip() for h in os.environ.get("AGENT_HOOKS", "").split(",") if h.strip()]
+
+    @property
+    def spans_path(self) -> Path:
+        return self.project_root / "data" / "spans.jsonl"
+
+    @property
+    def profile_samples_path(self) -> Path:
+        return self.project_root / "data" / "profile.folded"
+
+    @property
+    def telegram_concurrency(self) -> int:
+        """Telegram chats whose messages are processed at the same time."""
+        return int(os.environ.get("TELEGRAM_CONCURRENCY", "4"))
+
+    @property
+    def telegram_debounce(self) -> float:
+        """Seconds a chat must be quiet before its queued messages run as one task (0 = off)."""
+        return float(os.environ.get("TELEGRAM_DEBOUNCE", "0"))
+
+    @property
+    def telegram_rate(self) -> float:
+        """Outbound Telegram messages per second across all chats."""
+        return float(os.environ.get("TELEGRAM_RATE", "25"))
+
+    @property
+    def telegram_chat_rate(self) -> float:
+        """Outbound Telegram messages per second to any one chat."""
+        return float(os.environ.get("TELEGRAM_CHAT_RATE", "1"))
+
+    @property
+    def telegram_document_threshold(self) -> int:
+        """Replies longer than this many characters are sent as a file (0 = never)."""
+        return int(os.environ.get("TELEGRAM_DOCUMENT_THRESHOLD", "12000"))
+
+    @property
+    def outbox_path(self) -> Path:
+        return self.project_root / "data" / "outbox.db"
+
     @property
     def telegram_bot_token(self) -> str:
         return os.environ.get("TELEGRAM_BOT_TOKEN", "")
@@ -49,3 +173,8 @@ class Config:
     def telegram_chat_id(self) -> str:
         return os.environ.get("TELEGRAM_CHAT_ID", "")
 
+    @property
+    def telegram_edit_interval(self) -> float:
+        """Minimum seconds between live-status edits of one Telegram message."""
+        return float(os.environ.get("TELEGRAM_EDIT_INTERVAL", "3"))
+
@@ -2,42 +2,180 @@
 
 Includes an orientation ritual: every invocation starts by reading recent
 memory and progress, preventing the 'cold start' problem.
+
+File reads go through the FileCache shared with Memory, and the assembled
+system prompt is reused until one of its input files actually changes.
+
+Each section is held to a token budget. When long-term memory exceeds its
+budget, entries are ranked by BM25 against the task text and only the most
+relevant ones are included.
 """
 
+import re
+from dataclasses import dataclass
+from pathlib import Path
+
 from agentkit.config import Config
+from agentkit.filecache import FileCache, Signature
+from agentkit.hooks import traced
 from agentkit.memory import Memory
+from agentkit.ranking import BM25, estimate_tokens, select_within_budget, split_entries
+
+RECENT_DAYS = 3
+DAY_HEADER = re.compile(r"# \d{4}-\d{2}-\d{2}")
+
+
+@dataclass
+class PromptBudget:
+    """Token budget per system prompt section (None = unlimited)."""
+
+    recent: int | None = 3000
+    identity: int | None = 2000
+    tools: int | None = 2000
+    long_term: int | None = 4000
+
+
+def _keep_tail(text: str, budget: int | None) -> str:
+    """Trim from the start so the newest text survives."""
+    if budget is None or estimate_tokens(text) <= budget:
+        return text
+    return "... (earlier context omitted)\n" + text[-budget * 4:]
+
+
+def _without_runs_of(journal: str, task: str) -> str:
+    """The journal's lines minus the "Task: ... Result: ..." entries of `task` itself.
+
+    Each run appends such an entry, so a key including them would change
+    with every run of the task it was computed for. Day headers and blank
+    lines are dropped too: a first entry for the day adds a header.
+    """
+    own = f"Task: {task[:100]}".split("\n")[0]
+    kept: list[str] = []
+    skipping = False
+    for line in journal.split("\n"):
+        if line.startswith("Task: "):
+            skipping = line == own
+        elif DAY_HEADER.fullmatch(line):
+            skipping = False
+            continue
+        if not skipping and line.strip() and line != "---":
+            kept.append(line)
+    return "\n".join(kept)
+
+
+def _keep_head(text: str, budget: int | None) -> str:
+    if budget is None or estimate_tokens(text) <= budget:
+        return text
+    return text[: budget * 4] + "\n... (truncated)"
 
 
 class ContextBuilder:
-    def __init__(self, config: Config, memory: Memory):
+    def __init__(self, config: Config, memory: Memory, budget: PromptBudget | None = None):
         self.config = config
         self.memory = memory
+        self.budget = budget or PromptBudget()
+        # (cache key, assembled prompt) — one attribute so threads swap it atomically
+        self._cached_prompt: tuple[tuple, str] | None = None
+        # (MEMORY.md signature, entries, index) — rebuilt only when the file changes
+        self._ranker: tuple[Signature, list[str], BM25] | None = None
 
-    def _read_profile_file(self, name: str) -> str:
-        path = self.config.profile_dir / name
-        return path.read_text() if path.exists() else ""
+    @property
+    def files(self) -> FileCache:
+        return self.memory.files
 
-    def build_system_prompt(self) -> str:
-        sections = []
+    def _read_profile_file(self, name: str) -> str:
+        return self.files.read(self.config.profile_dir / name)
 
-        # Orientation ritual — what happened recently?
-        recent = self.memory.read_recent(days=3)
-        if recent:
-            sections.append(f"## Recent Context (Orientation)\n\n{recent}")
+    def _input_paths(self) -> list[Path]:
+        return [
+            *self.memory.recent_paths(days=RECENT_DAYS),
+            self.config.profile_dir / "identity.md",
+            self.config.profile_dir / "tools.md",
+            self.memory.long_term_path,
+        ]
 
-        identity = self._read_profile_file("identity.md")
-        if identity:
-            sections.append(f"## Identity\n\n{identity}")
+    def _long_term_over_budget(self) -> bool:
+        budget = self.budget.long_term
+        return budget is not None and estimate_tokens(self.memory.read_long_term()) > budget
 
-        tools = self._read_profile_file("tools.md")
-        if tools:
-            sections.append(f"## Available Tools\n\n{tools}")
+    @traced("context.build_system_prompt")
+    def build_system_prompt(self, task: str = "") -> str:
+        """Assemble the system prompt; `task` steers which long-term entries are kept."""
+        signatures = tuple((path, FileCache.signature(path)) for path in self._input_paths())
+        # The task only affects the prompt when long-term memory has to be ranked.
+        key = (signatures, task if self._long_term_over_budget() else "")
+        cached = self._cached_prompt
+        if cached is not None and cached[0] == key:
+            return cached[1]
+        prompt = self._assemble_system_prompt(task)
+        self._cached_prompt = (key, prompt)
+        return prompt
 
+    def _long_term_section(self, task: str) -> str:
         long_term = self.memory.read_long_term()
-        if long_term:
-            sections.append(f"## Long-Term Memory\n\n{long_term}")
+        if not self._long_term_over_budget():
+            return long_term
+
+        signature = FileCache.signature(self.memory.long_term_path)
+        ranker = self._ranker
+        if ranker is None or ranker[0] != signature:
+            entries = split_entries(long_term)
+            ranker = (signature, entries, BM25(entries))
+            self._ranker = ranker
+        _, entries, index = ranker
+        selected = select_within_budget(entries, index.scores(task), self.budget.long_term)
+        return "\n\n".join(selected)
+
+    def _section(self, name: str, task: str) -> str:
+        """One formatted, budgeted section ("" when empty)."""
+        if name == "recent":
+            # Orientation ritual — what happened recently?
+            recent = _keep_tail(self.memory.read_recent(days=RECENT_DAYS), self.budget.recent)
+            return f"## Recent Context (Orientation)\n\n{recent}" if recent else ""
+        if name == "identity":
+            identity = _keep_head(self._read_profile_file("identity.md"), self.budget.identity)
+            return f"## Identity\n\n{identity}" if identity else ""
+        if name == "tools":
+            tools = _keep_head(self._read_profile_file("tools.md"), self.budget.tools)
+            return f"## Available Tools\n\n{tools}" if tools else ""
+        long_term = self._long_term_section(task)
+        return f"## Long-Term Memory\n\n{long_term}" if long_term else ""
+
+    def _join(self, names: list[str], task: str = "") -> str:
+        sections = (self._section(name, task) for name in names)
+        return "\n\n---\n\n".join(section for section in sections if section)
+
+    def _assemble_system_prompt(self, task: str = "") -> str:
+        return self._join(["recent", "identity", "tools", "long_term"], task)
+
+    @traced("context.build_stable_system_prompt")
+    def build_stable_system_prompt(self) -> str:
+        """Identity and tools only — unchanged from task to task.
+
+        Used with the warm process pool, where the CLI command (and so the
+        system prompt) must stay identical for a pre-spawned process to match.
+        """
+        return self._join(["identity", "tools"])
+
+    @traced("context.build_memory_context")
+    def build_memory_context(self, task: str) -> str:
+        """Recent and long-term memory sections, for delivery alongside the task."""
+        return self._join(["recent", "long_term"], task)
+
+    def build_cache_basis(self, task: str, *, include_recent: bool = False) -> str:
+        """The system prompt, without the recent-activity journal unless asked.
 
-        return "\n\n---\n\n".join(sections)
+        Every task appends to the daily log, so keying cached responses on the
+        full system prompt would never match twice. Tasks that reason about
+        recent activity (scheduled evaluations) pass include_recent=True: their
+        key covers the journal minus the entries earlier runs of `task` wrote,
+        so a repeat hits until some other task adds to it.
+        """
+        basis = self._join(["identity", "tools", "long_term"], task)
+        if not include_recent:
+            return basis
+        recent = _without_runs_of(self.memory.read_recent(days=RECENT_DAYS), task)
+        return f"{basis}\n\n---\n\n{recent}"
 
     def build_task_prompt(self, task: str) -> str:
         return (
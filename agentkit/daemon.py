@@ -1,24 +1,51 @@
 """Daemon mode — long-running Telegram-connected agent."""
 
 import asyncio
+import contextlib
 import logging
 import signal
+import time
+from collections.abc import Callable
 
 from telegram import Update
-from telegram.ext import ApplicationBuilder, MessageHandler, filters
+from telegram.ext import ApplicationBuilder, CommandHandler, MessageHandler, filters
 
 from agentkit.agent import Agent, TaskResult
 from agentkit.claude import ToolMode
+from agentkit.compaction import CompactionPolicy, compact
 from agentkit.config import Config
-from agentkit.telegram_bot import TelegramBot
+from agentkit.dispatcher import ChatDispatcher
+from agentkit.live_status import LiveStatus
+from agentkit.mailbox import AsyncMailbox, RetentionPolicy
+from agentkit.metrics import REGISTRY, MetricsServer, gauge
+from agentkit.outbox import Outbox, SendLimits, SendQueue
+from agentkit.telegram_bot import POOL_SIZE, TelegramBot
+from agentkit.warm_pool import WarmPool
 
 log = logging.getLogger(__name__)
 
+MAINTENANCE_INTERVAL = 3600  # seconds between idle-maintenance checks
+IDLE_THRESHOLD = 300  # seconds without messages before maintenance may run
+BREAKER_OPEN_REPLY = "⏸ Claude is failing right now; please try again in a few minutes."
+SHUTDOWN_FLUSH = 10  # seconds to spend delivering queued replies on shutdown
+
 
 class Daemon:
     def __init__(self, config: Config):
         self.config = config
         self.agent = Agent(config)
+        self.mailbox = AsyncMailbox(self.agent.mailbox)
+        self.retention = RetentionPolicy()
+        self.compaction = CompactionPolicy()
+        self._last_activity = time.monotonic()
+        self._in_flight = 0
+        self.bot: TelegramBot | None = None  # shared by every chat; created in run()
+        self.outbox: SendQueue | None = None  # replies and notifications; created in run()
+        self.dispatcher = ChatDispatcher(
+            self.handle_chat_message,
+            max_concurrency=config.telegram_concurrency,
+            debounce=config.telegram_debounce,
+        )
 
     def validate(self) -> None:
         """Validate required config for daemon mode."""
@@ -26,9 +53,125 @@ class Daemon:
             raise ValueError("TELEGRAM_BOT_TOKEN is required for daemon mode")
 
     def handle_message(self, text: str, source: str = "telegram") -> TaskResult | None:
-        """Enqueue message, process, return TaskResult."""
-        self.agent.mailbox.enqueue(text, source=source)
-        return self.agent.process_next(tool_mode=ToolMode.READWRITE)
+        """Enqueue message, process that same task, return TaskResult."""
+        # Admitted before enqueueing: a task nobody claims would later be
+        # picked up by an unrelated `process_next` caller.
+        if not self.agent.breaker.allow():
+            log.warning("Circuit breaker open; message not accepted")
+            return None
+        task_id = self.agent.mailbox.enqueue(text, source=source)
+        started = time.monotonic()
+        task = self.agent.mailbox.claim(task_id)
+        if task is None:
+            self.agent.breaker.release()
+            return None
+        metrics = self.agent.new_metrics(task)
+        metrics.dequeue_ms = 1000 * (time.monotonic() - started)
+        return self.agent.process_task(task, tool_mode=ToolMode.READWRITE, metrics=metrics)
+
+    async def handle_message_async(
+        self,
+        text: str,
+        source: str = "telegram",
+        on_event: Callable[[dict], None] | None = None,
+        chat_id: str | None = None,
+    ) -> TaskResult | None:
+        """Like handle_message, but mailbox I/O never blocks the event loop.
+
+        Messages from the same chat_id continue one Claude session.
+        """
+        if not self.agent.breaker.allow():
+            log.warning("Circuit breaker open; message not accepted")
+            return None
+        return await self._process_admitted(text, source, on_event, chat_id)
+
+    async def _process_admitted(
+        self,
+        text: str,
+        source: str,
+        on_event: Callable[[dict], None] | None,
+        chat_id: str | None,
+    ) -> TaskResult | None:
+        """Enqueue and process a message the circuit breaker has already let through."""
+        task_id = await self.mailbox.enqueue(text, source=source)
+        started = time.monotonic()
+        task = await self.mailbox.claim(task_id)
+        if task is None:
+            self.agent.breaker.release()
+            return None
+        metrics = self.agent.new_metrics(task)
+        metrics.dequeue_ms = 1000 * (time.monotonic() - started)
+        return await asyncio.to_thread(
+            self.agent.process_task, task, tool_mode=ToolMode.READWRITE,
+            on_event=on_event, session_key=chat_id, metrics=metrics,
+        )
+
+    async def handle_chat_message(self, chat_id: str, text: str) -> None:
+        """Process one message for the dispatcher and reply to the chat it came from."""
+        if not self.agent.breaker.allow():
+            await self.outbox.send(BREAKER_OPEN_REPLY, chat_id)
+            return
+        status = LiveStatus(
+            self.bot, chat_id,
+            min_interval=self.config.telegram_edit_interval, acquire=self.outbox.acquire,
+        )
+        await status.start()
+
+        self._in_flight += 1
+        result = None
+        try:
+            result = await self._process_admitted(text, "telegram", status.on_event, chat_id)
+        finally:
+            self._in_flight -= 1
+            self._last_activity = time.monotonic()
+            await status.finish("✅ Done" if result else "❌ Failed")
+
+        if result:
+            await self.outbox.send(result.response, chat_id)
+
+            if result.pending_messages and self.config.telegram_chat_id:
+                for msg in result.pending_messages:
+                    await self.outbox.send(msg)
+
+    def is_idle(self) -> bool:
+        return (
+            self._in_flight == 0
+            and time.monotonic() - self._last_activity >= IDLE_THRESHOLD
+        )
+
+    def run_maintenance(self) -> int:
+        """Archive finished tasks, reclaim disk space and compact memory."""
+        archived = self.agent.mailbox.archive(self.retention)
+        self.agent.mailbox.vacuum()
+        log.info("Maintenance: archived %d task(s)", archived)
+        compact(self.agent.memory, self.compaction)
+        return archived
+
+    def collect_metrics(self) -> list[str]:
+        """Scrape-time gauges: queue depth, in-flight tasks, breaker, memory sizes."""
+        counts = self.agent.mailbox.status_counts()
+        sizes = {
+            (path.relative_to(self.agent.memory.memory_dir).as_posix(),): path.stat().st_size
+            for path in self.agent.memory.paths()
+            if path.exists()
+        }
+        return [
+            *gauge("agentkit_tasks", "Live tasks by status.",
+                   {(status,): n for status, n in counts.items()}, ("status",)),
+            *gauge("agentkit_tasks_in_flight", "Tasks being processed by the daemon.",
+                   {(): self._in_flight}),
+            *gauge("agentkit_circuit_open", "1 while the Claude circuit breaker is open.",
+                   {(): int(self.agent.breaker.is_open())}),
+            *gauge("agentkit_memory_file_bytes", "Size of each memory file.", sizes, ("file",)),
+            *gauge("agentkit_telegram_outbox", "Outbound Telegram messages not yet delivered.",
+                   {(): len(self.outbox.outbox) if self.outbox else 0}),
+        ]
+
+    async def _maintenance_loop(self) -> None:
+        while True:
+            await asyncio.sleep(MAINTENANCE_INTERVAL)
+            if self.is_idle():
+                await asyncio.to_thread(self.run_maintenance)
 
     def run(self) -> None:
         """Start Telegram polling. Blocks forever."""
@@ -37,35 +180,57 @@ class Daemon:
         asyncio.run(self._run_async())
 
     async def _run_async(self) -> None:
-        app = ApplicationBuilder().token(self.config.telegram_bot_token).build()
+        # Each chat being handled needs a connection for its live status edits
+        # and one for the reply.
+        app = (
+            ApplicationBuilder()
+            .token(self.config.telegram_bot_token)
+            .connection_pool_size(max(POOL_SIZE, 2 * self.config.telegram_concurrency))
+            .build()
+        )
+        # One HTTP client for polling and sending; the app opens and closes it.
+        self.bot = TelegramBot(
+            self.config.telegram_bot_token, self.config.telegram_chat_id, bot=app.bot
+        )
+        self.outbox = SendQueue(
+            self.bot,
+            Outbox(self.config.outbox_path),
+            SendLimits(rate=self.config.telegram_rate, chat_rate=self.config.telegram_chat_rate),
+            document_threshold=self.config.telegram_document_threshold,
+        )
+        if self.config.warm_pool_size:
+            self.agent.pool = WarmPool(self.config.warm_pool_size)  # closed on shutdown
 
         async def on_message(update: Update, context) -> None:
             if not update.message or not update.message.text:
                 return
-
-            user_text = update.message.text
             chat_id = str(update.message.chat_id)
-            log.info("Received from chat %s: %s", chat_id, user_text[:80])
+            log.info("Received from chat %s: %s", chat_id, update.message.text[:80])
+            self._last_activity = time.monotonic()
+            self.dispatcher.submit(chat_id, update.message.text)
 
-            result = await asyncio.to_thread(self.handle_message, user_text)
-
-            if result:
-                bot = TelegramBot(self.config.telegram_bot_token, chat_id)
-                await bot.send(result.response)
-
-                if result.pending_messages and self.config.telegram_chat_id:
-                    notify_bot = TelegramBot(
-                        self.config.telegram_bot_token, self.config.telegram_chat_id
-                    )
-                    for msg in result.pending_messages:
-                        await notify_bot.send(msg)
+        async def on_new(update: Update, context) -> None:
+            if not update.message:
+                return
+            if self.agent.sessions:
+                self.agent.sessions.drop(str(update.message.chat_id))
+            await self.outbox.send("Starting a new conversation.", str(update.message.chat_id))
 
+        app.add_handler(CommandHandler("new", on_new))
         app.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, on_message))
         log.info("Telegram polling started — endless loop")
 
+        metrics_server = None
+        if self.config.metrics_port:
+            metrics_server = MetricsServer(self.config.metrics_port)
+            REGISTRY.add_collector(self.collect_metrics)
+            metrics_server.start()
+
         async with app:
             await app.start()
             await app.updater.start_polling()
+            maintenance = asyncio.create_task(self._maintenance_loop())
+            sender = asyncio.create_task(self.outbox.run())  # also resends what a restart left
 
             stop_event = asyncio.Event()
             loop = asyncio.get_event_loop()
@@ -73,5 +238,20 @@ class Daemon:
                 loop.add_signal_handler(sig, stop_event.set)
 
             await stop_event.wait()
+            maintenance.cancel()
             await app.updater.stop()
             await app.stop()
+            log.info("Waiting for in-flight chat messages")
+            await self.dispatcher.join()
+            sender.cancel()
+            # Whatever is still queued after this is delivered on the next start.
+            with contextlib.suppress(TimeoutError):
+                await asyncio.wait_for(self.outbox.flush(), SHUTDOWN_FLUSH)
+            self.outbox.outbox.close()
+            self.mailbox.close()
+            if metrics_server:
+                metrics_server.close()
+                REGISTRY.remove_collector(self.collect_metrics)
+            if self.agent.pool:
+                log.info("Warm pool stats: %s", self.agent.pool.stats())
+                self.agent.pool.close()
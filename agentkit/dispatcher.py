@@ -0,0 +1,83 @@
+"""Chat dispatcher — concurrent across chats, strictly ordered within one.
+
+Each chat with queued messages has one worker task draining its queue in
+arrival order; a shared semaphore bounds how many chats are being handled
+at once. Workers exit when their queue runs dry, so idle chats cost nothing.
+
+With a debounce window set, bursts are coalesced: a worker waits until its
+chat has been quiet for the window, then hands every queued message to the
+handler as one text. Messages that arrive while the chat's previous task is
+running are folded into the next one the same way. With no window (0, the
+default) every message is handled on its own.
+"""
+
+import asyncio
+import logging
+from collections.abc import Awaitable, Callable
+
+from agentkit.metrics import MESSAGES_COALESCED
+
+log = logging.getLogger(__name__)
+
+Handler = Callable[[str, str], Awaitable[None]]
+
+MAX_DEBOUNCE_ROUNDS = 5  # a chatty user still gets an answer after 5 windows
+
+
+class ChatDispatcher:
+    def __init__(self, handler: Handler, max_concurrency: int = 4, debounce: float = 0.0):
+        self.handler = handler
+        self.max_concurrency = max_concurrency
+        self.debounce = debounce
+        self._slots = asyncio.Semaphore(max_concurrency)
+        self._queues: dict[str, asyncio.Queue] = {}
+        self._workers: dict[str, asyncio.Task] = {}
+
+    def submit(self, chat_id: str, text: str) -> None:
+        """Queue a message for its chat; returns immediately."""
+        queue = self._queues.get(chat_id)
+        if queue is None:
+            queue = self._queues[chat_id] = asyncio.Queue()
+        queue.put_nowait(text)
+        if chat_id not in self._workers:
+            self._workers[chat_id] = asyncio.create_task(self._work(chat_id, queue))
+
+    def pending(self, chat_id: str) -> int:
+        queue = self._queues.get(chat_id)
+        return queue.qsize() if queue else 0
+
+    async def _work(self, chat_id: str, queue: asyncio.Queue) -> None:
+        try:
+            while not queue.empty():
+                if self.debounce:
+                    await self._settle(queue)
+                    texts = [queue.get_nowait() for _ in range(queue.qsize())]
+                else:
+                    texts = [queue.get_nowait()]
+                if len(texts) > 1:
+                    log.info("Coalesced %d messages for chat %s", len(texts), chat_id)
+                    MESSAGES_COALESCED.inc(len(texts) - 1)
+                text = "\n\n".join(texts)
+                async with self._slots:
+                    try:
+                        await self.handler(chat_id, text)
+                    except Exception:
+                        log.exception("Handling message for chat %s failed", chat_id)
+        finally:
+            # No await between the empty check and here, so submit() can't slip
+            # a message in unseen: it either sees this worker or starts a new one.
+            del self._workers[chat_id]
+            del self._queues[chat_id]
+
+    async def _settle(self, queue: asyncio.Queue) -> None:
+        """Wait until no message has arrived for one debounce window."""
+        for _ in range(MAX_DEBOUNCE_ROUNDS):
+            size = queue.qsize()
+            await asyncio.sleep(self.debounce)
+            if queue.qsize() == size:
+                return
+
+    async def join(self) -> None:
+        """Wait until every queued message has been handled."""
+        while self._workers:
+            await asyncio.gather(*self._workers.values())
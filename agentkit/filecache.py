@@ -0,0 +1,52 @@
+"""File-content cache — re-reads a file only when its mtime or size changes."""
+
+import os
+import threading
+from pathlib import Path
+
+# (mtime_ns, size) of a file, or None when it does not exist.
+Signature = tuple[int, int] | None
+
+
+class FileCache:
+    def __init__(self):
+        self._entries: dict[Path, tuple[Signature, str]] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def signature(path: Path) -> Signature:
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            return None
+        return st.st_mtime_ns, st.st_size
+
+    def read(self, path: Path) -> str:
+        """Return the file's text ("" if missing), served from cache while unchanged."""
+        sig = self.signature(path)
+        if sig is None:
+            self.invalidate(path)
+            return ""
+        with self._lock:
+            entry = self._entries.get(path)
+            if entry is not None and entry[0] == sig:
+                self.hits += 1
+                return entry[1]
+        try:
+            text = path.read_text()
+        except FileNotFoundError:
+            return ""
+        with self._lock:
+            self.misses += 1
+            self._entries[path] = (sig, text)
+        return text
+
+    def invalidate(self, path: Path | None = None) -> None:
+        """Drop one cached path, or everything when path is None."""
+        with self._lock:
+            if path is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(path, None)
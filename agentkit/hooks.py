@@ -0,0 +1,217 @@
+"""Profiling hooks — timers, span export and a sampling profiler for the hot path.
+
+Functions marked with `@traced("name")` report each call to the installed
+hooks. With no hooks installed a call costs one list check on top of the
+call itself. Enable hooks with AGENT_HOOKS (see `session`):
+
+  timers   call count, total and max time per traced name, logged at exit
+  spans    one OpenTelemetry-style JSON span per call, appended to spans_path
+  sampler  sampling profiler writing folded stacks (flamegraph input) at exit
+"""
+
+import contextlib
+import contextvars
+import functools
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+
+log = logging.getLogger(__name__)
+
+_HOOKS: list["Hook"] = []
+
+
+class Hook:
+    """Receives start/end of every traced call. Subclasses override both."""
+
+    def start(self, name: str) -> object:
+        return None
+
+    def end(self, name: str, state: object, error: BaseException | None) -> None:
+        pass
+
+
+def install(hook: Hook) -> None:
+    _HOOKS.append(hook)
+
+
+def uninstall(hook: Hook) -> None:
+    _HOOKS.remove(hook)
+
+
+def traced(name: str):
+    """Report calls of the decorated function to installed hooks as `name`."""
+
+    def decorate(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not _HOOKS:
+                return fn(*args, **kwargs)
+            hooks = list(_HOOKS)
+            states = [hook.start(name) for hook in hooks]
+            error = None
+            try:
+                return fn(*args, **kwargs)
+            except BaseException as e:
+                error = e
+                raise
+            finally:
+                for hook, state in zip(reversed(hooks), reversed(states)):
+                    hook.end(name, state, error)
+
+        return wrapper
+
+    return decorate
+
+
+class TimerHook(Hook):
+    """Aggregates count, total and max wall time per traced name."""
+
+    def __init__(self):
+        self.stats: dict[str, list[float]] = {}  # name -> [count, total, max]
+        self._lock = threading.Lock()
+
+    def start(self, name: str) -> float:
+        return time.perf_counter()
+
+    def end(self, name: str, state: float, error: BaseException | None) -> None:
+        elapsed = time.perf_counter() - state
+        with self._lock:
+            entry = self.stats.setdefault(name, [0, 0.0, 0.0])
+            entry[0] += 1
+            entry[1] += elapsed
+            entry[2] = max(entry[2], elapsed)
+
+    def report(self) -> str:
+        lines = [f"{'name':<32} {'calls':>7} {'total ms':>10} {'mean ms':>9} {'max ms':>9}"]
+        for name, (count, total, longest) in sorted(
+            self.stats.items(), key=lambda item: -item[1][1]
+        ):
+            lines.append(
+                f"{name:<32} {count:>7} {1000 * total:>10.1f} "
+                f"{1000 * total / count:>9.2f} {1000 * longest:>9.2f}"
+            )
+        return "\n".join(lines)
+
+
+_current_span: contextvars.ContextVar[tuple[str, str] | None] = contextvars.ContextVar(
+    "agentkit_span", default=None
+)
+
+
+class SpanExporter(Hook):
+    """Writes one JSON line per span in the OTLP/JSON span shape.
+
+    Nested traced calls share a traceId and link to their parent through
+    parentSpanId; context follows asyncio tasks and asyncio.to_thread.
+    """
+
+    def __init__(self, path: Path, service: str = "agentkit"):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.service = service
+        self._file = open(path, "a")
+        self._lock = threading.Lock()
+
+    def start(self, name: str) -> tuple:
+        parent = _current_span.get()
+        trace_id = parent[0] if parent else os.urandom(16).hex()
+        span_id = os.urandom(8).hex()
+        token = _current_span.set((trace_id, span_id))
+        return trace_id, span_id, parent[1] if parent else "", time.time_ns(), token
+
+    def end(self, name: str, state: tuple, error: BaseException | None) -> None:
+        trace_id, span_id, parent_id, started, token = state
+        ended = time.time_ns()
+        with contextlib.suppress(ValueError):  # reset from another context
+            _current_span.reset(token)
+        span = {
+            "traceId": trace_id,
+            "spanId": span_id,
+            "parentSpanId": parent_id,
+            "name": name,
+            "kind": 1,  # SPAN_KIND_INTERNAL
+            "startTimeUnixNano": str(started),
+            "endTimeUnixNano": str(ended),
+            "attributes": [
+                {"key": "service.name", "value": {"stringValue": self.service}},
+                {"key": "thread.name", "value": {"stringValue": threading.current_thread().name}},
+            ],
+            "status": {"code": 2, "message": str(error)} if error else {"code": 1},
+        }
+        line = json.dumps(span) + "\n"
+        with self._lock:
+            self._file.write(line)
+            self._file.flush()
+
+    def close(self) -> None:
+        with self._lock:
+            self._file.close()
+
+
+class SamplingProfiler:
+    """Samples every thread's stack at a fixed interval; writes folded stacks."""
+
+    def __init__(self, interval: float = 0.005):
+        self.interval = interval
+        self.samples: Counter[str] = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def _run(self) -> None:
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{Path(code.co_filename).name}:{code.co_name}")
+                    frame = frame.f_back
+                self.samples[";".join(reversed(stack))] += 1
+
+    def stop(self, path: Path | None = None) -> None:
+        """Stop sampling; write `stack count` lines to path when given."""
+        self._stop.set()
+        self._thread.join()
+        if path is not None:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_text(
+                "".join(f"{stack} {count}\n" for stack, count in self.samples.most_common())
+            )
+
+
+@contextlib.contextmanager
+def session(config):
+    """Install the hooks named in config.hooks for the duration of the block."""
+    names = config.hooks
+    timers = TimerHook() if "timers" in names else None
+    spans = SpanExporter(config.spans_path) if "spans" in names else None
+    sampler = SamplingProfiler() if "sampler" in names else None
+    for hook in (timers, spans):
+        if hook:
+            install(hook)
+    if sampler:
+        sampler.start()
+    try:
+        yield
+    finally:
+        for hook in (timers, spans):
+            if hook:
+                uninstall(hook)
+        if timers and timers.stats:
+            log.info("Hook timers:\n%s", timers.report())
+        if spans:
+            spans.close()
+            log.info("Spans written to %s", config.spans_path)
+        if sampler:
+            sampler.stop(config.profile_samples_path)
+            log.info("Profile samples written to %s", config.profile_samples_path)
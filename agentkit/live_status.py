@@ -0,0 +1,119 @@
+"""Live status — a Telegram message edited in place while Claude works.
+
+Stream-json events arrive on the worker thread; they are summarised into
+short status lines and flushed to Telegram at most once per `min_interval`
+seconds, however many events arrive in between.
+"""
+
+import asyncio
+import time
+from collections.abc import Awaitable, Callable
+
+from agentkit.telegram_bot import TelegramBot
+
+MAX_STATUS_LINES = 8
+MAX_LINE_LENGTH = 120
+
+
+def _shorten(text: str) -> str:
+    text = " ".join(text.split())
+    return text if len(text) <= MAX_LINE_LENGTH else text[: MAX_LINE_LENGTH - 1] + "…"
+
+
+def describe_event(event: dict) -> list[str]:
+    """Status lines for one stream-json event (tool calls and assistant text)."""
+    if event.get("type") != "assistant":
+        return []
+    message = event.get("message")
+    content = message.get("content", []) if isinstance(message, dict) else []
+    lines = []
+    for block in content:
+        if not isinstance(block, dict):
+            continue
+        if block.get("type") == "tool_use":
+            tool_input = block.get("input") or {}
+            detail = next(iter(tool_input.values()), "") if isinstance(tool_input, dict) else ""
+            lines.append(_shorten(f"🔧 {block.get('name', 'tool')}: {detail}"))
+        elif block.get("type") == "text" and block.get("text", "").strip():
+            lines.append(_shorten(f"💬 {block['text']}"))
+    return lines
+
+
+class LiveStatus:
+    """Status message for one chat. `acquire(chat_id)`, when given, is awaited
+    before every send and edit so updates share the outbound rate limits."""
+
+    def __init__(
+        self,
+        bot: TelegramBot,
+        chat_id: str,
+        *,
+        min_interval: float = 3.0,
+        header: str = "⏳ Working…",
+        acquire: Callable[[str], Awaitable[None]] | None = None,
+    ):
+        self.bot = bot
+        self.chat_id = chat_id
+        self.min_interval = min_interval
+        self.header = header
+        self.acquire = acquire
+        self.edits = 0
+        self._lines: list[str] = []
+        self._message_id: int | None = None
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._flush_handle: asyncio.TimerHandle | None = None
+        self._flush_task: asyncio.Task | None = None
+        self._last_edit = 0.0
+        self._rendered = ""
+
+    async def start(self) -> None:
+        self._loop = asyncio.get_running_loop()
+        await self._throttle()
+        self._message_id = await self.bot.send(self.header, self.chat_id)
+        self._last_edit = time.monotonic()
+
+    def on_event(self, event: dict) -> None:
+        """Thread-safe stream-json callback for invoke_claude."""
+        lines = describe_event(event)
+        if lines and self._loop is not None:
+            self._loop.call_soon_threadsafe(self._push, lines)
+
+    def _push(self, lines: list[str]) -> None:
+        self._lines = (self._lines + lines)[-MAX_STATUS_LINES:]
+        if self._message_id is None or self._flush_handle is not None:
+            return
+        delay = max(0.0, self._last_edit + self.min_interval - time.monotonic())
+        self._flush_handle = self._loop.call_later(delay, self._start_flush)
+
+    def _start_flush(self) -> None:
+        self._flush_task = asyncio.ensure_future(self._flush())
+
+    def _render(self) -> str:
+        return "\n".join([self.header, *self._lines])
+
+    async def _flush(self) -> None:
+        self._flush_handle = None
+        text = self._render()
+        if text == self._rendered:
+            return
+        self._rendered = text
+        self._last_edit = time.monotonic()
+        self.edits += 1
+        await self._throttle()
+        await self.bot.edit(self._message_id, text, self.chat_id)
+
+    async def finish(self, summary: str) -> None:
+        """Cancel pending updates and leave a final one-line summary."""
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        if self._flush_task is not None:
+            await self._flush_task  # never let a late progress edit overwrite the summary
+        if self._message_id is not None:
+            self.edits += 1
+            await self._throttle()
+            await self.bot.edit(self._message_id, summary, self.chat_id)
+
+    async def _throttle(self) -> None:
+        if self.acquire is not None:
+            await self.acquire(self.chat_id)
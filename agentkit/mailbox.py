@@ -1,10 +1,24 @@
 """Mailbox — SQLite-backed task queue."""
 
+import asyncio
+import functools
+import json
+import logging
 import sqlite3
 import threading
-from datetime import datetime, timezone
+import time
+import zlib
+from collections.abc import Iterable
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
 from pathlib import Path
 
+from agentkit.hooks import traced
+from agentkit.schema import migrate
+
+log = logging.getLogger(__name__)
+
 
 class TaskStatus:
     PENDING = "pending"
@@ -13,79 +27,464 @@ class TaskStatus:
     FAILED = "failed"
 
 
+FINISHED_STATUSES = (TaskStatus.DONE, TaskStatus.FAILED)
+ARCHIVE_BATCH_SIZE = 500
+AUTO_VACUUM_INCREMENTAL = 2  # PRAGMA auto_vacuum value
+
+# Dequeue lanes, keyed by source prefix. Weights drive the weighted-fair choice
+# between lanes; interactive chat gets the largest share.
+LANE_WEIGHTS = {"telegram": 8, "cli": 4, "default": 2, "cron": 1}
+DEFAULT_LANE = "default"
+STARVATION_SECONDS = 600  # a lane head older than this is served next regardless of weight
+
+
+def lane_for(source: str) -> str:
+    """Map a task source (e.g. "cron-evaluate") to its dequeue lane."""
+    for lane in LANE_WEIGHTS:
+        if lane != DEFAULT_LANE and source.startswith(lane):
+            return lane
+    return DEFAULT_LANE
+
+
+@dataclass
+class RetentionPolicy:
+    """Which finished tasks stay live in `tasks`; the rest move to `tasks_archive`."""
+
+    max_age_days: int | None = 30
+    keep_last: int | None = 1000
+
+
+# Schema migrations, applied in order. The database's PRAGMA user_version records
+# how many have run, so each one executes exactly once per database.
+MIGRATIONS: list[tuple[str, ...]] = [
+    # 1 — base table
+    (
+        """
+        CREATE TABLE IF NOT EXISTS tasks (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            content TEXT NOT NULL,
+            source TEXT NOT NULL,
+            status TEXT NOT NULL DEFAULT 'pending',
+            result TEXT,
+            created_at TEXT NOT NULL,
+            updated_at TEXT NOT NULL
+        )
+        """,
+    ),
+    # 2 — partial index so dequeue never scans finished history
+    (
+        "CREATE INDEX IF NOT EXISTS idx_tasks_pending ON tasks (id) WHERE status = 'pending'",
+    ),
+    # 3 — compressed archive for finished tasks; incremental vacuum (switched on
+    #     by Mailbox.vacuum, since VACUUM can't run in a transaction) reclaims their pages
+    (
+        """
+        CREATE TABLE IF NOT EXISTS tasks_archive (
+            id INTEGER PRIMARY KEY,
+            source TEXT NOT NULL,
+            status TEXT NOT NULL,
+            created_at TEXT NOT NULL,
+            updated_at TEXT NOT NULL,
+            payload BLOB NOT NULL
+        )
+        """,
+    ),
+    # 4 — priorities and per-source lanes; one pending index serves every lane head
+    (
+        "ALTER TABLE tasks ADD COLUMN priority INTEGER NOT NULL DEFAULT 0",
+        f"ALTER TABLE tasks ADD COLUMN lane TEXT NOT NULL DEFAULT '{DEFAULT_LANE}'",
+        """
+        UPDATE tasks SET lane = CASE
+            WHEN source LIKE 'telegram%' THEN 'telegram'
+            WHEN source LIKE 'cli%' THEN 'cli'
+            WHEN source LIKE 'cron%' THEN 'cron'
+            ELSE 'default'
+        END
+        """,
+        "DROP INDEX IF EXISTS idx_tasks_pending",
+        "CREATE INDEX IF NOT EXISTS idx_tasks_pending_lane "
+        "ON tasks (lane, priority DESC, id) WHERE status = 'pending'",
+    ),
+    # 5 — claim time, so run durations can be measured per source
+    (
+        "ALTER TABLE tasks ADD COLUMN started_at TEXT",
+    ),
+    # 6 — per-task phase timings and token usage; kept when tasks are archived
+    (
+        """
+        CREATE TABLE IF NOT EXISTS task_metrics (
+            task_id INTEGER PRIMARY KEY,
+            source TEXT NOT NULL,
+            profile TEXT NOT NULL,
+            status TEXT NOT NULL,
+            cache_hit INTEGER NOT NULL DEFAULT 0,
+            dequeue_ms REAL NOT NULL DEFAULT 0,
+            prompt_ms REAL NOT NULL DEFAULT 0,
+            spawn_ms REAL NOT NULL DEFAULT 0,
+            first_event_ms REAL NOT NULL DEFAULT 0,
+            claude_ms REAL NOT NULL DEFAULT 0,
+            memory_ms REAL NOT NULL DEFAULT 0,
+            total_ms REAL NOT NULL DEFAULT 0,
+            input_tokens INTEGER NOT NULL DEFAULT 0,
+            output_tokens INTEGER NOT NULL DEFAULT 0,
+            cache_read_tokens INTEGER NOT NULL DEFAULT 0,
+            cache_creation_tokens INTEGER NOT NULL DEFAULT 0,
+            cost_usd REAL NOT NULL DEFAULT 0,
+            num_turns INTEGER NOT NULL DEFAULT 0,
+            created_at TEXT NOT NULL
+        )
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_task_metrics_created ON task_metrics (created_at)",
+    ),
+    # 7 — partial index so the per-task duration lookup never scans other sources
+    (
+        "CREATE INDEX IF NOT EXISTS idx_tasks_done_source "
+        "ON tasks (source, id) WHERE status = 'done'",
+    ),
+]
+
+
 class Mailbox:
-    def __init__(self, db_path: Path):
+    def __init__(
+        self,
+        db_path: Path,
+        *,
+        synchronous: str = "NORMAL",
+        lane_weights: dict[str, int] | None = None,
+        starvation_seconds: float = STARVATION_SECONDS,
+    ):
         db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.db_path = db_path
         self.conn = sqlite3.connect(str(db_path), check_same_thread=False)
         self.conn.row_factory = sqlite3.Row
+        # Takes effect only on a brand-new file, and only before WAL initialises it;
+        # an existing database is converted by vacuum().
+        self.conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+        # WAL lets readers proceed during writes; NORMAL sync is durable across
+        # application crashes and only risks the last commits on power loss.
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(f"PRAGMA synchronous={synchronous}")
         self._lock = threading.Lock()
+        self._readers = threading.local()
+        self.lane_weights = {**LANE_WEIGHTS, **(lane_weights or {})}
+        self.starvation_seconds = starvation_seconds
+        self._lane_credit = dict.fromkeys(self.lane_weights, 0)
         self._migrate()
 
+    def _reader(self) -> sqlite3.Connection:
+        """Per-thread read-only connection — under WAL, reads never wait on the writer."""
+        conn = getattr(self._readers, "conn", None)
+        if conn is None:
+            uri = f"{self.db_path.resolve().as_uri()}?mode=ro"
+            conn = sqlite3.connect(uri, uri=True)
+            conn.row_factory = sqlite3.Row
+            self._readers.conn = conn
+        return conn
+
+    @property
+    def schema_version(self) -> int:
+        return self.conn.execute("PRAGMA user_version").fetchone()[0]
+
     def _migrate(self) -> None:
-        self.conn.execute("""
-            CREATE TABLE IF NOT EXISTS tasks (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                content TEXT NOT NULL,
-                source TEXT NOT NULL,
-                status TEXT NOT NULL DEFAULT 'pending',
-                result TEXT,
-                created_at TEXT NOT NULL,
-                updated_at TEXT NOT NULL
-            )
-        """)
-        self.conn.commit()
+        with self._lock:
+            migrate(self.conn, MIGRATIONS)
 
-    def enqueue(self, content: str, source: str) -> int:
+    @traced("mailbox.enqueue")
+    def enqueue(self, content: str, source: str, priority: int = 0) -> int:
+        return self.enqueue_many([content], source=source, priority=priority)[0]
+
+    @traced("mailbox.enqueue_many")
+    def enqueue_many(self, contents: Iterable[str], source: str, priority: int = 0) -> list[int]:
+        """Enqueue several tasks in a single transaction. Returns their ids."""
+        lane = lane_for(source)
         with self._lock:
             now = datetime.now(timezone.utc).isoformat()
-            cursor = self.conn.execute(
-                "INSERT INTO tasks (content, source, status, created_at, updated_at) VALUES (?, ?, ?, ?, ?)",
-                (content, source, TaskStatus.PENDING, now, now),
-            )
+            ids = []
+            for content in contents:
+                cursor = self.conn.execute(
+                    "INSERT INTO tasks "
+                    "(content, source, lane, priority, status, created_at, updated_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (content, source, lane, priority, TaskStatus.PENDING, now, now),
+                )
+                ids.append(cursor.lastrowid)
             self.conn.commit()
-            return cursor.lastrowid
+            return ids
 
+    @traced("mailbox.dequeue")
     def dequeue(self) -> dict | None:
+        """Claim the next pending task.
+
+        The lane is chosen by smooth weighted round-robin over lanes with pending
+        work, except that a lane whose head has waited past `starvation_seconds`
+        is served first. Within a lane, higher priority wins, then FIFO.
+
+        The claim is a single ``UPDATE ... RETURNING`` statement, so concurrent
+        workers — even in other processes with their own connection — can never
+        take the same row.
+        """
         with self._lock:
-            row = self.conn.execute(
-                "SELECT * FROM tasks WHERE status = ? ORDER BY id ASC LIMIT 1",
-                (TaskStatus.PENDING,),
-            ).fetchone()
-            if row is None:
-                return None
+            while True:
+                heads = self._lane_heads()
+                if not heads:
+                    return None
+                lane = self._pick_lane(heads)
+                now = datetime.now(timezone.utc).isoformat()
+                # The status literal (not a bound parameter) lets SQLite pick the
+                # partial index idx_tasks_pending_lane.
+                row = self.conn.execute(
+                    """
+                    UPDATE tasks SET status = ?, updated_at = ?, started_at = ?
+                    WHERE id = (
+                        SELECT id FROM tasks WHERE status = 'pending' AND lane = ?
+                        ORDER BY priority DESC, id ASC LIMIT 1
+                    )
+                    RETURNING *
+                    """,
+                    (TaskStatus.PROCESSING, now, now, lane),
+                ).fetchone()
+                self.conn.commit()
+                if row is not None:
+                    return dict(row)
+                # Another connection emptied the lane between peek and claim — retry.
 
-            task = dict(row)
+    @traced("mailbox.claim")
+    def claim(self, task_id: int) -> dict | None:
+        """Claim one specific pending task; None if it is gone or already taken."""
+        with self._lock:
             now = datetime.now(timezone.utc).isoformat()
-            self.conn.execute(
-                "UPDATE tasks SET status = ?, updated_at = ? WHERE id = ?",
-                (TaskStatus.PROCESSING, now, task["id"]),
-            )
+            row = self.conn.execute(
+                "UPDATE tasks SET status = ?, updated_at = ?, started_at = ? "
+                "WHERE id = ? AND status = 'pending' RETURNING *",
+                (TaskStatus.PROCESSING, now, now, task_id),
+            ).fetchone()
             self.conn.commit()
-            task["status"] = TaskStatus.PROCESSING
-            task["updated_at"] = now
-            return task
+            return dict(row) if row is not None else None
+
+    def _lane_heads(self) -> dict[str, str]:
+        """created_at of each non-empty lane's head task — one index probe per lane."""
+        heads = {}
+        for lane in self.lane_weights:
+            row = self.conn.execute(
+                "SELECT created_at FROM tasks WHERE status = 'pending' AND lane = ? "
+                "ORDER BY priority DESC, id ASC LIMIT 1",
+                (lane,),
+            ).fetchone()
+            if row is not None:
+                heads[lane] = row["created_at"]
+        return heads
+
+    def _pick_lane(self, heads: dict[str, str]) -> str:
+        cutoff = datetime.now(timezone.utc) - timedelta(seconds=self.starvation_seconds)
+        starving = [lane for lane, created in heads.items() if created < cutoff.isoformat()]
+        if starving:
+            return min(starving, key=heads.__getitem__)
+
+        total = 0
+        for lane in self.lane_weights:
+            if lane not in heads:
+                self._lane_credit[lane] = 0
+                continue
+            self._lane_credit[lane] += self.lane_weights[lane]
+            total += self.lane_weights[lane]
+        lane = max(heads, key=self._lane_credit.__getitem__)
+        self._lane_credit[lane] -= total
+        return lane
 
     def complete(self, task_id: int, result: str = "") -> None:
+        self.complete_many([(task_id, result)])
+
+    def complete_many(self, results: Iterable[tuple[int, str]]) -> None:
+        """Mark several tasks done in a single transaction."""
+        self._finish_many(TaskStatus.DONE, results)
+
+    def fail(self, task_id: int, error: str = "") -> None:
+        self._finish_many(TaskStatus.FAILED, [(task_id, error)])
+
+    @traced("mailbox.finish")
+    def _finish_many(self, status: str, results: Iterable[tuple[int, str]]) -> None:
         with self._lock:
             now = datetime.now(timezone.utc).isoformat()
-            self.conn.execute(
+            self.conn.executemany(
                 "UPDATE tasks SET status = ?, result = ?, updated_at = ? WHERE id = ?",
-                (TaskStatus.DONE, result, now, task_id),
+                [(status, result, now, task_id) for task_id, result in results],
             )
             self.conn.commit()
 
-    def fail(self, task_id: int, error: str = "") -> None:
+    def status_counts(self) -> dict[str, int]:
+        """Number of live tasks in each status."""
+        rows = self._reader().execute(
+            "SELECT status, COUNT(*) FROM tasks GROUP BY status"
+        ).fetchall()
+        return {status: count for status, count in rows}
+
+    def recent_durations(self, source: str, limit: int = 50) -> list[float]:
+        """Seconds from claim to completion of the last `limit` done tasks from source."""
+        rows = self._reader().execute(
+            "SELECT (julianday(updated_at) - julianday(started_at)) * 86400 FROM tasks "
+            # status is a literal so the planner can use idx_tasks_done_source
+            "WHERE source = ? AND status = 'done' AND started_at IS NOT NULL "
+            "ORDER BY id DESC LIMIT ?",
+            (source, limit),
+        ).fetchall()
+        return [row[0] for row in rows]
+
+    @traced("mailbox.record_metrics")
+    def record_metrics(self, row: dict) -> None:
+        """Store one task's telemetry row (see agentkit.telemetry.TaskMetrics)."""
+        columns = ", ".join(row)
+        placeholders = ", ".join("?" for _ in row)
         with self._lock:
-            now = datetime.now(timezone.utc).isoformat()
             self.conn.execute(
-                "UPDATE tasks SET status = ?, result = ?, updated_at = ? WHERE id = ?",
-                (TaskStatus.FAILED, error, now, task_id),
+                f"INSERT OR REPLACE INTO task_metrics ({columns}) VALUES ({placeholders})",
+                tuple(row.values()),
             )
             self.conn.commit()
 
+    def metrics(self, *, since: str | None = None, profile: str | None = None) -> list[dict]:
+        """Telemetry rows created at or after `since` (ISO timestamp), oldest first."""
+        conditions, params = [], []
+        if since is not None:
+            conditions.append("created_at >= ?")
+            params.append(since)
+        if profile is not None:
+            conditions.append("profile = ?")
+            params.append(profile)
+        where = f"WHERE {' AND '.join(conditions)} " if conditions else ""
+        rows = self._reader().execute(
+            f"SELECT * FROM task_metrics {where}ORDER BY created_at", params
+        ).fetchall()
+        return [dict(row) for row in rows]
+
+    @traced("mailbox.history")
     def history(self, limit: int = 10) -> list[dict]:
-        rows = self.conn.execute(
+        rows = self._reader().execute(
             "SELECT * FROM tasks ORDER BY id DESC LIMIT ?",
             (limit,),
         ).fetchall()
         return [dict(row) for row in rows]
+
+    @traced("mailbox.archive")
+    def archive(self, policy: RetentionPolicy) -> int:
+        """Move finished tasks outside the retention policy into `tasks_archive`.
+
+        Content and result are stored as zlib-compressed JSON. Work is done in
+        batches so the write lock is never held for long. Returns rows archived.
+        """
+        conditions, params = [], []
+        if policy.max_age_days is not None:
+            cutoff = datetime.now(timezone.utc) - timedelta(days=policy.max_age_days)
+            conditions.append("updated_at < ?")
+            params.append(cutoff.isoformat())
+        if policy.keep_last is not None:
+            row = self._reader().execute(
+                "SELECT id FROM tasks WHERE status IN (?, ?) ORDER BY id DESC LIMIT 1 OFFSET ?",
+                (*FINISHED_STATUSES, policy.keep_last),
+            ).fetchone()
+            if row is not None:
+                conditions.append("id <= ?")
+                params.append(row["id"])
+        if not conditions:
+            return 0
+
+        query = (
+            f"SELECT * FROM tasks WHERE status IN (?, ?) AND ({' OR '.join(conditions)}) "
+            "ORDER BY id LIMIT ?"
+        )
+        archived = 0
+        while True:
+            with self._lock:
+                rows = self.conn.execute(
+                    query, (*FINISHED_STATUSES, *params, ARCHIVE_BATCH_SIZE)
+                ).fetchall()
+                if not rows:
+                    return archived
+                self.conn.executemany(
+                    "INSERT OR REPLACE INTO tasks_archive "
+                    "(id, source, status, created_at, updated_at, payload) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    [
+                        (
+                            row["id"], row["source"], row["status"],
+                            row["created_at"], row["updated_at"],
+                            zlib.compress(json.dumps(
+                                {"content": row["content"], "result": row["result"]}
+                            ).encode()),
+                        )
+                        for row in rows
+                    ],
+                )
+                self.conn.executemany(
+                    "DELETE FROM tasks WHERE id = ?", [(row["id"],) for row in rows]
+                )
+                self.conn.commit()
+                archived += len(rows)
+
+    def archived(self, limit: int = 10) -> list[dict]:
+        """Most recently archived tasks, decompressed to the `history()` shape."""
+        rows = self._reader().execute(
+            "SELECT * FROM tasks_archive ORDER BY id DESC LIMIT ?",
+            (limit,),
+        ).fetchall()
+        tasks = []
+        for row in rows:
+            task = dict(row)
+            task.update(json.loads(zlib.decompress(task.pop("payload"))))
+            tasks.append(task)
+        return tasks
+
+    @traced("mailbox.vacuum")
+    def vacuum(self, pages: int = 0) -> None:
+        """Return free pages to the filesystem (0 = all of them).
+
+        A database created before incremental auto-vacuum is converted here with
+        one full VACUUM, which rewrites the file: this only runs from
+        `agentkit archive` and idle maintenance, never when a Mailbox opens.
+        """
+        with self._lock:
+            if self.conn.execute("PRAGMA auto_vacuum").fetchone()[0] != AUTO_VACUUM_INCREMENTAL:
+                log.info("Converting %s to incremental auto-vacuum (full VACUUM)", self.db_path)
+                started = time.monotonic()
+                self.conn.executescript("PRAGMA auto_vacuum = INCREMENTAL; VACUUM;")
+                log.info("Converted %s in %.1fs", self.db_path, time.monotonic() - started)
+                return
+            # executescript steps the pragma to completion; execute() would free one page.
+            self.conn.executescript(f"PRAGMA incremental_vacuum({int(pages)});")
+
+
+class AsyncMailbox:
+    """Async facade over Mailbox for the daemon's event loop.
+
+    Writes run on one dedicated writer thread, so they never block the loop or
+    queue up on the default thread pool; reads use per-thread read-only
+    connections, so a long history() never waits behind a commit.
+    """
+
+    def __init__(self, mailbox: Mailbox):
+        self.mailbox = mailbox
+        self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="mailbox-writer")
+
+    async def _write(self, fn, /, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._writer, functools.partial(fn, *args, **kwargs))
+
+    async def enqueue(self, content: str, source: str, priority: int = 0) -> int:
+        return await self._write(self.mailbox.enqueue, content, source, priority)
+
+    async def claim(self, task_id: int | None = None) -> dict | None:
+        """Claim task_id, or the next pending task when task_id is None."""
+        if task_id is None:
+            return await self._write(self.mailbox.dequeue)
+        return await self._write(self.mailbox.claim, task_id)
+
+    async def complete(self, task_id: int, result: str = "") -> None:
+        await self._write(self.mailbox.complete, task_id, result)
+
+    async def fail(self, task_id: int, error: str = "") -> None:
+        await self._write(self.mailbox.fail, task_id, error)
+
+    async def history(self, limit: int = 10) -> list[dict]:
+        return await asyncio.to_thread(self.mailbox.history, limit)
+
+    def close(self) -> None:
+        self._writer.shutdown(wait=True)
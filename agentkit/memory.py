@@ -1,59 +1,171 @@
-"""Memory management — daily observations + long-term knowledge."""
+"""Memory management — daily observations + long-term knowledge.
 
+Appends open the file in append mode, so their cost is O(entry) no matter how
+large the file has grown. Full rewrites go through a temp file and an atomic
+rename, so a crash mid-write never leaves a truncated MEMORY.md.
+"""
+
+import os
 import threading
+from collections.abc import Callable
 from datetime import date, timedelta
+from enum import Enum
 from pathlib import Path
 
+from agentkit.filecache import FileCache
+from agentkit.hooks import traced
+from agentkit.memory_index import MemoryIndex
+from agentkit.ranking import BM25, split_entries
+
+
+class FsyncPolicy(Enum):
+    NEVER = "never"  # leave flushing to the OS — fastest
+    ALWAYS = "always"  # fsync after every write — survives power loss
+
 
 class Memory:
-    def __init__(self, memory_dir: Path):
+    def __init__(
+        self,
+        memory_dir: Path,
+        *,
+        fsync: FsyncPolicy = FsyncPolicy.NEVER,
+        files: FileCache | None = None,
+        index: MemoryIndex | None = None,
+    ):
         self.memory_dir = memory_dir
         self.memory_dir.mkdir(parents=True, exist_ok=True)
         self.daily_dir = memory_dir / "daily"
         self.daily_dir.mkdir(exist_ok=True)
+        self.fsync = fsync
+        self.files = files or FileCache()
+        self.index = index
         self._lock = threading.Lock()
 
     @property
-    def _long_term_path(self) -> Path:
+    def long_term_path(self) -> Path:
         return self.memory_dir / "MEMORY.md"
 
+    @property
+    def digest_dir(self) -> Path:
+        return self.memory_dir / "digests"
+
     def _daily_path(self, d: date | None = None) -> Path:
         d = d or date.today()
         return self.daily_dir / f"{d.isoformat()}.md"
 
+    def _sync(self, f) -> None:
+        if self.fsync == FsyncPolicy.ALWAYS:
+            f.flush()
+            os.fsync(f.fileno())
+
+    def _append(self, path: Path, text: str, entry: str) -> None:
+        previous = FileCache.signature(path)
+        with open(path, "a") as f:
+            f.write(text)
+            self._sync(f)
+        self.files.invalidate(path)
+        if self.index is not None:
+            self.index.add(path, entry, previous)
+
+    def _atomic_write(self, path: Path, text: str) -> None:
+        tmp = path.with_name(f".{path.name}.tmp")
+        with open(tmp, "w") as f:
+            f.write(text)
+            self._sync(f)
+        os.replace(tmp, path)
+        self.files.invalidate(path)
+        if self.index is not None:
+            self.index.reindex(path)
+
     def read_long_term(self) -> str:
-        path = self._long_term_path
-        return path.read_text() if path.exists() else ""
+        return self.files.read(self.long_term_path)
 
+    @traced("memory.write_long_term")
     def write_long_term(self, content: str) -> None:
-        self._long_term_path.write_text(content)
+        with self._lock:
+            self._atomic_write(self.long_term_path, content)
 
+    @traced("memory.append_long_term")
     def append_long_term(self, content: str) -> None:
         with self._lock:
-            existing = self.read_long_term()
-            separator = "\n\n" if existing else ""
-            self._long_term_path.write_text(existing + separator + content)
+            path = self.long_term_path
+            separator = "\n\n" if path.exists() and path.stat().st_size else ""
+            self._append(path, separator + content, content)
+
+    def rewrite_long_term(self, transform: Callable[[str], str]) -> bool:
+        """Atomically replace MEMORY.md with transform(current). Returns True if changed."""
+        with self._lock:
+            current = self.read_long_term()
+            updated = transform(current)
+            if updated == current:
+                return False
+            self._atomic_write(self.long_term_path, updated)
+            return True
+
+    def roll_up(self, key: str, text: str, sources: list[Path]) -> Path:
+        """Append `text` to digest `key` and delete the daily files it summarises."""
+        with self._lock:
+            self.digest_dir.mkdir(exist_ok=True)
+            path = self.digest_dir / f"{key}.md"
+            existing = self.files.read(path) or f"# Digest {key}\n"
+            self._atomic_write(path, existing + "\n" + text)
+            for source in sources:
+                source.unlink(missing_ok=True)
+                self.files.invalidate(source)
+                if self.index is not None:
+                    self.index.reindex(source)
+            return path
 
     def read_today(self) -> str:
-        path = self._daily_path()
-        return path.read_text() if path.exists() else ""
+        return self.files.read(self._daily_path())
 
+    @traced("memory.append_today")
     def append_today(self, content: str) -> None:
         with self._lock:
             path = self._daily_path()
-            if not path.exists():
-                header = f"# {date.today().isoformat()}\n\n"
-                path.write_text(header + content + "\n")
+            if path.exists():
+                self._append(path, "\n" + content + "\n", content)
             else:
-                existing = path.read_text()
-                path.write_text(existing + "\n" + content + "\n")
+                header = f"# {date.today().isoformat()}\n\n"
+                self._append(path, header + content + "\n", content)
 
-    def read_recent(self, days: int = 7) -> str:
-        parts = []
+    def recent_paths(self, days: int = 7) -> list[Path]:
+        """Daily file paths for the last `days` days, oldest first."""
         today = date.today()
-        for i in range(days):
-            d = today - timedelta(days=i)
-            path = self._daily_path(d)
-            if path.exists():
-                parts.append(path.read_text())
-        return "\n\n---\n\n".join(reversed(parts))
+        return [self._daily_path(today - timedelta(days=i)) for i in reversed(range(days))]
+
+    def read_recent(self, days: int = 7) -> str:
+        parts = [self.files.read(path) for path in self.recent_paths(days)]
+        return "\n\n---\n\n".join(part for part in parts if part)
+
+    def paths(self) -> list[Path]:
+        """Every memory file on disk: MEMORY.md, digests, then daily files oldest first."""
+        long_term = [self.long_term_path] if self.long_term_path.exists() else []
+        return (
+            long_term + sorted(self.digest_dir.glob("*.md")) + sorted(self.daily_dir.glob("*.md"))
+        )
+
+    @traced("memory.search")
+    def search(self, query: str, k: int = 5) -> list[dict]:
+        """Top-k memory entries relevant to `query`, as {source, content, score} dicts.
+
+        Uses the full-text index when one is attached (syncing any files edited
+        outside of Memory first); otherwise ranks every entry in-process.
+        """
+        if self.index is not None:
+            self.index.sync(self.paths())
+            return self.index.search(query, k)
+
+        entries = [
+            (path.relative_to(self.memory_dir).as_posix(), entry)
+            for path in self.paths()
+            for entry in split_entries(self.files.read(path))
+            if not entry.startswith("# ")
+        ]
+        scores = BM25([entry for _, entry in entries]).scores(query)
+        ranked = sorted(zip(scores, entries), key=lambda pair: pair[0], reverse=True)
+        return [
+            {"source": source, "content": entry, "score": score}
+            for score, (source, entry) in ranked[:k]
+            if score > 0
+        ]
@@ -0,0 +1,111 @@
+"""Full-text index over memory files — SQLite FTS5, maintained incrementally.
+
+Each blank-line separated entry of MEMORY.md and the daily files is one row.
+Appends add their entry directly; `sync` re-indexes only files whose
+(mtime_ns, size) no longer matches what was last indexed, which picks up
+edits made outside of Memory.
+"""
+
+import sqlite3
+import threading
+from pathlib import Path
+
+from agentkit.filecache import FileCache, Signature
+from agentkit.ranking import split_entries, tokenize
+
+
+class MemoryIndex:
+    def __init__(self, db_path: Path, memory_dir: Path):
+        db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.memory_dir = memory_dir
+        self.conn = sqlite3.connect(str(db_path), check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self._lock = threading.Lock()
+        self.conn.execute(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS entries USING fts5(content, source UNINDEXED)"
+        )
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS indexed_files (
+                source TEXT PRIMARY KEY,
+                mtime_ns INTEGER NOT NULL,
+                size INTEGER NOT NULL
+            )
+        """)
+        self.conn.commit()
+
+    def _source(self, path: Path) -> str:
+        return path.relative_to(self.memory_dir).as_posix()
+
+    def _record(self, path: Path) -> None:
+        signature = FileCache.signature(path)
+        if signature is not None:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO indexed_files (source, mtime_ns, size) VALUES (?, ?, ?)",
+                (self._source(path), *signature),
+            )
+
+    def add(self, path: Path, content: str, previous: Signature) -> None:
+        """Index one entry just appended to `path`.
+
+        `previous` is the file's signature before the append; if that is not what
+        was last indexed, the file changed behind our back and is re-indexed whole.
+        """
+        stored = self.conn.execute(
+            "SELECT mtime_ns, size FROM indexed_files WHERE source = ?", (self._source(path),)
+        ).fetchone()
+        if (tuple(stored) if stored else None) != previous:
+            self.reindex(path)
+            return
+        with self._lock:
+            self.conn.execute(
+                "INSERT INTO entries (content, source) VALUES (?, ?)",
+                (content.strip(), self._source(path)),
+            )
+            self._record(path)
+            self.conn.commit()
+
+    def reindex(self, path: Path) -> None:
+        """Replace every entry of `path` with its current contents."""
+        source = self._source(path)
+        text = path.read_text() if path.exists() else ""
+        with self._lock:
+            self.conn.execute("DELETE FROM entries WHERE source = ?", (source,))
+            self.conn.executemany(
+                "INSERT INTO entries (content, source) VALUES (?, ?)",
+                [(entry, source) for entry in split_entries(text) if not entry.startswith("# ")],
+            )
+            if text:
+                self._record(path)
+            else:
+                self.conn.execute("DELETE FROM indexed_files WHERE source = ?", (source,))
+            self.conn.commit()
+
+    def sync(self, paths: list[Path]) -> int:
+        """Re-index files that changed since they were last indexed. Returns count."""
+        stored = {
+            row["source"]: (row["mtime_ns"], row["size"])
+            for row in self.conn.execute("SELECT * FROM indexed_files")
+        }
+        current = {self._source(path) for path in paths}
+        stale = [
+            path for path in paths
+            if FileCache.signature(path) != stored.get(self._source(path))
+        ]
+        stale += [self.memory_dir / source for source in stored.keys() - current]
+        for path in stale:
+            self.reindex(path)
+        return len(stale)
+
+    def search(self, query: str, k: int = 5) -> list[dict]:
+        """Top-k entries for `query` (any-term match, BM25 ordered)."""
+        terms = tokenize(query)
+        if not terms:
+            return []
+        match = " OR ".join(f'"{term}"' for term in terms)
+        rows = self.conn.execute(
+            "SELECT source, content, bm25(entries) AS score FROM entries "
+            "WHERE entries MATCH ? ORDER BY score LIMIT ?",
+            (match, k),
+        ).fetchall()
+        return [dict(row) for row in rows]
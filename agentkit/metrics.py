@@ -0,0 +1,211 @@
+"""Metrics — Prometheus text exposition over a small local HTTP endpoint.
+
+Hot-path metrics (counters, histograms) are module-level and cost one lock
+and an addition per update. Values that live elsewhere — queue depth, memory
+file sizes — are read by collectors only when the endpoint is scraped.
+"""
+
+import bisect
+import logging
+import threading
+from collections.abc import Callable
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+log = logging.getLogger(__name__)
+
+# Seconds; spans a sub-second Telegram send to a half-hour Claude run.
+DEFAULT_BUCKETS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, 1800)
+
+Labels = tuple[str, ...]
+
+
+def _format_labels(names: Labels, values: Labels, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help_text: str, labels: Labels = ()):
+        self.name = name
+        self.help = help_text
+        self.label_names = labels
+        self._lock = threading.Lock()
+
+    def _key(self, labels: dict[str, str]) -> Labels:
+        return tuple(str(labels[name]) for name in self.label_names)
+
+    def header(self) -> list[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, help_text: str, labels: Labels = ()):
+        super().__init__(name, help_text, labels)
+        self._values: dict[Labels, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels: str) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+    def render(self) -> list[str]:
+        with self._lock:
+            values = sorted(self._values.items())
+        return self.header() + [
+            f"{self.name}{_format_labels(self.label_names, key)} {value}" for key, value in values
+        ]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(
+        self, name: str, help_text: str, labels: Labels = (), buckets=DEFAULT_BUCKETS
+    ):
+        super().__init__(name, help_text, labels)
+        self.buckets = tuple(sorted(buckets))
+        # label values -> [per-bucket counts (+Inf last), sum]
+        self._series: dict[Labels, list] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+    def count(self, **labels: str) -> int:
+        series = self._series.get(self._key(labels))
+        return sum(series[0]) if series else 0
+
+    def render(self) -> list[str]:
+        with self._lock:
+            series = sorted(
+                (key, (list(counts), total)) for key, (counts, total) in self._series.items()
+            )
+        lines = self.header()
+        for key, (counts, total) in series:
+            cumulative = 0
+            for bound, count in zip((*self.buckets, "+Inf"), counts):
+                cumulative += count
+                le = _format_labels(self.label_names, key, f'le="{bound}"')
+                lines.append(f"{self.name}_bucket{le} {cumulative}")
+            labels = _format_labels(self.label_names, key)
+            lines.append(f"{self.name}_sum{labels} {total}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+def gauge(
+    name: str, help_text: str, samples: dict[Labels, float], labels: Labels = ()
+) -> list[str]:
+    """Render a gauge computed at scrape time (for collectors)."""
+    lines = [f"# HELP {name} {help_text}", f"# TYPE {name} gauge"]
+    lines += [f"{name}{_format_labels(labels, key)} {value}" for key, value in samples.items()]
+    return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: list[_Metric] = []
+        self._collectors: list[Callable[[], list[str]]] = []
+
+    def register(self, metric: _Metric) -> _Metric:
+        self._metrics.append(metric)
+        return metric
+
+    def add_collector(self, collector: Callable[[], list[str]]) -> None:
+        self._collectors.append(collector)
+
+    def remove_collector(self, collector: Callable[[], list[str]]) -> None:
+        self._collectors.remove(collector)
+
+    def render(self) -> str:
+        lines: list[str] = []
+        for metric in self._metrics:
+            lines += metric.render()
+        for collector in self._collectors:
+            try:
+                lines += collector()
+            except Exception as e:  # a broken collector must not break the scrape
+                log.error("Metrics collector failed: %s", e)
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+TASK_DURATION = REGISTRY.register(Histogram(
+    "agentkit_task_duration_seconds", "Time from claim to finish of a task.", ("source", "status"),
+))
+CLAUDE_INVOCATIONS = REGISTRY.register(Counter(
+    "agentkit_claude_invocations_total", "Claude CLI invocations by outcome.", ("outcome",),
+))
+TELEGRAM_SEND_DURATION = REGISTRY.register(Histogram(
+    "agentkit_telegram_send_seconds", "Latency of Telegram API calls.", ("method",),
+))
+TELEGRAM_MESSAGES = REGISTRY.register(Counter(
+    "agentkit_telegram_messages_total",
+    "Outbound Telegram delivery attempts by outcome (sent, retried, dropped).",
+    ("outcome",),
+))
+TELEGRAM_DELIVERY_DELAY = REGISTRY.register(Histogram(
+    "agentkit_telegram_delivery_seconds", "Time from queueing a Telegram message to sending it.",
+))
+MESSAGES_COALESCED = REGISTRY.register(Counter(
+    "agentkit_telegram_messages_coalesced_total",
+    "Telegram messages merged into an earlier message's task.",
+))
+
+
+class MetricsServer:
+    """Serves REGISTRY at GET /metrics from a background thread."""
+
+    def __init__(self, port: int, host: str = "127.0.0.1", registry: Registry = REGISTRY):
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body = registry.render().encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass  # scrapes every few seconds would drown the log
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(
+            target=self._server.serve_forever, name="metrics-server", daemon=True
+        )
+
+    @property
+    def port(self) -> int:
+        return self._server.server_address[1]
+
+    def start(self) -> None:
+        self._thread.start()
+        log.info("Metrics endpoint on http://%s:%d/metrics", *self._server.server_address[:2])
+
+    def close(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
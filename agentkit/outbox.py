@@ -0,0 +1,332 @@
+"""Outbox — rate-limited, persistent delivery of outbound Telegram messages.
+
+Messages are written to SQLite before any send is attempted, so nothing is
+lost when Telegram answers 429, the network drops, or the daemon restarts.
+A SendQueue delivers them oldest first, one at a time per chat (so a chat
+always sees its messages in order), through two token buckets: one per chat
+and one for the whole bot. Failures are classified the way Telegram means
+them:
+
+  RetryAfter           wait exactly as long as Telegram asked, then retry
+  network errors       retry with exponential backoff
+  anything else        (bad request, bot blocked) drop and log
+
+Long replies are split into chunks on paragraph and code-block boundaries
+(or stored as one document upload above a size threshold) when queued.
+Delivery claims a run of up to BATCH consecutive messages per chat by
+pushing their next attempt one lease into the future, so a crash mid-send
+retries them once the lease runs out and two processes sharing the outbox
+never send the same message twice. Within a run, the chunks go out back to
+back while the bookkeeping for sent chunks is written in the background.
+"""
+
+import asyncio
+import logging
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass, field
+from datetime import timedelta
+from pathlib import Path
+
+from telegram.error import BadRequest, NetworkError, RetryAfter
+
+from agentkit.metrics import TELEGRAM_DELIVERY_DELAY, TELEGRAM_MESSAGES
+from agentkit.retry import RetryPolicy
+from agentkit.schema import migrate
+from agentkit.telegram_bot import TelegramBot, split_message
+
+log = logging.getLogger(__name__)
+
+LEASE = 30.0  # seconds a claimed message stays hidden from other senders
+BATCH = 10  # consecutive messages per chat claimed at once
+DOCUMENT_THRESHOLD = 12000  # characters above which a reply is uploaded as a file
+POLL_INTERVAL = 30.0  # seconds between checks for messages other processes added
+
+
+@dataclass
+class SendLimits:
+    # Telegram allows roughly 30 messages/s per bot and 1/s per chat.
+    rate: float = 25.0  # messages per second across all chats
+    burst: int = 25
+    chat_rate: float = 1.0  # messages per second to one chat
+    chat_burst: int = 3
+    max_attempts: int = 10  # then the message is dropped
+    backoff: RetryPolicy = field(
+        default_factory=lambda: RetryPolicy(base_delay=2.0, max_delay=300.0)
+    )
+
+
+# Schema migrations, applied in order; PRAGMA user_version records how many ran.
+MIGRATIONS: list[tuple[str, ...]] = [
+    # 1 — base table
+    (
+        """
+        CREATE TABLE IF NOT EXISTS outbox (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            chat_id TEXT NOT NULL,
+            text TEXT NOT NULL,
+            attempts INTEGER NOT NULL DEFAULT 0,
+            next_attempt REAL NOT NULL,
+            created_at REAL NOT NULL
+        )
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_outbox_chat ON outbox(chat_id, id)",
+    ),
+    # 2 — long replies can be queued as a document upload
+    (
+        "ALTER TABLE outbox ADD COLUMN kind TEXT NOT NULL DEFAULT 'text'",
+    ),
+]
+
+
+class TokenBucket:
+    """Allows `rate` acquisitions per second with bursts of up to `capacity`."""
+
+    def __init__(self, rate: float, capacity: int):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = float(capacity)
+        self._updated = time.monotonic()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self) -> None:
+        while True:
+            self._refill()
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return
+            await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+class Outbox:
+    """SQLite store of messages waiting to be delivered."""
+
+    def __init__(self, db_path: Path):
+        db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(str(db_path), check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self._lock = threading.Lock()
+        self._migrate()
+
+    def _migrate(self) -> None:
+        with self._lock:
+            migrate(self.conn, MIGRATIONS)
+
+    def add(self, chat_id: str, text: str, kind: str = "text") -> int:
+        return self.add_many(chat_id, [text], kind)[0]
+
+    def add_many(self, chat_id: str, texts: list[str], kind: str = "text") -> list[int]:
+        """Queue several messages for one chat in a single transaction."""
+        now = time.time()
+        with self._lock:
+            ids = [
+                self.conn.execute(
+                    "INSERT INTO outbox (chat_id, text, kind, next_attempt, created_at) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (chat_id, text, kind, now, now),
+                ).lastrowid
+                for text in texts
+            ]
+            self.conn.commit()
+        return ids
+
+    def claim_due(self, batch: int = BATCH) -> list[dict]:
+        """Claim up to `batch` messages per chat, oldest first.
+
+        A message is due when it and every older message of its chat are due,
+        so a deferred or claimed message holds back the rest of its chat.
+        """
+        now = time.time()
+        with self._lock:
+            rows = self.conn.execute(
+                "UPDATE outbox SET next_attempt = ?, attempts = attempts + 1 WHERE id IN ("
+                "  SELECT id FROM ("
+                "    SELECT id,"
+                "      ROW_NUMBER() OVER (PARTITION BY chat_id ORDER BY id) AS position,"
+                "      MAX(next_attempt) OVER (PARTITION BY chat_id ORDER BY id) AS latest"
+                "    FROM outbox)"
+                "  WHERE position <= ? AND latest <= ?) "
+                "RETURNING id, chat_id, text, kind, attempts, created_at",
+                (now + LEASE, batch, now),
+            ).fetchall()
+            self.conn.commit()
+        keys = ("id", "chat_id", "text", "kind", "attempts", "created_at")
+        return sorted((dict(zip(keys, row)) for row in rows), key=lambda row: row["id"])
+
+    def release(self, message_ids: list[int]) -> None:
+        """Hand claimed but unattempted messages back as due."""
+        with self._lock:
+            self.conn.executemany(
+                "UPDATE outbox SET next_attempt = ?, attempts = attempts - 1 WHERE id = ?",
+                [(time.time(), message_id) for message_id in message_ids],
+            )
+            self.conn.commit()
+
+    def delete(self, message_id: int) -> None:
+        with self._lock:
+            self.conn.execute("DELETE FROM outbox WHERE id = ?", (message_id,))
+            self.conn.commit()
+
+    def defer(self, message_id: int, delay: float) -> None:
+        with self._lock:
+            self.conn.execute(
+                "UPDATE outbox SET next_attempt = ? WHERE id = ?", (time.time() + delay, message_id)
+            )
+            self.conn.commit()
+
+    def next_due(self) -> float | None:
+        """Wall-clock time of the earliest pending attempt, or None when empty."""
+        with self._lock:
+            (due,) = self.conn.execute("SELECT MIN(next_attempt) FROM outbox").fetchone()
+        return due
+
+    def __len__(self) -> int:
+        with self._lock:
+            (count,) = self.conn.execute("SELECT COUNT(*) FROM outbox").fetchone()
+        return count
+
+    def close(self) -> None:
+        with self._lock:
+            self.conn.close()
+
+
+class SendQueue:
+    def __init__(
+        self,
+        bot: TelegramBot,
+        outbox: Outbox,
+        limits: SendLimits | None = None,
+        *,
+        document_threshold: int = DOCUMENT_THRESHOLD,
+    ):
+        self.bot = bot
+        self.outbox = outbox
+        self.limits = limits or SendLimits()
+        self.document_threshold = document_threshold
+        self._global = TokenBucket(self.limits.rate, self.limits.burst)
+        self._chats: dict[str, TokenBucket] = {}
+        self._wake = asyncio.Event()
+
+    async def send(self, text: str, chat_id: str | None = None) -> None:
+        """Persist a message for delivery; returns before it is sent.
+
+        Text too long for one Telegram message is queued as ordered chunks,
+        or as a single document upload above `document_threshold` (0 = never).
+        """
+        chat_id = chat_id or self.bot.chat_id
+        if self.document_threshold and len(text) > self.document_threshold:
+            await asyncio.to_thread(self.outbox.add, chat_id, text, "document")
+        else:
+            await asyncio.to_thread(self.outbox.add_many, chat_id, split_message(text))
+        self._wake.set()
+
+    async def flush(self) -> int:
+        """Deliver every message that is due now; returns how many were attempted."""
+        attempted = 0
+        while rows := await asyncio.to_thread(self.outbox.claim_due):
+            chats: dict[str, list[dict]] = {}
+            for row in rows:
+                chats.setdefault(row["chat_id"], []).append(row)
+            # Chats are served concurrently; each chat's messages stay in order.
+            results = await asyncio.gather(*(self._deliver_run(run) for run in chats.values()))
+            attempted += sum(results)
+        return attempted
+
+    async def run(self) -> None:
+        """Deliver messages as they become due, until cancelled."""
+        while True:
+            self._wake.clear()
+            await self.flush()
+            due = await asyncio.to_thread(self.outbox.next_due)
+            wait = POLL_INTERVAL if due is None else min(POLL_INTERVAL, due - time.time())
+            if wait > 0:
+                try:
+                    await asyncio.wait_for(self._wake.wait(), wait)
+                except TimeoutError:
+                    pass
+
+    async def _deliver_run(self, rows: list[dict]) -> int:
+        """Send one chat's claimed messages in order; returns how many were attempted."""
+        pending: list[asyncio.Task] = []
+        attempted = 0
+        try:
+            for index, row in enumerate(rows):
+                attempted += 1
+                cleanup = await self._deliver(row)
+                if cleanup is None:  # deferred: later messages must wait behind it
+                    await asyncio.to_thread(
+                        self.outbox.release, [later["id"] for later in rows[index + 1:]]
+                    )
+                    break
+                # Record the send off the critical path; the next chunk goes out now.
+                pending.append(asyncio.create_task(cleanup))
+        finally:
+            await asyncio.gather(*pending)
+        return attempted
+
+    async def acquire(self, chat_id: str | None = None) -> None:
+        """Wait for a send slot to chat_id under the per-chat and global limits.
+
+        Messages sent outside the outbox (live-status edits, command replies)
+        call this first so they count against the same Telegram rate limits.
+        """
+        chat_id = chat_id or self.bot.chat_id
+        bucket = self._chats.get(chat_id)
+        if bucket is None:
+            bucket = self._chats[chat_id] = TokenBucket(
+                self.limits.chat_rate, self.limits.chat_burst
+            )
+        await bucket.acquire()
+        await self._global.acquire()
+
+    async def _deliver(self, row: dict):
+        """Send one message. Returns a coroutine removing it from the outbox,
+        or None when it was deferred for a retry."""
+        chat_id = row["chat_id"]
+        await self.acquire(chat_id)
+
+        try:
+            if row["kind"] == "document":
+                await self.bot.deliver_document(row["text"], chat_id)
+            else:
+                await self.bot.deliver(row["text"], chat_id)
+        except RetryAfter as e:
+            return await self._retry(row, _seconds(e.retry_after), f"rate limited: {e}")
+        except BadRequest as e:  # a NetworkError subclass, but retrying won't help
+            return self._drop(row, e)
+        except NetworkError as e:
+            return await self._retry(row, self.limits.backoff.delay(row["attempts"] - 1), e)
+        except Exception as e:
+            return self._drop(row, e)
+        TELEGRAM_MESSAGES.inc(outcome="sent")
+        TELEGRAM_DELIVERY_DELAY.observe(time.time() - row["created_at"])
+        return asyncio.to_thread(self.outbox.delete, row["id"])
+
+    async def _retry(self, row: dict, delay: float, reason):
+        if row["attempts"] >= self.limits.max_attempts:
+            return self._drop(row, reason)
+        log.warning(
+            "Telegram send to %s failed (%s); retrying in %.1fs", row["chat_id"], reason, delay
+        )
+        await asyncio.to_thread(self.outbox.defer, row["id"], delay)
+        TELEGRAM_MESSAGES.inc(outcome="retried")
+        return None
+
+    def _drop(self, row: dict, reason):
+        log.error(
+            "Dropping Telegram message to %s after %d attempt(s): %s",
+            row["chat_id"], row["attempts"], reason,
+        )
+        TELEGRAM_MESSAGES.inc(outcome="dropped")
+        return asyncio.to_thread(self.outbox.delete, row["id"])
+
+
+def _seconds(retry_after: int | timedelta) -> float:
+    if isinstance(retry_after, timedelta):
+        return retry_after.total_seconds()
+    return float(retry_after)
@@ -0,0 +1,67 @@
+"""Token estimation and BM25 relevance ranking for prompt assembly."""
+
+import math
+import re
+from collections import Counter
+
+_WORD_RE = re.compile(r"\w+")
+_ENTRY_SPLIT_RE = re.compile(r"\n\s*\n")
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap local token estimate (~4 characters per token for English text)."""
+    return (len(text) + 3) // 4
+
+
+def tokenize(text: str) -> list[str]:
+    return _WORD_RE.findall(text.lower())
+
+
+def split_entries(text: str) -> list[str]:
+    """Split a memory file into blank-line separated entries."""
+    return [entry.strip() for entry in _ENTRY_SPLIT_RE.split(text) if entry.strip()]
+
+
+class BM25:
+    """Okapi BM25 over a fixed list of documents."""
+
+    def __init__(self, docs: list[str], *, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self._tfs = [Counter(tokenize(doc)) for doc in docs]
+        self._lens = [sum(tf.values()) for tf in self._tfs]
+        self._avgdl = (sum(self._lens) / len(self._lens)) if self._lens else 0.0
+        df: Counter[str] = Counter()
+        for tf in self._tfs:
+            df.update(tf.keys())
+        n = len(docs)
+        self._idf = {term: math.log(1 + (n - f + 0.5) / (f + 0.5)) for term, f in df.items()}
+
+    def scores(self, query: str) -> list[float]:
+        terms = set(tokenize(query)) & self._idf.keys()
+        results = []
+        for tf, length in zip(self._tfs, self._lens):
+            norm = self.k1 * (1 - self.b + self.b * length / self._avgdl) if self._avgdl else 0
+            score = 0.0
+            for term in terms:
+                freq = tf.get(term, 0)
+                if freq:
+                    score += self._idf[term] * freq * (self.k1 + 1) / (freq + norm)
+            results.append(score)
+        return results
+
+
+def select_within_budget(entries: list[str], scores: list[float], budget: int) -> list[str]:
+    """Greedily keep the highest-scoring entries that fit in `budget` tokens.
+
+    Ties (including all-zero scores) favour newer entries. The result keeps the
+    original entry order.
+    """
+    ranked = sorted(range(len(entries)), key=lambda i: (scores[i], i), reverse=True)
+    chosen, used = [], 0
+    for i in ranked:
+        cost = estimate_tokens(entries[i])
+        if used + cost <= budget:
+            chosen.append(i)
+            used += cost
+    return [entries[i] for i in sorted(chosen)]
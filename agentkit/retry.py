@@ -0,0 +1,87 @@
+"""Retry policy and circuit breaker for Claude CLI invocations.
+
+Retryable failures (crashes, overload) are retried with full-jitter
+exponential backoff. Every failed task counts once towards the circuit breaker;
+once `threshold` tasks in a row have failed the breaker opens and callers
+stop dequeuing work until `cooldown` seconds have passed. It is then
+half-open: the first caller to `allow()` runs a trial task while everyone
+else keeps waiting. Success closes the breaker, failure reopens it, and a
+caller that ends up with nothing to run hands the trial back with `release()`.
+"""
+
+import logging
+import random
+import threading
+import time
+from dataclasses import dataclass
+
+log = logging.getLogger(__name__)
+
+
+@dataclass
+class RetryPolicy:
+    retries: int = 2  # extra attempts after the first failure
+    base_delay: float = 2.0  # seconds; doubled on every retry
+    max_delay: float = 60.0
+
+    def delay(self, attempt: int) -> float:
+        """Backoff before retry number `attempt` (0-based), with full jitter."""
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2**attempt))
+
+
+class CircuitBreaker:
+    def __init__(self, threshold: int = 5, cooldown: float = 300.0):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.failures = 0
+        self._opened_at: float | None = None
+        self._trial_at: float | None = None  # when the half-open trial was handed out
+        self._lock = threading.Lock()
+
+    def _blocked(self, now: float) -> bool:
+        if self._opened_at is None:
+            return False
+        if now - self._opened_at < self.cooldown:
+            return True
+        # A trial whose outcome never arrives goes stale after another cooldown.
+        return self._trial_at is not None and now - self._trial_at < self.cooldown
+
+    def is_open(self) -> bool:
+        """Whether work is held back: cooling down, or a trial is running."""
+        with self._lock:
+            return self._blocked(time.monotonic())
+
+    def allow(self) -> bool:
+        """Whether the caller may start a task; half-open, this claims the one trial."""
+        with self._lock:
+            now = time.monotonic()
+            if self._blocked(now):
+                return False
+            if self._opened_at is not None:
+                log.info("Circuit breaker half-open; allowing one trial")
+                self._trial_at = now
+            return True
+
+    def release(self) -> None:
+        """Give back an unused trial so the next caller can take it."""
+        with self._lock:
+            self._trial_at = None
+
+    def record_success(self) -> None:
+        with self._lock:
+            if self._opened_at is not None:
+                log.info("Circuit breaker closed")
+            self.failures = 0
+            self._opened_at = None
+            self._trial_at = None
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            if self.threshold and self.failures >= self.threshold:
+                if self._opened_at is None:
+                    log.warning(
+                        "Circuit breaker opened after %d consecutive failures", self.failures
+                    )
+                self._opened_at = time.monotonic()
+                self._trial_at = None
@@ -0,0 +1,28 @@
+"""Schema migrations for the SQLite stores (mailbox, outbox)."""
+
+import sqlite3
+
+
+def migrate(conn: sqlite3.Connection, migrations: list[tuple[str, ...]]) -> int:
+    """Apply the migrations the database hasn't run yet; returns its new version.
+
+    PRAGMA user_version counts the migrations already applied. Each migration
+    runs in its own BEGIN IMMEDIATE transaction together with its version bump,
+    and the version is re-read once the write lock is held: a crash midway
+    leaves the database at the previous version, and a second process opening
+    the same database waits for the first and then finds nothing left to do.
+    """
+    while True:
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            version = conn.execute("PRAGMA user_version").fetchone()[0]
+            if version >= len(migrations):
+                conn.rollback()
+                return version
+            for sql in migrations[version]:
+                conn.execute(sql)
+            conn.execute(f"PRAGMA user_version = {version + 1}")
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
@@ -0,0 +1,44 @@
+"""Session store — per-chat Claude CLI session ids for `--resume`.
+
+Bounded LRU: the least recently used chat is forgotten once `max_sessions`
+is exceeded, and a session idle for longer than `idle_expiry` seconds is
+not resumed (the next message starts a fresh conversation).
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+
+class SessionStore:
+    def __init__(self, max_sessions: int = 64, idle_expiry: float = 1800.0):
+        self.max_sessions = max_sessions
+        self.idle_expiry = idle_expiry
+        self._sessions: OrderedDict[str, tuple[str, float]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> str | None:
+        with self._lock:
+            entry = self._sessions.get(key)
+            if entry is None:
+                return None
+            session_id, last_used = entry
+            if time.monotonic() - last_used > self.idle_expiry:
+                del self._sessions[key]
+                return None
+            self._sessions.move_to_end(key)
+            return session_id
+
+    def put(self, key: str, session_id: str) -> None:
+        with self._lock:
+            self._sessions[key] = (session_id, time.monotonic())
+            self._sessions.move_to_end(key)
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+
+    def drop(self, key: str) -> None:
+        with self._lock:
+            self._sessions.pop(key, None)
+
+    def __len__(self) -> int:
+        return len(self._sessions)
@@ -1,33 +1,209 @@
-"""Telegram integration — send and receive messages."""
+"""Telegram integration — send and receive messages.
+
+One TelegramBot holds one pooled HTTP client; create it once per process and
+pass it around rather than building a bot per message, so replies reuse open
+TLS connections instead of paying a fresh handshake each time. The daemon
+wraps its Application's bot, so polling and sending share that client.
+"""
 
 import asyncio
 import logging
+import time
 
 from telegram import Bot
+from telegram.request import HTTPXRequest
+
+from agentkit.metrics import TELEGRAM_SEND_DURATION
 
 log = logging.getLogger(__name__)
 
 MAX_MESSAGE_LENGTH = 4096
+POOL_SIZE = 8  # concurrent connections to the Bot API
+FENCE = "```"
+DOCUMENT_NAME = "response.md"
+DOCUMENT_PREVIEW = 200  # characters of a document shown as its caption
+
+
+def split_message(text: str, limit: int = MAX_MESSAGE_LENGTH) -> list[str]:
+    """Split text into messages of at most `limit` characters.
+
+    Breaks fall between paragraphs where possible, then between lines, and
+    only mid-line for a single line longer than `limit`. A fenced code block
+    is never split across paragraphs; one too long for a message is split by
+    lines with the fence closed and reopened in every chunk.
+    """
+    if len(text) <= limit:
+        return [text]
+    chunks: list[str] = []
+    current = ""
+    for separator, block in _blocks(text):
+        for piece in _fit(block, limit):
+            candidate = f"{current}{separator}{piece}" if current else piece
+            if len(candidate) <= limit:
+                current = candidate
+            else:
+                chunks.append(current)
+                current = piece
+            separator = "\n"  # later pieces of a block continue its last line
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def _blocks(text: str) -> list[tuple[str, str]]:
+    """Paragraphs of text, each with the separator that preceded it.
+
+    A fenced code block is its own paragraph from the opening fence to the
+    closing one, even when prose runs straight into or out of it with no
+    blank line ("Here is the fix:\n```python"); the separator is then "\n".
+    """
+    blocks: list[tuple[str, str]] = []
+    lines: list[str] = []
+    separator = "\n"
+    in_fence = False
+
+    def flush(next_separator: str) -> None:
+        nonlocal lines, separator
+        if lines:
+            blocks.append((separator, "\n".join(lines)))
+            lines = []
+            separator = next_separator
+        elif blocks:
+            separator = max(separator, next_separator, key=len)
+
+    for line in text.split("\n"):
+        if line.lstrip().startswith(FENCE):
+            if in_fence:
+                lines.append(line)
+                flush("\n")
+            else:
+                flush("\n")
+                lines.append(line)
+            in_fence = not in_fence
+            continue
+        if not line.strip() and not in_fence:
+            flush("\n\n")
+            continue
+        lines.append(line)
+    flush("\n")
+    return blocks
+
+
+def _fit(block: str, limit: int) -> list[str]:
+    """Split one paragraph or code block into pieces of at most `limit` characters."""
+    if len(block) <= limit:
+        return [block]
+    lines = block.split("\n")
+    opening = lines[0]
+    budget = limit - len(opening) - len(FENCE) - 2  # two newlines around the body
+    if opening.lstrip().startswith(FENCE) and budget > 0:
+        closed = len(lines) > 1 and lines[-1].lstrip().startswith(FENCE)
+        body = lines[1:-1] if closed else lines[1:]
+        return [f"{opening}\n{piece}\n{FENCE}" for piece in _pack(body, budget)]
+    return _pack(lines, limit)
+
+
+def _pack(lines: list[str], limit: int) -> list[str]:
+    """Join lines into pieces of at most `limit` characters, cutting overlong lines."""
+    pieces: list[str] = []
+    current: str | None = None
+    for line in lines:
+        while len(line) > limit:
+            cut = line.rfind(" ", 0, limit) + 1 or limit
+            head, line = line[:cut], line[cut:]
+            if current is not None:
+                pieces.append(current)
+                current = None
+            pieces.append(head)
+        if current is None:
+            current = line
+        elif len(current) + 1 + len(line) <= limit:
+            current = f"{current}\n{line}"
+        else:
+            pieces.append(current)
+            current = line
+    if current is not None:
+        pieces.append(current)
+    return pieces
 
 
 class TelegramBot:
-    def __init__(self, token: str, chat_id: str):
+    def __init__(
+        self, token: str, chat_id: str, *, pool_size: int = POOL_SIZE, bot: Bot | None = None
+    ):
+        """Wraps `bot` when given (its owner initializes and shuts it down);
+        otherwise builds a bot with its own pool of `pool_size` connections."""
         self.token = token
         self.chat_id = chat_id
-        self._bot = Bot(token=token)
+        if bot is None:
+            self._request = HTTPXRequest(connection_pool_size=pool_size)
+            self._bot = Bot(token=token, request=self._request)
+        else:
+            self._request = bot.request
+            self._bot = bot
+
+    async def send(self, text: str, chat_id: str | None = None) -> int | None:
+        """Send a message to the specified or default chat. Returns its message id.
 
-    async def send(self, text: str, chat_id: str | None = None) -> None:
-        """Send a message to the specified or default chat."""
+        Errors are logged and swallowed; use an outbox SendQueue for messages
+        that must arrive.
+        """
+        try:
+            return await self.deliver(text, chat_id)
+        except Exception as e:
+            log.error("Failed to send Telegram message: %s", e)
+            return None
+
+    async def deliver(self, text: str, chat_id: str | None = None) -> int:
+        """Like send, but Telegram and network errors propagate to the caller."""
+        chat_id = chat_id or self.chat_id
+        text = self._truncate(text)
+        started = time.monotonic()
+        try:
+            message = await self._bot.send_message(chat_id=chat_id, text=text)
+            return message.message_id
+        finally:
+            TELEGRAM_SEND_DURATION.observe(time.monotonic() - started, method="send")
+
+    async def deliver_document(self, text: str, chat_id: str | None = None) -> int:
+        """Upload text as a Markdown file, captioned with its opening lines."""
+        chat_id = chat_id or self.chat_id
+        caption = text[:DOCUMENT_PREVIEW].rstrip()
+        if len(text) > DOCUMENT_PREVIEW:
+            caption += "…"
+        started = time.monotonic()
+        try:
+            message = await self._bot.send_document(
+                chat_id=chat_id, document=text.encode(), filename=DOCUMENT_NAME, caption=caption
+            )
+            return message.message_id
+        finally:
+            TELEGRAM_SEND_DURATION.observe(time.monotonic() - started, method="send_document")
+
+    async def edit(self, message_id: int, text: str, chat_id: str | None = None) -> None:
+        """Replace the text of a previously sent message."""
         chat_id = chat_id or self.chat_id
         text = self._truncate(text)
+        started = time.monotonic()
         try:
-            await self._bot.send_message(chat_id=chat_id, text=text)
+            await self._bot.edit_message_text(chat_id=chat_id, message_id=message_id, text=text)
         except Exception as e:
-            log.error("Failed to send Telegram message: %s", e)
+            log.error("Failed to edit Telegram message: %s", e)
+        finally:
+            TELEGRAM_SEND_DURATION.observe(time.monotonic() - started, method="edit")
+
+    def run_sync(self, coro):
+        """Run a coroutine that uses this bot on a fresh event loop."""
+        return asyncio.run(self._in_own_loop(coro))
 
-    def send_sync(self, text: str, chat_id: str | None = None) -> None:
-        """Synchronous wrapper for send."""
-        asyncio.run(self.send(text, chat_id))
+    async def _in_own_loop(self, coro):
+        # The HTTP client's connections belong to the loop that opened them;
+        # a loop made by asyncio.run must open and close its own.
+        await self._request.initialize()
+        try:
+            return await coro
+        finally:
+            await self._request.shutdown()
 
     @staticmethod
     def _truncate(text: str) -> str:
@@ -0,0 +1,112 @@
+"""Per-task telemetry — phase timings and token usage, summarised by `agentkit stats`.
+
+Phases (milliseconds) overlap where noted:
+  dequeue      claiming the task from the mailbox
+  prompt       building the system and task prompts
+  spawn        starting (or taking a warm) CLI process
+  first_event  from spawn to the first line of stream-json output
+  claude       the whole Claude call: prompt, spawn, first event and retries
+  memory       handling directives, completing the task, appending the daily log
+  total        dequeue through memory
+"""
+
+import time
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass
+from datetime import datetime, timezone
+
+from agentkit.timeouts import percentile
+
+PHASES = ("dequeue", "prompt", "spawn", "first_event", "claude", "memory", "total")
+
+
+@dataclass
+class TaskMetrics:
+    task_id: int
+    source: str
+    profile: str
+    status: str = "failed"
+    cache_hit: bool = False
+    dequeue_ms: float = 0.0
+    prompt_ms: float = 0.0
+    spawn_ms: float = 0.0
+    first_event_ms: float = 0.0
+    claude_ms: float = 0.0
+    memory_ms: float = 0.0
+    total_ms: float = 0.0
+    input_tokens: int = 0
+    output_tokens: int = 0
+    cache_read_tokens: int = 0
+    cache_creation_tokens: int = 0
+    cost_usd: float = 0.0
+    num_turns: int = 0
+    created_at: str = ""
+
+    def __post_init__(self):
+        self.created_at = self.created_at or datetime.now(timezone.utc).isoformat()
+
+    @contextmanager
+    def phase(self, name: str):
+        """Add the wall time of the `with` block to `<name>_ms`."""
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            field_name = f"{name}_ms"
+            setattr(self, field_name, getattr(self, field_name) + _ms_since(started))
+
+    def record_result(self, event: dict) -> None:
+        """Take token usage and cost from a stream-json `result` event."""
+        usage = event.get("usage") or {}
+        self.input_tokens += usage.get("input_tokens", 0)
+        self.output_tokens += usage.get("output_tokens", 0)
+        self.cache_read_tokens += usage.get("cache_read_input_tokens", 0)
+        self.cache_creation_tokens += usage.get("cache_creation_input_tokens", 0)
+        self.cost_usd += event.get("total_cost_usd") or event.get("cost_usd") or 0.0
+        self.num_turns += event.get("num_turns", 0)
+
+    def as_row(self) -> dict:
+        row = asdict(self)
+        row["cache_hit"] = int(self.cache_hit)
+        return row
+
+
+def _ms_since(started: float) -> float:
+    return 1000 * (time.monotonic() - started)
+
+
+def summarize(rows: list[dict]) -> list[dict]:
+    """Group metric rows by (profile, source): latency percentiles, throughput, usage."""
+    groups: dict[tuple[str, str], list[dict]] = {}
+    for row in rows:
+        groups.setdefault((row["profile"], row["source"]), []).append(row)
+
+    summaries = []
+    for (profile, source), group in sorted(groups.items()):
+        totals = [row["total_ms"] for row in group]
+        # Observed period: first task's start to the last task's finish.
+        first = min(group, key=lambda row: row["created_at"])
+        last = max(group, key=lambda row: row["created_at"])
+        span_seconds = (
+            datetime.fromisoformat(last["created_at"]) - datetime.fromisoformat(first["created_at"])
+        ).total_seconds() + last["total_ms"] / 1000
+        span_hours = span_seconds / 3600
+        summary = {
+            "profile": profile,
+            "source": source,
+            "tasks": len(group),
+            "failed": sum(row["status"] != "done" for row in group),
+            "cache_hits": sum(row["cache_hit"] for row in group),
+            "p50_ms": percentile(totals, 50),
+            "p95_ms": percentile(totals, 95),
+            "p99_ms": percentile(totals, 99),
+            "tasks_per_hour": len(group) / span_hours if span_hours else 0.0,
+            "input_tokens": sum(row["input_tokens"] for row in group),
+            "output_tokens": sum(row["output_tokens"] for row in group),
+            "cache_read_tokens": sum(row["cache_read_tokens"] for row in group),
+            "cost_usd": sum(row["cost_usd"] for row in group),
+        }
+        for name in PHASES[:-1]:
+            summary[f"{name}_p50_ms"] = percentile([row[f"{name}_ms"] for row in group], 50)
+        summaries.append(summary)
+    return summaries
@@ -0,0 +1,36 @@
+"""Timeout policy — how long a Claude run may take, per task source.
+
+An explicit per-source timeout wins (matched by source prefix, so "cron"
+covers "cron-evaluate"). Otherwise, once a source has enough completed runs
+in the mailbox, its timeout is `headroom` times their p95 duration, kept
+between `floor` and `default`. Sources without history get `default`.
+"""
+
+import math
+from dataclasses import dataclass, field
+
+
+def percentile(values: list[float], q: float) -> float:
+    """Nearest-rank percentile of `values` (q in 0..100)."""
+    ordered = sorted(values)
+    rank = max(1, math.ceil(q / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+@dataclass
+class TimeoutPolicy:
+    default: float = 1800.0  # seconds for a run with no better estimate
+    inactivity: float = 0.0  # seconds without stream output before a run is killed (0 = off)
+    per_source: dict[str, float] = field(default_factory=dict)
+    min_samples: int = 10
+    headroom: float = 4.0
+    floor: float = 300.0
+
+    def timeout_for(self, source: str, durations: list[float]) -> float:
+        matches = [prefix for prefix in self.per_source if source.startswith(prefix)]
+        if matches:
+            return self.per_source[max(matches, key=len)]
+        if len(durations) < self.min_samples:
+            return self.default
+        learned = self.headroom * percentile(durations, 95)
+        return min(self.default, max(self.floor, learned))
@@ -0,0 +1,160 @@
+"""Warm pool — Claude CLI processes spawned ahead of time.
+
+A `claude -p` process pays its Node startup, auth check and tool loading
+before it reads the prompt from stdin, so a process spawned in advance is
+ready to work the moment a task arrives. Print-mode processes handle one
+prompt each: the pool hands a process out once, then spawns a replacement
+in the background for the same command. Processes that have sat idle past
+`max_age` or died on their own are discarded rather than reused, and a
+background timer replaces them every `refresh_interval` seconds so the pool
+is still warm when a task finally arrives after a quiet spell.
+"""
+
+import logging
+import subprocess
+import threading
+import time
+from dataclasses import dataclass
+
+log = logging.getLogger(__name__)
+
+
+@dataclass
+class _WarmProcess:
+    process: subprocess.Popen
+    cmd: tuple[str, ...]
+    spawned_at: float
+
+
+def spawn(cmd: list[str]) -> subprocess.Popen:
+    return subprocess.Popen(
+        cmd,
+        stdin=subprocess.PIPE,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        text=True,
+    )
+
+
+class WarmPool:
+    def __init__(
+        self, size: int = 1, *, max_age: float = 600.0, refresh_interval: float | None = None
+    ):
+        self.size = size
+        self.max_age = max_age
+        self.refresh_interval = (
+            refresh_interval if refresh_interval is not None else max(1.0, max_age / 4)
+        )
+        self._idle: list[_WarmProcess] = []
+        self._cmd: tuple[str, ...] | None = None  # command the pool is kept warm for
+        self._spawning = 0
+        self._closed = False
+        self._lock = threading.Lock()
+        self.warm_hits = 0
+        self.cold_spawns = 0
+        # warm? -> [samples, total seconds] of acquire-to-first-event latency
+        self._first_event: dict[bool, list[float]] = {True: [0, 0.0], False: [0, 0.0]}
+        self._stop = threading.Event()
+        threading.Thread(target=self._maintain, daemon=True).start()
+
+    def acquire(self, cmd: list[str]) -> tuple[subprocess.Popen, bool]:
+        """A process running `cmd`, and whether it came warm from the pool."""
+        key = tuple(cmd)
+        now = time.monotonic()
+        chosen = None
+        with self._lock:
+            self._cmd = key
+            keep = []
+            for warm in self._idle:
+                usable = self._usable(warm, now)
+                if chosen is None and usable and warm.cmd == key:
+                    chosen = warm
+                elif usable and warm.cmd == key:
+                    keep.append(warm)
+                else:
+                    # Stale, dead, or warmed for a command we no longer run.
+                    _discard(warm.process)
+            self._idle = keep
+            if chosen is not None:
+                self.warm_hits += 1
+            else:
+                self.cold_spawns += 1
+
+        threading.Thread(target=self._refill, args=(key,), daemon=True).start()
+        if chosen is not None:
+            return chosen.process, True
+        return spawn(cmd), False
+
+    def _usable(self, warm: _WarmProcess, now: float) -> bool:
+        return warm.process.poll() is None and now - warm.spawned_at < self.max_age
+
+    def _maintain(self) -> None:
+        """Replace expired or dead idle processes until the pool is closed."""
+        while not self._stop.wait(self.refresh_interval):
+            now = time.monotonic()
+            with self._lock:
+                key = self._cmd
+                stale = [warm for warm in self._idle if not self._usable(warm, now)]
+                self._idle = [warm for warm in self._idle if warm not in stale]
+            for warm in stale:
+                _discard(warm.process)
+            if key is not None:
+                self._refill(key)
+
+    def _refill(self, key: tuple[str, ...]) -> None:
+        while True:
+            with self._lock:
+                if self._closed or len(self._idle) + self._spawning >= self.size:
+                    return
+                self._spawning += 1
+            try:
+                warm = _WarmProcess(spawn(list(key)), key, time.monotonic())
+            except OSError as e:
+                log.error("Warm pool spawn failed: %s", e)
+                with self._lock:
+                    self._spawning -= 1
+                return
+            with self._lock:
+                self._spawning -= 1
+                if self._closed:
+                    _discard(warm.process)
+                    return
+                self._idle.append(warm)
+
+    def record_first_event(self, warm: bool, seconds: float) -> None:
+        """Record time from acquire to the first stream-json event."""
+        with self._lock:
+            self._first_event[warm][0] += 1
+            self._first_event[warm][1] += seconds
+        log.info("Claude first event after %.2fs (%s process)", seconds, "warm" if warm else "cold")
+
+    def stats(self) -> dict:
+        def mean_ms(warm: bool) -> float:
+            count, total = self._first_event[warm]
+            return 1000 * total / count if count else 0.0
+
+        with self._lock:
+            return {
+                "warm_hits": self.warm_hits,
+                "cold_spawns": self.cold_spawns,
+                "idle": len(self._idle),
+                "warm_first_event_ms": mean_ms(True),
+                "cold_first_event_ms": mean_ms(False),
+            }
+
+    def close(self) -> None:
+        self._stop.set()
+        with self._lock:
+            self._closed = True
+            for warm in self._idle:
+                _discard(warm.process)
+            self._idle = []
+
+
+def _discard(process: subprocess.Popen) -> None:
+    if process.poll() is None:
+        process.kill()
+    for pipe in (process.stdin, process.stdout, process.stderr):
+        if pipe:
+            pipe.close()
+    process.wait()
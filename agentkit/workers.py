@@ -0,0 +1,89 @@
+"""Worker pool — drains the mailbox with N concurrent workers.
+
+Each worker loops on Mailbox.dequeue (an atomic claim) and hands the task to
+Agent.process_task, so no two workers ever process the same row.
+"""
+
+import logging
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass
+
+from agentkit.agent import Agent
+from agentkit.claude import ToolMode
+from agentkit.config import Config
+
+log = logging.getLogger(__name__)
+
+
+@dataclass
+class WorkerStats:
+    worker_id: int
+    processed: int = 0
+    failed: int = 0
+    busy_seconds: float = 0.0
+    elapsed_seconds: float = 0.0
+
+    @property
+    def throughput(self) -> float:
+        """Completed tasks per second of wall-clock time."""
+        return self.processed / self.elapsed_seconds if self.elapsed_seconds else 0.0
+
+
+def _drain(agent: Agent, worker_id: int, tool_mode: ToolMode) -> WorkerStats:
+    """Claim and process tasks until the mailbox is empty."""
+    stats = WorkerStats(worker_id=worker_id)
+    started = time.monotonic()
+    while True:
+        if not agent.breaker.allow():
+            log.warning("Worker %d stopping: circuit breaker open", worker_id)
+            break
+        task_started = time.monotonic()
+        task = agent.mailbox.dequeue()
+        if task is None:
+            agent.breaker.release()
+            break
+        metrics = agent.new_metrics(task)
+        metrics.dequeue_ms = 1000 * (time.monotonic() - task_started)
+        result = agent.process_task(task, tool_mode=tool_mode, metrics=metrics)
+        stats.busy_seconds += time.monotonic() - task_started
+        if result is None:
+            stats.failed += 1
+        else:
+            stats.processed += 1
+    stats.elapsed_seconds = time.monotonic() - started
+    log.info(
+        "Worker %d finished: %d processed, %d failed, %.3f tasks/s",
+        worker_id, stats.processed, stats.failed, stats.throughput,
+    )
+    return stats
+
+
+def _process_worker(config: Config, worker_id: int, tool_mode: ToolMode) -> WorkerStats:
+    """Entry point for process workers — each builds its own Agent and DB connection."""
+    return _drain(Agent(config), worker_id, tool_mode)
+
+
+def run_pool(
+    agent: Agent,
+    *,
+    workers: int,
+    tool_mode: ToolMode = ToolMode.READONLY,
+    processes: bool = False,
+) -> list[WorkerStats]:
+    """Drain the mailbox with `workers` concurrent workers. Returns per-worker stats."""
+    executor: Executor
+    if processes:
+        executor = ProcessPoolExecutor(max_workers=workers)
+    else:
+        executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="agentkit-worker")
+
+    with executor:
+        if processes:
+            futures = [
+                executor.submit(_process_worker, agent.config, i, tool_mode)
+                for i in range(workers)
+            ]
+        else:
+            futures = [executor.submit(_drain, agent, i, tool_mode) for i in range(workers)]
+        return [f.result() for f in futures]
@@ -0,0 +1,63 @@
+"""Benchmark — Mailbox.dequeue latency against a large finished-task history.
+
+Run:
+  uv run python benchmarks/bench_mailbox.py            # 10k, 100k, 1M rows
+  uv run python benchmarks/bench_mailbox.py 50000      # custom sizes
+"""
+
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+from agentkit.mailbox import Mailbox, TaskStatus
+
+DEFAULT_SIZES = [10_000, 100_000, 1_000_000]
+PENDING = 200
+
+
+def _seed_history(mb: Mailbox, rows: int) -> None:
+    now = datetime.now(timezone.utc).isoformat()
+    batch = 50_000
+    for start in range(0, rows, batch):
+        n = min(batch, rows - start)
+        mb.conn.executemany(
+            "INSERT INTO tasks (content, source, status, result, created_at, updated_at) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            [(f"old task {start + i}", "bench", TaskStatus.DONE, "x" * 200, now, now)
+             for i in range(n)],
+        )
+    mb.conn.commit()
+
+
+def _time_dequeues(mb: Mailbox) -> float:
+    """Mean dequeue latency in microseconds over PENDING claims."""
+    mb.enqueue_many((f"task {i}" for i in range(PENDING)), source="bench")
+    started = time.perf_counter()
+    for _ in range(PENDING):
+        assert mb.dequeue() is not None
+    return (time.perf_counter() - started) / PENDING * 1e6
+
+
+def bench(rows: int) -> tuple[float, float]:
+    with tempfile.TemporaryDirectory() as tmp:
+        mb = Mailbox(Path(tmp) / "bench.db")
+        _seed_history(mb, rows)
+        indexed = _time_dequeues(mb)
+        mb.conn.execute("DROP INDEX idx_tasks_pending_lane")
+        unindexed = _time_dequeues(mb)
+        mb.conn.close()
+    return indexed, unindexed
+
+
+def main() -> None:
+    sizes = [int(a) for a in sys.argv[1:]] or DEFAULT_SIZES
+    print(f"{'history rows':>12}  {'indexed µs':>11}  {'no index µs':>11}")
+    for rows in sizes:
+        indexed, unindexed = bench(rows)
+        print(f"{rows:>12,}  {indexed:>11.1f}  {unindexed:>11.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+"""Benchmark — Memory.append_long_term against a multi-megabyte MEMORY.md.
+
+Compares the append-only write path with the previous read-modify-write.
+
+Run:
+  uv run python benchmarks/bench_memory.py            # 1, 4 and 16 MB
+  uv run python benchmarks/bench_memory.py 8          # custom sizes in MB
+"""
+
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from agentkit.memory import Memory
+
+DEFAULT_SIZES_MB = [1, 4, 16]
+APPENDS = 200
+
+
+def _read_modify_write(mem: Memory, content: str) -> None:
+    existing = mem.read_long_term()
+    separator = "\n\n" if existing else ""
+    mem.long_term_path.write_text(existing + separator + content)
+
+
+def _time_appends(mem: Memory, append) -> float:
+    """Mean append latency in microseconds."""
+    started = time.perf_counter()
+    for i in range(APPENDS):
+        append(f"observation {i}: the quick brown fox jumps over the lazy dog")
+    return (time.perf_counter() - started) / APPENDS * 1e6
+
+
+def bench(size_mb: int) -> tuple[float, float]:
+    line = "- a remembered fact about the world\n"
+    with tempfile.TemporaryDirectory() as tmp:
+        mem = Memory(Path(tmp) / "memory")
+        mem.write_long_term(line * (size_mb * 1024 * 1024 // len(line)))
+        append_only = _time_appends(mem, mem.append_long_term)
+        rewrite = _time_appends(mem, lambda c: _read_modify_write(mem, c))
+    return append_only, rewrite
+
+
+def main() -> None:
+    sizes = [int(a) for a in sys.argv[1:]] or DEFAULT_SIZES_MB
+    print(f"{'MEMORY.md':>9}  {'append µs':>10}  {'rewrite µs':>10}")
+    for size_mb in sizes:
+        append_only, rewrite = bench(size_mb)
+        print(f"{size_mb:>7} MB  {append_only:>10.1f}  {rewrite:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
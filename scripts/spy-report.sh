@@ -4,7 +4,8 @@ set -euo pipefail
 
 PROJECT_ROOT="$(cd "$(dirname "$0")/.." && pwd)"
 DB="$PROJECT_ROOT/data/agentkit.db"
-PROGRESS="$PROJECT_ROOT/data/progress.jsonl"
+# One progress file per task; show the most recently written one.
+PROGRESS=$(ls -t "$PROJECT_ROOT"/data/progress/progress-*.jsonl 2>/dev/null | head -1 || true)
 
 BOLD='\033[1m'
 DIM='\033[2m'
@@ -216,7 +216,8 @@ else
 fi
 
 # ── 4. Live Progress ──────────────────────────────────────────────
-PROGRESS="$PROJECT_ROOT/data/progress.jsonl"
+# One progress file per task; show the most recently written one.
+PROGRESS=$(ls -t "$PROJECT_ROOT"/data/progress/progress-*.jsonl 2>/dev/null | head -1 || true)
 if [ -f "$PROGRESS" ] && [ -s "$PROGRESS" ]; then
     # Show if file was modified recently (within last 30 min)
     PROG_MOD=$(stat -f "%Sm" -t "%Y-%m-%dT%H:%M:%S" "$PROGRESS" 2>/dev/null || echo "")
@@ -12,3 +12,9 @@ def project_root(tmp_path: Path) -> Path:
     (tmp_path / "memory" / "daily").mkdir(parents=True)
     (tmp_path / "data").mkdir()
     return tmp_path
+
+
+@pytest.fixture(autouse=True)
+def no_claude_retries(monkeypatch):
+    """Fail fast on Claude errors; retry tests opt back in explicitly."""
+    monkeypatch.setenv("CLAUDE_RETRIES", "0")
@@ -1,10 +1,15 @@
 """Tests for core agent loop."""
 
+import os
 from unittest.mock import patch
 
+from agentkit import agent as agent_module
 from agentkit.agent import Agent, TaskResult
 from agentkit.claude import ToolMode, ClaudeError
 from agentkit.config import Config
+from agentkit.metrics import CLAUDE_INVOCATIONS, TASK_DURATION
+from agentkit.retry import RetryPolicy
+from agentkit.warm_pool import WarmPool
 
 
 def _make_agent(tmp_path):
@@ -98,3 +103,324 @@ def test_agent_error_returns_none(mock_claude, tmp_path):
     agent = _make_agent(tmp_path)
     agent.mailbox.enqueue("task", source="test")
     assert agent.process_next() is None
+
+
+@patch("agentkit.agent.invoke_claude")
+def test_agent_with_warm_pool_moves_memory_to_task_prompt(mock_claude, tmp_path):
+    mock_claude.return_value = "done"
+    agent = _make_agent(tmp_path)
+    agent.pool = WarmPool(1)
+    agent.memory.append_long_term("remember the milk")
+    agent.mailbox.enqueue("task", source="test")
+    agent.process_next()
+    args, kwargs = mock_claude.call_args
+    assert "remember the milk" in args[0]
+    assert "remember the milk" not in kwargs["system_prompt"]
+    assert kwargs["pool"] is agent.pool
+    agent.pool.close()
+
+
+def test_agent_never_builds_its_own_warm_pool(tmp_path, monkeypatch):
+    # One-shot CLI runs would exit with the pool's spare process still starting.
+    monkeypatch.setenv("CLAUDE_WARM_POOL", "1")
+    assert _make_agent(tmp_path).pool is None
+
+
+def _session_claude(session_id, reply="done"):
+    def fake_invoke(prompt, *, on_event, **kwargs):
+        on_event({"type": "system", "subtype": "init", "session_id": session_id})
+        return reply
+
+    return fake_invoke
+
+
+@patch("agentkit.agent.invoke_claude")
+def test_agent_resumes_session_for_same_key(mock_claude, tmp_path):
+    mock_claude.side_effect = _session_claude("sess-1")
+    agent = _make_agent(tmp_path)
+    for text in ("first", "second"):
+        agent.mailbox.enqueue(text, source="telegram")
+        agent.process_task(agent.mailbox.dequeue(), session_key="chat-1")
+
+    first, second = (call.kwargs for call in mock_claude.call_args_list)
+    assert first["resume"] is None
+    assert second["resume"] == "sess-1"
+    assert second["pool"] is None
+    assert agent.sessions.get("chat-1") == "sess-1"
+
+
+@patch("agentkit.agent.invoke_claude")
+def test_agent_without_session_key_never_resumes(mock_claude, tmp_path):
+    mock_claude.side_effect = _session_claude("sess-1")
+    agent = _make_agent(tmp_path)
+    for text in ("first", "second"):
+        agent.mailbox.enqueue(text, source="cli")
+        agent.process_next()
+    assert all(call.kwargs["resume"] is None for call in mock_claude.call_args_list)
+    assert len(agent.sessions) == 0
+
+
+@patch("agentkit.agent.invoke_claude")
+def test_agent_falls_back_to_new_session_when_resume_fails(mock_claude, tmp_path):
+    agent = _make_agent(tmp_path)
+    agent.sessions.put("chat-1", "expired")
+
+    def fake_invoke(prompt, *, on_event, resume, **kwargs):
+        if resume:
+            raise ClaudeError("No conversation found", retryable=False)
+        on_event({"type": "result", "session_id": "sess-2", "result": "ok"})
+        return "ok"
+
+    mock_claude.side_effect = fake_invoke
+    agent.mailbox.enqueue("hello", source="telegram")
+    result = agent.process_task(agent.mailbox.dequeue(), session_key="chat-1")
+    assert result.response == "ok"
+    assert agent.sessions.get("chat-1") == "sess-2"
+
+
+@patch("agentkit.agent.invoke_claude")
+def test_agent_does_not_rerun_failed_resume_in_new_session(mock_claude, tmp_path):
+    agent = _make_agent(tmp_path)
+    agent.sessions.put("chat-1", "sess-1")
+    mock_claude.side_effect = ClaudeError("Claude CLI timed out after 300s", retryable=False)
+    agent.mailbox.enqueue("hello", source="telegram")
+    assert agent.process_task(agent.mailbox.dequeue(), session_key="chat-1") is None
+    mock_claude.assert_called_once()
+    assert agent.sessions.get("chat-1") == "sess-1"
+
+
+def test_agent_sessions_disabled(tmp_path, monkeypatch):
+    monkeypatch.setenv("CLAUDE_SESSIONS", "0")
+    assert _make_agent(tmp_path).sessions is None
+
+
+@patch("agentkit.agent.invoke_claude")
+def test_agent_reuses_cached_readonly_response(mock_claude, tmp_path, monkeypatch):
+    monkeypatch.setenv("CLAUDE_CACHE_TTL", "3600")
+    mock_claude.return_value = "the answer"
+    agent = _make_agent(tmp_path)
+    for _ in range(2):
+        agent.mailbox.enqueue("same question", source="cli")
+        assert agent.process_next().response == "the answer"
+    # The first run's daily-log entry does not change the cache key.
+    mock_claude.assert_called_once()
+    assert agent.cache.stats()["hits"] == 1
+
+
+@patch("agentkit.agent.invoke_claude")
+def test_cache_hit_does_not_repeat_directives(mock_claude, tmp_path, monkeypatch):
+    monkeypatch.setenv("CLAUDE_CACHE_TTL", "3600")
+    mock_claude.return_value = "the answer\nTELEGRAM: heads up"
+    agent = _make_agent(tmp_path)
+    results = []
+    for _ in range(2):
+        agent.mailbox.enqueue("what is up?", source="cli")
+        results.append(agent.process_next())
+    mock_claude.assert_called_once()
+    assert results[0].pending_messages == ["heads up"]
+    assert results[1].response == "the answer"
+    assert results[1].pending_messages == []
+    stored = agent.cache.conn.execute("SELECT response FROM responses").fetchall()
+    assert stored == [("the answer",)]
+
+
+@patch("agentkit.agent.invoke_claude")
+def test_cron_cache_key_includes_recent_memory(mock_claude, tmp_path, monkeypatch):
+    monkeypatch.setenv("CLAUDE_CACHE_TTL", "3600")
+    mock_claude.return_value = "evaluation"
+    agent = _make_agent(tmp_path)
+
+    def evaluate():
+        agent.mailbox.enqueue("Evaluate recent daily memory.", source="cron-evaluate")
+        agent.process_next()
+
+    evaluate()
+    evaluate()  # its own journal entry does not change the key
+    assert mock_claude.call_count == 1
+    agent.mailbox.enqueue("something else", source="cli")
+    agent.process_next()
+    evaluate()  # but other activity does
+    assert mock_claude.call_count == 3
+
+
+@patch("agentkit.agent.invoke_claude")
+def test_agent_never_caches_readwrite(mock_claude, tmp_path, monkeypatch):
+    monkeypatch.setenv("CLAUDE_CACHE_TTL", "3600")
+    mock_claude.return_value = "done"
+    agent = _make_agent(tmp_path)
+    for _ in range(2):
+        agent.mailbox.enqueue("write it", source="cli")
+        agent.process_next(tool_mode=ToolMode.READWRITE)
+    assert mock_claude.call_count == 2
+
+
+def test_agent_cache_is_opt_in(tmp_path):
+    assert _make_agent(tmp_path).cache is None
+
+
+def _flaky(*outcomes):
+    """invoke_claude stand-in that raises or returns each outcome in turn."""
+    remaining = list(outcomes)
+
+    def fake_invoke(prompt, **kwargs):
+        outcome = remaining.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+    return fake_invoke
+
+
+@patch("agentkit.agent.invoke_claude")
+def test_agent_retries_retryable_errors(mock_claude, tmp_path):
+    mock_claude.side_effect = _flaky(ClaudeError("overloaded"), ClaudeError("crash"), "ok")
+    agent = _make_agent(tmp_path)
+    agent.retry = RetryPolicy(retries=2, base_delay=0)
+    agent.mailbox.enqueue("flaky", source="test")
+    assert agent.process_next().response == "ok"
+    assert mock_claude.call_count == 3
+    assert agent.breaker.failures == 0
+
+
+@patch("agentkit.agent.invoke_claude")
+def test_agent_does_not_retry_fatal_errors(mock_claude, tmp_path):
+    mock_claude.side_effect = ClaudeError("Invalid API key", retryable=False)
+    agent = _make_agent(tmp_path)
+    agent.retry = RetryPolicy(retries=3, base_delay=0)
+    agent.mailbox.enqueue("task", source="test")
+    assert agent.process_next() is None
+    mock_claude.assert_called_once()
+
+
+@patch("agentkit.agent.invoke_claude")
+def test_readwrite_run_is_not_retried_after_it_started(mock_claude, tmp_path):
+    def fake_invoke(prompt, *, on_event, **kwargs):
+        on_event({"type": "system", "session_id": "s1"})
+        raise ClaudeError("Claude CLI produced no output for 600s")
+
+    mock_claude.side_effect = fake_invoke
+    agent = _make_agent(tmp_path)
+    agent.retry = RetryPolicy(retries=3, base_delay=0)
+    agent.mailbox.enqueue("edit files", source="telegram")
+    assert agent.process_next(tool_mode=ToolMode.READWRITE) is None
+    mock_claude.assert_called_once()
+    assert agent.breaker.failures == 1
+
+
+@patch("agentkit.agent.invoke_claude")
+def test_readwrite_run_is_retried_when_it_never_started(mock_claude, tmp_path):
+    mock_claude.side_effect = _flaky(ClaudeError("spawn crashed"), "ok")
+    agent = _make_agent(tmp_path)
+    agent.retry = RetryPolicy(retries=2, base_delay=0)
+    agent.mailbox.enqueue("edit files", source="telegram")
+    assert agent.process_next(tool_mode=ToolMode.READWRITE).response == "ok"
+    assert mock_claude.call_count == 2
+
+
+@patch("agentkit.agent.invoke_claude")
+def test_breaker_counts_one_failure_per_task(mock_claude, tmp_path):
+    mock_claude.side_effect = ClaudeError("overloaded")
+    agent = _make_agent(tmp_path)
+    agent.retry = RetryPolicy(retries=3, base_delay=0)
+    agent.mailbox.enqueue("task", source="test")
+    assert agent.process_next() is None
+    assert mock_claude.call_count == 4
+    assert agent.breaker.failures == 1
+
+
+@patch("agentkit.agent.invoke_claude")
+def test_open_breaker_pauses_dequeuing(mock_claude, tmp_path, monkeypatch):
+    monkeypatch.setenv("CLAUDE_BREAKER_THRESHOLD", "2")
+    mock_claude.side_effect = ClaudeError("down")
+    agent = _make_agent(tmp_path)
+    for i in range(4):
+        agent.mailbox.enqueue(f"task-{i}", source="test")
+    for _ in range(4):
+        assert agent.process_next() is None
+    assert mock_claude.call_count == 2
+    statuses = [t["status"] for t in agent.mailbox.history()]
+    assert statuses.count("pending") == 2
+
+
+@patch("agentkit.agent.invoke_claude")
+def test_agent_uses_source_timeout(mock_claude, tmp_path, monkeypatch):
+    monkeypatch.setenv("CLAUDE_SOURCE_TIMEOUTS", "telegram=120")
+    monkeypatch.setenv("CLAUDE_INACTIVITY_TIMEOUT", "45")
+    mock_claude.return_value = "ok"
+    agent = _make_agent(tmp_path)
+    agent.mailbox.enqueue("hi", source="telegram")
+    agent.process_next()
+    assert mock_claude.call_args.kwargs["timeout"] == 120
+    assert mock_claude.call_args.kwargs["inactivity_timeout"] == 45
+
+
+@patch("agentkit.agent.invoke_claude")
+def test_inactivity_kill_is_off_by_default(mock_claude, tmp_path):
+    mock_claude.return_value = "ok"
+    agent = _make_agent(tmp_path)
+    agent.mailbox.enqueue("hi", source="telegram")
+    agent.process_next()
+    assert mock_claude.call_args.kwargs["inactivity_timeout"] is None
+
+
+@patch("agentkit.agent.invoke_claude")
+def test_agent_records_task_metrics(mock_claude, tmp_path):
+    def fake_invoke(prompt, *, on_event, metrics, **kwargs):
+        metrics.spawn_ms += 5
+        on_event({"type": "result", "result": "ok", "usage": {"output_tokens": 42}})
+        return "ok"
+
+    mock_claude.side_effect = fake_invoke
+    agent = _make_agent(tmp_path)
+    agent.mailbox.enqueue("measure me", source="cli")
+    agent.process_next()
+    (row,) = agent.mailbox.metrics()
+    assert row["status"] == "done"
+    assert row["profile"] == "test"
+    assert row["output_tokens"] == 42
+    assert row["spawn_ms"] == 5
+    assert row["total_ms"] >= row["claude_ms"] > 0
+
+
+@patch("agentkit.agent.invoke_claude")
+def test_agent_records_metrics_for_failed_task(mock_claude, tmp_path):
+    mock_claude.side_effect = ClaudeError("boom")
+    agent = _make_agent(tmp_path)
+    agent.mailbox.enqueue("fail", source="cli")
+    agent.process_next()
+    assert agent.mailbox.metrics()[0]["status"] == "failed"
+
+
+@patch("agentkit.agent.invoke_claude")
+def test_agent_updates_prometheus_metrics(mock_claude, tmp_path):
+    mock_claude.return_value = "ok"
+    agent = _make_agent(tmp_path)
+    invocations = CLAUDE_INVOCATIONS.value(outcome="ok")
+    durations = TASK_DURATION.count(source="m", status="done")
+    agent.mailbox.enqueue("count me", source="m")
+    agent.process_next()
+    assert CLAUDE_INVOCATIONS.value(outcome="ok") == invocations + 1
+    assert TASK_DURATION.count(source="m", status="done") == durations + 1
+
+
+@patch("agentkit.agent.invoke_claude")
+def test_each_task_gets_its_own_progress_file(mock_claude, tmp_path):
+    mock_claude.return_value = "ok"
+    agent = _make_agent(tmp_path)
+    for text in ("first", "second"):
+        agent.mailbox.enqueue(text, source="test")
+        agent.process_next()
+    paths = [call.kwargs["progress_path"] for call in mock_claude.call_args_list]
+    assert [path.name for path in paths] == ["progress-1.jsonl", "progress-2.jsonl"]
+
+
+def test_old_progress_files_are_pruned(tmp_path):
+    agent = _make_agent(tmp_path)
+    agent.config.progress_dir.mkdir(parents=True)
+    for task_id in range(1, agent_module.PROGRESS_FILES_KEPT + 6):
+        path = agent.config.progress_path(task_id)
+        path.write_text("{}\n")
+        os.utime(path, (task_id, task_id))
+    agent._prune_progress()
+    kept = sorted(int(p.stem.split("-")[1]) for p in agent.config.progress_dir.iterdir())
+    assert kept == list(range(6, agent_module.PROGRESS_FILES_KEPT + 6))
@@ -1,7 +1,10 @@
 """Tests for Claude CLI wrapper."""
 
 from unittest.mock import patch, MagicMock
+import asyncio
 import subprocess
+import sys
+import time
 
 import pytest
 
@@ -10,8 +13,11 @@ from agentkit.claude import (
     ToolMode,
     MODEL,
     READONLY_TOOLS,
+    _invoke_with_progress,
     invoke_claude,
+    stream_claude,
 )
+from agentkit.telemetry import TaskMetrics
 
 
 @patch("agentkit.claude.subprocess.run")
@@ -69,8 +75,9 @@ def test_invoke_claude_enforces_opus(mock_run):
 @patch("agentkit.claude.subprocess.run")
 def test_invoke_claude_timeout(mock_run):
     mock_run.side_effect = subprocess.TimeoutExpired(cmd="claude", timeout=600)
-    with pytest.raises(ClaudeError, match="timed out"):
+    with pytest.raises(ClaudeError, match="timed out") as exc:
         invoke_claude("test")
+    assert not exc.value.retryable
 
 
 @patch("agentkit.claude.subprocess.run")
@@ -78,5 +85,163 @@ def test_invoke_claude_nonzero_exit(mock_run):
     mock_run.side_effect = subprocess.CalledProcessError(
         returncode=1, cmd="claude", stderr="error msg"
     )
-    with pytest.raises(ClaudeError, match="failed"):
+    with pytest.raises(ClaudeError, match="failed") as exc:
+        invoke_claude("test")
+    assert exc.value.retryable
+
+
+@patch("agentkit.claude.subprocess.run")
+def test_invoke_claude_auth_failure_is_fatal(mock_run):
+    mock_run.side_effect = subprocess.CalledProcessError(
+        returncode=1, cmd="claude", stderr="Invalid API key · Please run /login"
+    )
+    with pytest.raises(ClaudeError) as exc:
+        invoke_claude("test")
+    assert not exc.value.retryable
+
+
+@patch("agentkit.claude.subprocess.run")
+def test_invoke_claude_missing_cli_is_fatal(mock_run):
+    mock_run.side_effect = FileNotFoundError("claude")
+    with pytest.raises(ClaudeError, match="could not start") as exc:
         invoke_claude("test")
+    assert not exc.value.retryable
+
+
+def _fake_cli(script: str) -> list[str]:
+    """A stand-in CLI: a Python one-liner that writes stream-json to stdout."""
+    return [sys.executable, "-c", script]
+
+
+STREAM_SCRIPT = (
+    "import json, sys\n"
+    "sys.stdin.read()\n"
+    "print(json.dumps({'type': 'system', 'subtype': 'init'}), flush=True)\n"
+    "print('not json', flush=True)\n"
+    "print(json.dumps({'type': 'assistant', 'message': 'working'}), flush=True)\n"
+    "print(json.dumps({'type': 'result', 'result': 'final answer'}), flush=True)\n"
+)
+
+
+def test_invoke_with_progress_streams_events(tmp_path):
+    progress = tmp_path / "data" / "progress.jsonl"
+    events = []
+    result = _invoke_with_progress(
+        _fake_cli(STREAM_SCRIPT), stdin_text="hi", timeout=30,
+        progress_path=progress, on_event=events.append,
+    )
+    assert result == "final answer"
+    assert [e["type"] for e in events] == ["system", "assistant", "result"]
+    assert progress.read_text().count("\n") == 4
+
+
+def test_invoke_with_progress_without_file():
+    events = []
+    result = _invoke_with_progress(
+        _fake_cli(STREAM_SCRIPT), stdin_text="", timeout=30,
+        progress_path=None, on_event=events.append,
+    )
+    assert result == "final answer"
+    assert len(events) == 3
+
+
+def test_invoke_with_progress_timeout(tmp_path):
+    with pytest.raises(ClaudeError, match="timed out"):
+        _invoke_with_progress(
+            _fake_cli("import time; time.sleep(30)"), stdin_text="", timeout=0.5,
+            progress_path=tmp_path / "p.jsonl",
+        )
+
+
+def test_invoke_with_progress_kills_silent_process():
+    script = (
+        "import json, sys, time\n"
+        "print(json.dumps({'type': 'system'}), flush=True)\n"
+        "time.sleep(30)\n"
+    )
+    started = time.monotonic()
+    with pytest.raises(ClaudeError, match="no output for") as exc:
+        _invoke_with_progress(
+            _fake_cli(script), stdin_text="", timeout=30, progress_path=None,
+            inactivity_timeout=0.5,
+        )
+    assert time.monotonic() - started < 10
+    assert not exc.value.retryable
+
+
+def test_invoke_with_progress_steady_output_is_not_inactive():
+    script = (
+        "import json, time\n"
+        "for _ in range(6):\n"
+        "    print(json.dumps({'type': 'assistant'}), flush=True)\n"
+        "    time.sleep(0.1)\n"
+        "print(json.dumps({'type': 'result', 'result': 'ok'}), flush=True)\n"
+    )
+    result = _invoke_with_progress(
+        _fake_cli(script), stdin_text="", timeout=30, progress_path=None,
+        inactivity_timeout=0.4,
+    )
+    assert result == "ok"
+
+
+def test_invoke_with_progress_records_spawn_and_first_event():
+    metrics = TaskMetrics(1, "cli", "test")
+    script = "import time; time.sleep(0.2); print('{}', flush=True)"
+    _invoke_with_progress(
+        _fake_cli(script), stdin_text="", timeout=30, progress_path=None, metrics=metrics,
+    )
+    assert metrics.spawn_ms > 0
+    assert metrics.first_event_ms >= 200
+
+
+def test_invoke_with_progress_failure_reports_stderr(tmp_path):
+    script = "import sys; sys.stderr.write('auth expired'); sys.exit(2)"
+    with pytest.raises(ClaudeError, match="auth expired"):
+        _invoke_with_progress(
+            _fake_cli(script), stdin_text="", timeout=30, progress_path=tmp_path / "p.jsonl",
+        )
+
+
+@patch("agentkit.claude._invoke_with_progress")
+def test_invoke_claude_on_event_enables_streaming(mock_stream):
+    mock_stream.return_value = "ok"
+    callback = MagicMock()
+    assert invoke_claude("test", on_event=callback) == "ok"
+    cmd = mock_stream.call_args[0][0]
+    assert "stream-json" in cmd
+    assert mock_stream.call_args[1]["on_event"] is callback
+
+
+@patch("agentkit.claude._invoke_with_progress")
+def test_invoke_claude_resume_passes_session(mock_stream):
+    mock_stream.return_value = "ok"
+    invoke_claude("test", on_event=MagicMock(), resume="sess-1")
+    cmd = mock_stream.call_args[0][0]
+    assert cmd[cmd.index("--resume") + 1] == "sess-1"
+
+
+@patch("agentkit.claude.invoke_claude")
+def test_stream_claude_yields_events(mock_invoke):
+    def fake_invoke(prompt, *, on_event, **kwargs):
+        on_event({"type": "assistant"})
+        on_event({"type": "result", "result": "done"})
+        return "done"
+
+    mock_invoke.side_effect = fake_invoke
+
+    async def collect():
+        return [event async for event in stream_claude("hi")]
+
+    events = asyncio.run(collect())
+    assert [e["type"] for e in events] == ["assistant", "result"]
+
+
+@patch("agentkit.claude.invoke_claude")
+def test_stream_claude_raises_errors(mock_invoke):
+    mock_invoke.side_effect = ClaudeError("boom")
+
+    async def collect():
+        return [event async for event in stream_claude("hi")]
+
+    with pytest.raises(ClaudeError, match="boom"):
+        asyncio.run(collect())
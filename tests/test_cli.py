@@ -1,9 +1,14 @@
 """Tests for CLI."""
 
-from unittest.mock import patch, MagicMock
+import asyncio
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from telegram.error import NetworkError
 
 from agentkit.agent import TaskResult
-from agentkit.cli import create_parser, _send_pending
+from agentkit.cli import _run_command, _send_pending, create_parser
+from agentkit.mailbox import Mailbox
+from agentkit.outbox import Outbox
 
 
 def test_parser_task_command():
@@ -25,6 +30,20 @@ def test_parser_task_readonly_default():
     assert args.write is False
 
 
+def test_parser_no_cache_flag():
+    parser = create_parser()
+    assert parser.parse_args(["task", "--no-cache", "q"]).no_cache is True
+    assert parser.parse_args(["evaluate"]).no_cache is False
+
+
+def test_parser_stats_command():
+    parser = create_parser()
+    args = parser.parse_args(["stats", "--hours", "6"])
+    assert args.command == "stats"
+    assert args.hours == 6
+    assert args.profile is None
+
+
 def test_parser_evaluate_command():
     parser = create_parser()
     args = parser.parse_args(["evaluate", "--profile", "trading"])
@@ -51,14 +70,38 @@ def test_parser_run_default_profile():
     assert args.profile == "playground"
 
 
-def test_send_pending_with_messages():
+def test_send_pending_with_messages(tmp_path):
     config = MagicMock()
     config.telegram_bot_token = "tok"
     config.telegram_chat_id = "123"
+    config.outbox_path = tmp_path / "outbox.db"
+    config.telegram_document_threshold = 0
     result = TaskResult(response="ok", pending_messages=["hello", "world"])
     with patch("agentkit.cli.TelegramBot") as MockBot:
+        bot = MockBot.return_value
+        bot.chat_id = "123"
+        bot.deliver = AsyncMock(return_value=1)
+        bot.run_sync.side_effect = asyncio.run
+        _send_pending(config, result)
+    texts = [c.args[0] for c in bot.deliver.call_args_list]
+    assert texts == ["hello", "world"]
+    assert len(Outbox(config.outbox_path)) == 0
+
+
+def test_send_pending_keeps_unsent_messages(tmp_path):
+    config = MagicMock()
+    config.telegram_bot_token = "tok"
+    config.telegram_chat_id = "123"
+    config.outbox_path = tmp_path / "outbox.db"
+    config.telegram_document_threshold = 0
+    result = TaskResult(response="ok", pending_messages=["hello"])
+    with patch("agentkit.cli.TelegramBot") as MockBot:
+        bot = MockBot.return_value
+        bot.chat_id = "123"
+        bot.deliver = AsyncMock(side_effect=NetworkError("down"))
+        bot.run_sync.side_effect = asyncio.run
         _send_pending(config, result)
-        assert MockBot.return_value.send_sync.call_count == 2
+    assert len(Outbox(config.outbox_path)) == 1
 
 
 def test_send_pending_no_token():
@@ -76,3 +119,58 @@ def test_send_pending_none_result():
     with patch("agentkit.cli.TelegramBot") as MockBot:
         _send_pending(config, None)
         MockBot.assert_not_called()
+
+
+def test_parser_drain_command():
+    parser = create_parser()
+    args = parser.parse_args(["drain", "--workers", "4", "--processes"])
+    assert args.command == "drain"
+    assert args.workers == 4
+    assert args.processes is True
+
+
+def test_parser_drain_defaults():
+    parser = create_parser()
+    args = parser.parse_args(["drain"])
+    assert args.workers == 1
+    assert args.processes is False
+
+
+def test_parser_archive_command():
+    parser = create_parser()
+    args = parser.parse_args(["archive", "--max-age-days", "7", "--keep-last", "50"])
+    assert args.command == "archive"
+    assert args.max_age_days == 7
+    assert args.keep_last == 50
+
+
+def test_parser_search_command():
+    parser = create_parser()
+    args = parser.parse_args(["search", "deploy key", "-k", "3"])
+    assert args.command == "search"
+    assert args.query == "deploy key"
+    assert args.k == 3
+
+
+def test_parser_compact_memory_command():
+    parser = create_parser()
+    args = parser.parse_args(["compact-memory", "--keep-days", "7", "--period", "month"])
+    assert args.command == "compact-memory"
+    assert args.keep_days == 7
+    assert args.period == "month"
+    assert args.similarity == 0.8
+
+
+@patch("agentkit.agent.invoke_claude")
+def test_evaluate_processes_its_own_task(mock_claude, project_root, monkeypatch):
+    mock_claude.return_value = "evaluation done"
+    (project_root / "profiles" / "test" / "evaluation.md").write_text("Evaluate yourself.")
+    monkeypatch.chdir(project_root)
+    mailbox = Mailbox(project_root / "data" / "agentkit.db")
+    mailbox.enqueue("chat message", source="telegram")
+
+    parser = create_parser()
+    _run_command(parser, parser.parse_args(["evaluate", "--profile", "test"]))
+
+    statuses = {t["source"]: t["status"] for t in mailbox.history()}
+    assert statuses == {"telegram": "pending", "cron-evaluate": "done"}
@@ -0,0 +1,91 @@
+"""Tests for memory compaction."""
+
+from datetime import date, timedelta
+
+from agentkit.compaction import (
+    CompactionPolicy,
+    compact,
+    dedupe_entries,
+    dedupe_long_term,
+    roll_up_daily,
+    shingles,
+)
+from agentkit.memory import Memory
+from agentkit.memory_index import MemoryIndex
+
+
+def _write_day(mem, d, *entries):
+    path = mem.daily_dir / f"{d.isoformat()}.md"
+    path.write_text(f"# {d.isoformat()}\n\n" + "\n\n".join(entries) + "\n")
+    return path
+
+
+def test_shingles():
+    assert shingles("one two") == {"one two"}
+    assert shingles("a b c d") == {"a b c", "b c d"}
+
+
+def test_dedupe_exact_keeps_newest_position():
+    assert dedupe_entries(["x", "y", "X", "z"]) == ["y", "X", "z"]
+
+
+def test_dedupe_near_duplicates():
+    entries = [
+        "The production database is hosted on server alpha in the eu-west region today",
+        "Unrelated fact about the weather",
+        "The production database is hosted on server alpha in the eu-west region now",
+    ]
+    assert dedupe_entries(entries) == entries[1:]
+
+
+def test_dedupe_keeps_distinct_entries():
+    entries = ["deploys happen on tuesday", "backups run nightly at 2am", "logs rotate weekly"]
+    assert dedupe_entries(entries) == entries
+
+
+def test_dedupe_long_term(tmp_path):
+    mem = Memory(tmp_path / "memory")
+    mem.append_long_term("# Long-Term Memory")
+    mem.append_long_term("user prefers short answers")
+    mem.append_long_term("user prefers short answers")
+    assert dedupe_long_term(mem) == 1
+    assert mem.read_long_term() == "# Long-Term Memory\n\nuser prefers short answers"
+    assert dedupe_long_term(mem) == 0
+
+
+def test_roll_up_weekly(tmp_path):
+    mem = Memory(tmp_path / "memory")
+    old = date(2020, 1, 6)  # Monday of ISO week 2
+    _write_day(mem, old, "Task: a\nResult: ok")
+    _write_day(mem, old + timedelta(days=1), "Task: b\nResult: ok", "Task: a\nResult: ok")
+    recent = _write_day(mem, date.today(), "fresh")
+    rolled = roll_up_daily(mem, CompactionPolicy(keep_days=14))
+    assert rolled == {"2020-W02": 2}
+    digest = (mem.digest_dir / "2020-W02.md").read_text()
+    # The only 01-06 entry repeats on 01-07, so just the newer copy survives.
+    assert "## 2020-01-06" not in digest
+    assert "## 2020-01-07" in digest
+    assert digest.count("Task: a") == 1
+    assert sorted(p.name for p in mem.daily_dir.iterdir()) == [recent.name]
+
+
+def test_roll_up_monthly_appends_to_existing_digest(tmp_path):
+    mem = Memory(tmp_path / "memory")
+    _write_day(mem, date(2020, 3, 2), "first")
+    roll_up_daily(mem, CompactionPolicy(period="month"))
+    _write_day(mem, date(2020, 3, 20), "second")
+    roll_up_daily(mem, CompactionPolicy(period="month"))
+    digest = (mem.digest_dir / "2020-03.md").read_text()
+    assert digest.startswith("# Digest 2020-03")
+    assert "first" in digest and "second" in digest
+
+
+def test_compact_keeps_search_index_current(tmp_path):
+    memory_dir = tmp_path / "memory"
+    mem = Memory(memory_dir, index=MemoryIndex(tmp_path / "data" / "idx.db", memory_dir))
+    _write_day(mem, date(2020, 1, 6), "the zebra escaped")
+    mem.search("zebra")
+    report = compact(mem)
+    assert report.daily_files_rolled == 1
+    assert report.digests == ["2020-W02"]
+    assert [h["source"] for h in mem.search("zebra")] == ["digests/2020-W02.md"]
@@ -40,3 +40,27 @@ def test_from_env_custom(monkeypatch):
     monkeypatch.setenv("AGENT_PROFILE", "nanoclaw")
     config = Config.from_env()
     assert config.profile == "nanoclaw"
+
+
+def test_memory_fsync_default(monkeypatch):
+    monkeypatch.delenv("AGENT_MEMORY_FSYNC", raising=False)
+    assert Config(profile="test").memory_fsync == "never"
+
+
+def test_telegram_edit_interval(monkeypatch):
+    monkeypatch.delenv("TELEGRAM_EDIT_INTERVAL", raising=False)
+    assert Config(profile="test").telegram_edit_interval == 3.0
+    monkeypatch.setenv("TELEGRAM_EDIT_INTERVAL", "1.5")
+    assert Config(profile="test").telegram_edit_interval == 1.5
+
+
+def test_telegram_debounce(monkeypatch):
+    monkeypatch.delenv("TELEGRAM_DEBOUNCE", raising=False)
+    assert Config(profile="test").telegram_debounce == 0.0
+    monkeypatch.setenv("TELEGRAM_DEBOUNCE", "1.5")
+    assert Config(profile="test").telegram_debounce == 1.5
+
+
+def test_source_timeouts_parsed(monkeypatch):
+    monkeypatch.setenv("CLAUDE_SOURCE_TIMEOUTS", "telegram=300, cron=3600,")
+    assert Config(profile="test").source_timeouts == {"telegram": 300, "cron": 3600}
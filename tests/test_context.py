@@ -1,7 +1,9 @@
 """Tests for context builder."""
 
+from unittest.mock import patch
+
 from agentkit.config import Config
-from agentkit.context import ContextBuilder
+from agentkit.context import ContextBuilder, PromptBudget
 from agentkit.memory import Memory
 
 
@@ -55,3 +57,79 @@ def test_build_task_prompt(tmp_path):
     assert "analyze this data" in prompt
     assert "MEMORY:" in prompt
     assert "Do NOT ask for confirmation" in prompt
+
+
+def test_system_prompt_reused_until_input_changes(tmp_path):
+    (tmp_path / "profiles" / "test").mkdir(parents=True)
+    identity = tmp_path / "profiles" / "test" / "identity.md"
+    identity.write_text("I am v1.")
+    config = Config(profile="test", project_root=tmp_path)
+    memory = Memory(tmp_path / "memory")
+    ctx = ContextBuilder(config, memory)
+    with patch.object(ctx, "_assemble_system_prompt", wraps=ctx._assemble_system_prompt) as spy:
+        first = ctx.build_system_prompt()
+        assert ctx.build_system_prompt() is first
+        assert spy.call_count == 1
+        identity.write_text("I am version two.")
+        assert "I am version two." in ctx.build_system_prompt()
+        memory.append_long_term("new fact")
+        assert "new fact" in ctx.build_system_prompt()
+        assert spy.call_count == 3
+
+
+def test_context_shares_memory_file_cache(tmp_path):
+    (tmp_path / "profiles" / "test").mkdir(parents=True)
+    config = Config(profile="test", project_root=tmp_path)
+    memory = Memory(tmp_path / "memory")
+    assert ContextBuilder(config, memory).files is memory.files
+
+
+def test_long_term_ranked_against_task_when_over_budget(tmp_path):
+    (tmp_path / "profiles" / "test").mkdir(parents=True)
+    config = Config(profile="test", project_root=tmp_path)
+    memory = Memory(tmp_path / "memory")
+    for i in range(50):
+        memory.append_long_term(f"routine observation number {i} about nothing in particular")
+    memory.append_long_term("the deploy key rotates every friday")
+    ctx = ContextBuilder(config, memory, budget=PromptBudget(long_term=40))
+    prompt = ctx.build_system_prompt("when does the deploy key rotate?")
+    assert "deploy key rotates every friday" in prompt
+    assert "routine observation number 0 " not in prompt
+
+
+def test_long_term_included_whole_within_budget(tmp_path):
+    (tmp_path / "profiles" / "test").mkdir(parents=True)
+    config = Config(profile="test", project_root=tmp_path)
+    memory = Memory(tmp_path / "memory")
+    memory.append_long_term("fact one")
+    memory.append_long_term("fact two")
+    ctx = ContextBuilder(config, memory, budget=PromptBudget(long_term=1000))
+    assert "fact one\n\nfact two" in ctx.build_system_prompt("unrelated")
+
+
+def test_recent_context_keeps_newest_within_budget(tmp_path):
+    (tmp_path / "profiles" / "test").mkdir(parents=True)
+    config = Config(profile="test", project_root=tmp_path)
+    memory = Memory(tmp_path / "memory")
+    memory.append_today("oldest " * 200)
+    memory.append_today("newest entry")
+    ctx = ContextBuilder(config, memory, budget=PromptBudget(recent=50))
+    prompt = ctx.build_system_prompt()
+    assert "newest entry" in prompt
+    assert "earlier context omitted" in prompt
+
+
+def test_stable_prompt_excludes_memory(tmp_path):
+    (tmp_path / "profiles" / "test").mkdir(parents=True)
+    (tmp_path / "profiles" / "test" / "identity.md").write_text("I am stable.")
+    config = Config(profile="test", project_root=tmp_path)
+    memory = Memory(tmp_path / "memory")
+    memory.append_today("did a thing")
+    memory.append_long_term("a fact")
+    ctx = ContextBuilder(config, memory)
+    stable = ctx.build_stable_system_prompt()
+    assert "I am stable." in stable
+    assert "did a thing" not in stable and "a fact" not in stable
+    context = ctx.build_memory_context("task")
+    assert "did a thing" in context and "a fact" in context
+    assert "I am stable." not in context
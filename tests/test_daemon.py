@@ -1,12 +1,14 @@
 """Tests for daemon mode."""
 
-from unittest.mock import patch
+import asyncio
+from unittest.mock import AsyncMock, patch
 
 import pytest
 
 from agentkit.claude import ClaudeError
 from agentkit.config import Config
 from agentkit.daemon import Daemon
+from agentkit.mailbox import RetentionPolicy
 
 
 def _make_daemon(tmp_path):
@@ -57,3 +59,141 @@ def test_daemon_validate_passes(tmp_path, monkeypatch):
     monkeypatch.setenv("TELEGRAM_BOT_TOKEN", "tok")
     daemon = _make_daemon(tmp_path)
     daemon.validate()  # should not raise
+
+
+def test_daemon_idle_after_threshold(tmp_path, monkeypatch):
+    daemon = _make_daemon(tmp_path)
+    assert not daemon.is_idle()
+    monkeypatch.setattr("agentkit.daemon.IDLE_THRESHOLD", 0)
+    assert daemon.is_idle()
+    daemon._in_flight = 1
+    assert not daemon.is_idle()
+
+
+@patch("agentkit.agent.invoke_claude")
+def test_run_maintenance_archives(mock_claude, tmp_path):
+    mock_claude.return_value = "ok"
+    daemon = _make_daemon(tmp_path)
+    daemon.handle_message("one")
+    daemon.handle_message("two")
+    daemon.retention = RetentionPolicy(max_age_days=None, keep_last=1)
+    assert daemon.run_maintenance() == 1
+    assert len(daemon.agent.mailbox.history()) == 1
+
+
+@patch("agentkit.agent.invoke_claude")
+def test_handle_message_async(mock_claude, tmp_path):
+    mock_claude.return_value = "async reply\nTELEGRAM: ping"
+    daemon = _make_daemon(tmp_path)
+    result = asyncio.run(daemon.handle_message_async("hello"))
+    assert result.response == "async reply"
+    assert result.pending_messages == ["ping"]
+    assert daemon.agent.mailbox.history()[0]["status"] == "done"
+
+
+@patch("agentkit.agent.invoke_claude")
+def test_handle_message_async_forwards_events(mock_claude, tmp_path):
+    def fake_invoke(prompt, *, on_event, **kwargs):
+        on_event({"type": "assistant"})
+        return "done"
+
+    mock_claude.side_effect = fake_invoke
+    daemon = _make_daemon(tmp_path)
+    events = []
+    asyncio.run(daemon.handle_message_async("hello", on_event=events.append))
+    assert events == [{"type": "assistant"}]
+
+
+@patch("agentkit.agent.invoke_claude")
+def test_handle_message_async_resumes_chat_session(mock_claude, tmp_path):
+    def fake_invoke(prompt, *, on_event, **kwargs):
+        on_event({"type": "system", "session_id": "sess-42"})
+        return "done"
+
+    mock_claude.side_effect = fake_invoke
+    daemon = _make_daemon(tmp_path)
+    asyncio.run(daemon.handle_message_async("hi", chat_id="42"))
+    asyncio.run(daemon.handle_message_async("again", chat_id="42"))
+    asyncio.run(daemon.handle_message_async("other chat", chat_id="7"))
+    resumes = [call.kwargs["resume"] for call in mock_claude.call_args_list]
+    assert resumes == [None, "sess-42", None]
+
+
+@patch("agentkit.agent.invoke_claude")
+def test_collect_metrics_reports_queue_and_memory(mock_claude, tmp_path):
+    mock_claude.return_value = "done"
+    daemon = _make_daemon(tmp_path)
+    daemon.handle_message("hello")
+    daemon.agent.mailbox.enqueue("waiting", source="telegram")
+    lines = daemon.collect_metrics()
+    assert 'agentkit_tasks{status="done"} 1' in lines
+    assert 'agentkit_tasks{status="pending"} 1' in lines
+    assert "agentkit_tasks_in_flight 0" in lines
+    assert "agentkit_circuit_open 0" in lines
+    assert any(line.startswith('agentkit_memory_file_bytes{file="daily/') for line in lines)
+
+
+@patch("agentkit.agent.invoke_claude")
+def test_handle_message_processes_its_own_task(mock_claude, tmp_path):
+    mock_claude.side_effect = lambda prompt, **kwargs: "reply"
+    daemon = _make_daemon(tmp_path)
+    daemon.agent.mailbox.enqueue("older cron job", source="cron")
+    result = asyncio.run(daemon.handle_message_async("hello", chat_id="1"))
+    assert result.response == "reply"
+    statuses = {t["content"]: t["status"] for t in daemon.agent.mailbox.history()}
+    assert statuses == {"older cron job": "pending", "hello": "done"}
+
+
+@patch("agentkit.agent.invoke_claude")
+def test_dispatcher_routes_replies_to_originating_chat(mock_claude, tmp_path, monkeypatch):
+    monkeypatch.setenv("TELEGRAM_DEBOUNCE", "0")
+    mock_claude.side_effect = lambda prompt, **kwargs: (
+        "echo one" if "## Task\n\nfrom one" in prompt else "echo two"
+    )
+    daemon = _make_daemon(tmp_path)
+    daemon.bot = AsyncMock()
+    daemon.outbox = AsyncMock()
+
+    async def scenario():
+        daemon.dispatcher.submit("1", "from one")
+        daemon.dispatcher.submit("2", "from two")
+        await daemon.dispatcher.join()
+
+    asyncio.run(scenario())
+    replies = [(c.args[1], c.args[0]) for c in daemon.outbox.send.call_args_list]
+    assert sorted(replies) == [("1", "echo one"), ("2", "echo two")]
+
+
+@patch("agentkit.agent.invoke_claude")
+def test_chat_message_replies_through_the_outbox(mock_claude, tmp_path, monkeypatch):
+    monkeypatch.setenv("TELEGRAM_CHAT_ID", "owner")
+    mock_claude.return_value = "done\nTELEGRAM: first note\nTELEGRAM: second note"
+    daemon = _make_daemon(tmp_path)
+    daemon.bot = AsyncMock()
+    daemon.bot.send.return_value = 1
+    daemon.outbox = AsyncMock()
+
+    asyncio.run(daemon.handle_chat_message("42", "hi"))
+
+    # The shared bot only carries the live status; replies go through the outbox.
+    daemon.bot.send.assert_awaited_once()
+    assert [c.args for c in daemon.outbox.send.call_args_list] == [
+        ("done", "42"), ("first note",), ("second note",),
+    ]
+
+
+@patch("agentkit.agent.invoke_claude")
+def test_open_breaker_turns_chat_message_away(mock_claude, tmp_path):
+    daemon = _make_daemon(tmp_path)
+    daemon.bot = AsyncMock()
+    daemon.outbox = AsyncMock()
+    for _ in range(daemon.agent.breaker.threshold):
+        daemon.agent.breaker.record_failure()
+
+    asyncio.run(daemon.handle_chat_message("42", "hi"))
+
+    mock_claude.assert_not_called()
+    assert daemon.agent.mailbox.history() == []  # nothing left pending for others
+    assert daemon.outbox.send.call_args.args[1] == "42"
+    assert daemon.handle_message("hi") is None
+    assert daemon.agent.mailbox.history() == []
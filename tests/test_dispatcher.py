@@ -0,0 +1,143 @@
+"""Tests for the per-chat dispatcher."""
+
+import asyncio
+
+from agentkit.dispatcher import ChatDispatcher
+
+
+def test_messages_within_a_chat_stay_in_order():
+    handled = []
+
+    async def handler(chat_id, text):
+        await asyncio.sleep(0.01 if text == "first" else 0)
+        handled.append((chat_id, text))
+
+    async def scenario():
+        dispatcher = ChatDispatcher(handler, max_concurrency=4)
+        for text in ("first", "second", "third"):
+            dispatcher.submit("a", text)
+        await dispatcher.join()
+
+    asyncio.run(scenario())
+    assert handled == [("a", "first"), ("a", "second"), ("a", "third")]
+
+
+def test_chats_run_concurrently_up_to_the_limit():
+    running, peak = 0, 0
+
+    async def handler(chat_id, text):
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0.02)
+        running -= 1
+
+    async def scenario():
+        dispatcher = ChatDispatcher(handler, max_concurrency=2)
+        for chat in ("a", "b", "c", "d"):
+            dispatcher.submit(chat, "hi")
+        await dispatcher.join()
+
+    asyncio.run(scenario())
+    assert peak == 2
+
+
+def test_slow_chat_does_not_block_others():
+    handled = []
+    release = None
+
+    async def handler(chat_id, text):
+        if chat_id == "slow":
+            await release.wait()
+        handled.append(chat_id)
+
+    async def scenario():
+        nonlocal release
+        release = asyncio.Event()
+        dispatcher = ChatDispatcher(handler, max_concurrency=2)
+        dispatcher.submit("slow", "long task")
+        dispatcher.submit("fast", "quick question")
+        await asyncio.sleep(0.01)
+        assert handled == ["fast"]
+        release.set()
+        await dispatcher.join()
+
+    asyncio.run(scenario())
+    assert handled == ["fast", "slow"]
+
+
+def test_handler_error_does_not_stop_the_chat():
+    handled = []
+
+    async def handler(chat_id, text):
+        if text == "bad":
+            raise RuntimeError("boom")
+        handled.append(text)
+
+    async def scenario():
+        dispatcher = ChatDispatcher(handler)
+        dispatcher.submit("a", "bad")
+        await asyncio.sleep(0)
+        dispatcher.submit("a", "good")
+        await dispatcher.join()
+        assert dispatcher.pending("a") == 0
+
+    asyncio.run(scenario())
+    assert handled == ["good"]
+
+
+def test_burst_is_coalesced_into_one_message():
+    handled = []
+
+    async def handler(chat_id, text):
+        handled.append(text)
+
+    async def scenario():
+        dispatcher = ChatDispatcher(handler, debounce=0.02)
+        for text in ("hey", "can you", "check the logs"):
+            dispatcher.submit("a", text)
+            await asyncio.sleep(0.005)
+        await dispatcher.join()
+
+    asyncio.run(scenario())
+    assert handled == ["hey\n\ncan you\n\ncheck the logs"]
+
+
+def test_messages_during_a_running_task_fold_into_the_next():
+    handled = []
+    release = None
+
+    async def handler(chat_id, text):
+        if not handled:
+            await release.wait()
+        handled.append(text)
+
+    async def scenario():
+        nonlocal release
+        release = asyncio.Event()
+        dispatcher = ChatDispatcher(handler, debounce=0.001)
+        dispatcher.submit("a", "first")
+        await asyncio.sleep(0.01)
+        dispatcher.submit("a", "second")
+        dispatcher.submit("a", "third")
+        release.set()
+        await dispatcher.join()
+
+    asyncio.run(scenario())
+    assert handled == ["first", "second\n\nthird"]
+
+
+def test_debounce_does_not_merge_across_chats():
+    handled = []
+
+    async def handler(chat_id, text):
+        handled.append((chat_id, text))
+
+    async def scenario():
+        dispatcher = ChatDispatcher(handler, debounce=0.01)
+        dispatcher.submit("a", "one")
+        dispatcher.submit("b", "two")
+        await dispatcher.join()
+
+    asyncio.run(scenario())
+    assert sorted(handled) == [("a", "one"), ("b", "two")]
@@ -0,0 +1,58 @@
+"""Tests for the mtime/size-validated file cache."""
+
+import os
+
+from agentkit.filecache import FileCache
+
+
+def test_read_missing_file(tmp_path):
+    cache = FileCache()
+    assert cache.read(tmp_path / "missing.md") == ""
+
+
+def test_read_hits_cache_while_unchanged(tmp_path):
+    path = tmp_path / "a.md"
+    path.write_text("hello")
+    cache = FileCache()
+    assert cache.read(path) == "hello"
+    assert cache.read(path) == "hello"
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_read_detects_modification(tmp_path):
+    path = tmp_path / "a.md"
+    path.write_text("old")
+    cache = FileCache()
+    cache.read(path)
+    path.write_text("new content")
+    assert cache.read(path) == "new content"
+
+
+def test_read_detects_same_size_rewrite_via_mtime(tmp_path):
+    path = tmp_path / "a.md"
+    path.write_text("aaa")
+    cache = FileCache()
+    cache.read(path)
+    path.write_text("bbb")
+    st = os.stat(path)
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000))
+    assert cache.read(path) == "bbb"
+
+
+def test_read_detects_deletion(tmp_path):
+    path = tmp_path / "a.md"
+    path.write_text("gone soon")
+    cache = FileCache()
+    cache.read(path)
+    path.unlink()
+    assert cache.read(path) == ""
+
+
+def test_invalidate(tmp_path):
+    path = tmp_path / "a.md"
+    path.write_text("x")
+    cache = FileCache()
+    cache.read(path)
+    cache.invalidate(path)
+    cache.read(path)
+    assert cache.misses == 2
@@ -0,0 +1,100 @@
+"""Tests for profiling hooks."""
+
+import json
+import threading
+import time
+
+import pytest
+
+from agentkit import hooks
+from agentkit.config import Config
+from agentkit.hooks import SamplingProfiler, SpanExporter, TimerHook, traced
+
+
+@traced("test.inner")
+def _inner(fail=False):
+    if fail:
+        raise ValueError("bad")
+    return "inner"
+
+
+@traced("test.outer")
+def _outer():
+    return _inner()
+
+
+@pytest.fixture
+def installed():
+    added = []
+
+    def add(hook):
+        hooks.install(hook)
+        added.append(hook)
+        return hook
+
+    yield add
+    for hook in added:
+        hooks.uninstall(hook)
+
+
+def test_traced_is_transparent_without_hooks():
+    assert _outer() == "inner"
+    assert _outer.__name__ == "_outer"
+
+
+def test_timer_hook_counts_calls(installed):
+    timers = installed(TimerHook())
+    _outer()
+    _outer()
+    assert timers.stats["test.outer"][0] == 2
+    assert timers.stats["test.inner"][0] == 2
+    assert "test.outer" in timers.report()
+
+
+def test_span_exporter_links_nested_calls(tmp_path, installed):
+    exporter = installed(SpanExporter(tmp_path / "spans.jsonl"))
+    _outer()
+    with pytest.raises(ValueError):
+        _inner(fail=True)
+    exporter.close()
+    inner, outer, failed = (
+        json.loads(line) for line in (tmp_path / "spans.jsonl").read_text().splitlines()
+    )
+    assert (inner["name"], outer["name"]) == ("test.inner", "test.outer")
+    assert inner["traceId"] == outer["traceId"]
+    assert inner["parentSpanId"] == outer["spanId"]
+    assert outer["parentSpanId"] == ""
+    assert int(outer["endTimeUnixNano"]) >= int(inner["endTimeUnixNano"])
+    assert failed["traceId"] != outer["traceId"]
+    assert failed["status"] == {"code": 2, "message": "bad"}
+
+
+def test_sampling_profiler_writes_folded_stacks(tmp_path):
+    def busy():
+        deadline = time.monotonic() + 0.2
+        while time.monotonic() < deadline:
+            pass
+
+    profiler = SamplingProfiler(interval=0.001)
+    profiler.start()
+    worker = threading.Thread(target=busy)
+    worker.start()
+    worker.join()
+    profiler.stop(tmp_path / "profile.folded")
+    text = (tmp_path / "profile.folded").read_text()
+    assert "test_hooks.py:busy" in text
+
+
+def test_session_installs_configured_hooks(tmp_path, monkeypatch):
+    monkeypatch.setenv("AGENT_HOOKS", "timers,spans")
+    config = Config(profile="test", project_root=tmp_path)
+    with hooks.session(config):
+        assert len(hooks._HOOKS) == 2
+        _outer()
+    assert hooks._HOOKS == []
+    assert len(config.spans_path.read_text().splitlines()) == 2
+
+
+def test_session_without_hooks_installs_nothing(tmp_path):
+    with hooks.session(Config(profile="test", project_root=tmp_path)):
+        assert hooks._HOOKS == []
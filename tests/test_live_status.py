@@ -0,0 +1,90 @@
+"""Tests for the live-edited Telegram status message."""
+
+import asyncio
+from unittest.mock import AsyncMock, MagicMock
+
+from agentkit.live_status import LiveStatus, describe_event
+
+
+def _tool_event(name, **tool_input):
+    return {
+        "type": "assistant",
+        "message": {"content": [{"type": "tool_use", "name": name, "input": tool_input}]},
+    }
+
+
+def _fake_bot():
+    bot = MagicMock()
+    bot.send = AsyncMock(return_value=42)
+    bot.edit = AsyncMock()
+    return bot
+
+
+def test_describe_tool_use():
+    assert describe_event(_tool_event("Bash", command="ls -la")) == ["🔧 Bash: ls -la"]
+
+
+def test_describe_text_is_shortened():
+    event = {"type": "assistant", "message": {"content": [{"type": "text", "text": "x" * 500}]}}
+    (line,) = describe_event(event)
+    assert line.startswith("💬 x")
+    assert len(line) <= 120
+
+
+def test_describe_ignores_other_events():
+    assert describe_event({"type": "system", "subtype": "init"}) == []
+    assert describe_event({"type": "result", "result": "done"}) == []
+
+
+def test_live_status_throttles_edits():
+    bot = _fake_bot()
+
+    async def scenario():
+        status = LiveStatus(bot, "chat", min_interval=0.2)
+        await status.start()
+        for i in range(20):
+            status.on_event(_tool_event("Read", file_path=f"f{i}.py"))
+            await asyncio.sleep(0.01)
+        await asyncio.sleep(0.3)
+        await status.finish("✅ Done")
+        return status
+
+    status = asyncio.run(scenario())
+    bot.send.assert_awaited_once_with("⏳ Working…", "chat")
+    # 20 events over ~0.2s collapse into at most a couple of progress edits
+    assert 1 <= status.edits - 1 <= 3
+    last_progress = bot.edit.await_args_list[-2].args[1]
+    assert "f19.py" in last_progress
+    assert bot.edit.await_args_list[-1].args == (42, "✅ Done", "chat")
+
+
+def test_live_status_finish_cancels_pending_edit():
+    bot = _fake_bot()
+
+    async def scenario():
+        status = LiveStatus(bot, "chat", min_interval=10)
+        await status.start()
+        status.on_event(_tool_event("Bash", command="make"))
+        await asyncio.sleep(0.01)
+        await status.finish("❌ Failed")
+
+    asyncio.run(scenario())
+    assert bot.edit.await_count == 1
+    assert bot.edit.await_args.args[1] == "❌ Failed"
+
+
+def test_live_status_waits_for_the_rate_limiter():
+    bot = _fake_bot()
+    acquire = AsyncMock()
+
+    async def scenario():
+        status = LiveStatus(bot, "chat", min_interval=0, acquire=acquire)
+        await status.start()
+        status.on_event(_tool_event("Bash", command="make"))
+        await asyncio.sleep(0.05)
+        await status.finish("✅ Done")
+
+    asyncio.run(scenario())
+    # One slot for the first send and one per edit.
+    assert acquire.await_count == 1 + bot.edit.await_count
+    assert all(c.args == ("chat",) for c in acquire.await_args_list)
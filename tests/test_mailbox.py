@@ -1,8 +1,17 @@
 """Tests for SQLite-backed mailbox."""
 
+import asyncio
+import sqlite3
 import threading
 
-from agentkit.mailbox import Mailbox, TaskStatus
+from agentkit.mailbox import (
+    MIGRATIONS,
+    AsyncMailbox,
+    Mailbox,
+    RetentionPolicy,
+    TaskStatus,
+    lane_for,
+)
 
 
 def test_enqueue_and_dequeue(tmp_path):
@@ -79,3 +88,314 @@ def test_concurrent_dequeue_no_duplicates(tmp_path):
     # Every task dequeued exactly once
     contents = sorted(t["content"] for t in results)
     assert contents == [f"task-{i}" for i in range(10)]
+
+
+def test_concurrent_claim_across_connections(tmp_path):
+    """Separate Mailbox instances (as in process workers) never claim the same row."""
+    db = tmp_path / "data" / "test.db"
+    Mailbox(db).enqueue("only", source="test")
+    mb1, mb2 = Mailbox(db), Mailbox(db)
+    first, second = mb1.dequeue(), mb2.dequeue()
+    assert first["content"] == "only"
+    assert first["status"] == TaskStatus.PROCESSING
+    assert second is None
+
+
+def test_schema_migrated_to_latest(tmp_path):
+    mb = Mailbox(tmp_path / "data" / "test.db")
+    assert mb.schema_version == len(MIGRATIONS)
+    assert mb.conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+
+
+def test_migrates_legacy_database(tmp_path):
+    """A pre-versioning database (user_version 0, table present) keeps its rows."""
+    db = tmp_path / "data" / "test.db"
+    db.parent.mkdir(parents=True)
+    conn = sqlite3.connect(str(db))
+    conn.execute(MIGRATIONS[0][0])
+    conn.execute(
+        "INSERT INTO tasks (content, source, status, created_at, updated_at) "
+        "VALUES ('legacy', 'test', 'pending', 'now', 'now')"
+    )
+    conn.commit()
+    conn.close()
+    mb = Mailbox(db)
+    assert mb.schema_version == len(MIGRATIONS)
+    assert mb.dequeue()["content"] == "legacy"
+
+
+def test_dequeue_uses_pending_index(tmp_path):
+    mb = Mailbox(tmp_path / "data" / "test.db")
+    plan = mb.conn.execute(
+        "EXPLAIN QUERY PLAN SELECT id FROM tasks WHERE status = 'pending' AND lane = 'cli' "
+        "ORDER BY priority DESC, id LIMIT 1"
+    ).fetchall()
+    assert any("idx_tasks_pending_lane" in row[3] for row in plan)
+    assert not any("TEMP B-TREE" in row[3] for row in plan)
+
+
+def test_recent_durations_uses_done_index(tmp_path):
+    mb = Mailbox(tmp_path / "data" / "test.db")
+    plan = mb.conn.execute(
+        "EXPLAIN QUERY PLAN SELECT updated_at FROM tasks "
+        "WHERE source = 'cli' AND status = 'done' AND started_at IS NOT NULL "
+        "ORDER BY id DESC LIMIT 50"
+    ).fetchall()
+    assert any("idx_tasks_done_source" in row[3] for row in plan)
+    assert not any("TEMP B-TREE" in row[3] for row in plan)
+
+
+def test_enqueue_many(tmp_path):
+    mb = Mailbox(tmp_path / "data" / "test.db")
+    ids = mb.enqueue_many(["a", "b", "c"], source="test")
+    assert ids == [1, 2, 3]
+    assert [mb.dequeue()["content"] for _ in ids] == ["a", "b", "c"]
+
+
+def test_complete_many(tmp_path):
+    mb = Mailbox(tmp_path / "data" / "test.db")
+    ids = mb.enqueue_many(["a", "b"], source="test")
+    mb.dequeue()
+    mb.dequeue()
+    mb.complete_many([(ids[0], "r1"), (ids[1], "r2")])
+    history = {t["id"]: t for t in mb.history()}
+    assert history[ids[0]]["status"] == TaskStatus.DONE
+    assert history[ids[1]]["result"] == "r2"
+
+
+def test_recent_durations_measure_claim_to_completion(tmp_path):
+    mb = Mailbox(tmp_path / "data" / "test.db")
+    ids = mb.enqueue_many(["a", "b", "c"], source="cron-evaluate")
+    mb.enqueue("other", source="telegram")
+    for _ in range(3):
+        mb.dequeue()
+    mb.conn.execute(
+        "UPDATE tasks SET started_at = '2026-01-01T00:00:00+00:00' WHERE id IN (?, ?)",
+        ids[:2],
+    )
+    mb.conn.commit()
+    mb.complete(ids[0])
+    mb.fail(ids[1])  # failed runs say nothing about normal duration
+    durations = mb.recent_durations("cron-evaluate")
+    assert len(durations) == 1
+    assert durations[0] > 0
+    assert mb.recent_durations("telegram") == []
+
+
+def _finished_mailbox(tmp_path, n):
+    mb = Mailbox(tmp_path / "data" / "test.db")
+    ids = mb.enqueue_many([f"task-{i}" for i in range(n)], source="test")
+    for _ in ids:
+        mb.dequeue()
+    mb.complete_many([(task_id, f"result-{task_id}") for task_id in ids])
+    return mb
+
+
+def test_archive_keeps_last_n(tmp_path):
+    mb = _finished_mailbox(tmp_path, 5)
+    assert mb.archive(RetentionPolicy(max_age_days=None, keep_last=2)) == 3
+    assert [t["id"] for t in mb.history()] == [5, 4]
+    archived = mb.archived()
+    assert [t["id"] for t in archived] == [3, 2, 1]
+    assert archived[0]["content"] == "task-2"
+    assert archived[0]["result"] == "result-3"
+
+
+def test_archive_by_age(tmp_path):
+    mb = _finished_mailbox(tmp_path, 3)
+    mb.conn.execute("UPDATE tasks SET updated_at = '2000-01-01T00:00:00+00:00' WHERE id = 1")
+    mb.conn.commit()
+    assert mb.archive(RetentionPolicy(max_age_days=30, keep_last=None)) == 1
+    assert [t["id"] for t in mb.history()] == [3, 2]
+
+
+def test_archive_skips_unfinished(tmp_path):
+    mb = Mailbox(tmp_path / "data" / "test.db")
+    mb.enqueue("pending", source="test")
+    mb.enqueue("processing", source="test")
+    mb.dequeue()
+    assert mb.archive(RetentionPolicy(max_age_days=0, keep_last=0)) == 0
+    assert len(mb.history()) == 2
+
+
+def test_vacuum_releases_pages(tmp_path):
+    mb = _finished_mailbox(tmp_path, 200)
+    mb.conn.execute("UPDATE tasks SET result = ?", ("x" * 4000,))
+    mb.conn.commit()
+    mb.archive(RetentionPolicy(max_age_days=None, keep_last=0))
+    mb.vacuum()
+    assert mb.conn.execute("PRAGMA freelist_count").fetchone()[0] == 0
+
+
+def test_lane_for():
+    assert lane_for("telegram") == "telegram"
+    assert lane_for("cli") == "cli"
+    assert lane_for("cron-evaluate") == "cron"
+    assert lane_for("test") == "default"
+
+
+def test_telegram_served_before_queued_cron(tmp_path):
+    mb = Mailbox(tmp_path / "data" / "test.db")
+    mb.enqueue("evaluate", source="cron-evaluate")
+    mb.enqueue("hi", source="telegram")
+    assert mb.dequeue()["content"] == "hi"
+    assert mb.dequeue()["content"] == "evaluate"
+
+
+def test_priority_within_lane(tmp_path):
+    mb = Mailbox(tmp_path / "data" / "test.db")
+    mb.enqueue("low", source="cli")
+    mb.enqueue("high", source="cli", priority=5)
+    assert mb.dequeue()["content"] == "high"
+    assert mb.dequeue()["content"] == "low"
+
+
+def test_weighted_fair_share(tmp_path):
+    mb = Mailbox(tmp_path / "data" / "test.db", lane_weights={"telegram": 3, "cron": 1})
+    mb.enqueue_many([f"t{i}" for i in range(6)], source="telegram")
+    mb.enqueue_many([f"c{i}" for i in range(2)], source="cron")
+    lanes = [mb.dequeue()["lane"] for _ in range(8)]
+    assert lanes[:4].count("cron") == 1
+    assert lanes.count("cron") == 2
+
+
+def test_starving_lane_served_first(tmp_path):
+    mb = Mailbox(tmp_path / "data" / "test.db", starvation_seconds=60)
+    mb.enqueue("old evaluation", source="cron-evaluate")
+    mb.conn.execute("UPDATE tasks SET created_at = '2000-01-01T00:00:00+00:00'")
+    mb.conn.commit()
+    mb.enqueue("hi", source="telegram")
+    assert mb.dequeue()["content"] == "old evaluation"
+
+
+def test_migration_assigns_lanes_to_existing_rows(tmp_path):
+    db = tmp_path / "data" / "test.db"
+    db.parent.mkdir(parents=True)
+    conn = sqlite3.connect(str(db))
+    conn.execute(MIGRATIONS[0][0])
+    conn.execute(
+        "INSERT INTO tasks (content, source, status, created_at, updated_at) "
+        "VALUES ('chat', 'telegram', 'pending', 'now', 'now')"
+    )
+    conn.commit()
+    conn.close()
+    task = Mailbox(db).dequeue()
+    assert task["lane"] == "telegram"
+    assert task["priority"] == 0
+
+
+def test_history_reads_do_not_wait_on_open_write(tmp_path):
+    mb = Mailbox(tmp_path / "data" / "test.db")
+    mb.enqueue("committed", source="test")
+    mb.conn.execute("BEGIN IMMEDIATE")
+    mb.conn.execute(
+        "INSERT INTO tasks (content, source, status, created_at, updated_at) "
+        "VALUES ('uncommitted', 'test', 'pending', 'now', 'now')"
+    )
+    assert [t["content"] for t in mb.history()] == ["committed"]
+    mb.conn.commit()
+    assert len(mb.history()) == 2
+
+
+def test_async_mailbox_roundtrip(tmp_path):
+    amb = AsyncMailbox(Mailbox(tmp_path / "data" / "test.db"))
+
+    async def scenario():
+        task_id = await amb.enqueue("async task", source="telegram")
+        task = await amb.claim()
+        assert task["id"] == task_id
+        assert await amb.claim() is None
+        await amb.complete(task_id, result="ok")
+        return await amb.history()
+
+    history = asyncio.run(scenario())
+    amb.close()
+    assert history[0]["status"] == TaskStatus.DONE
+    assert history[0]["result"] == "ok"
+
+
+def test_async_mailbox_concurrent_claims_unique(tmp_path):
+    amb = AsyncMailbox(Mailbox(tmp_path / "data" / "test.db"))
+
+    async def scenario():
+        await asyncio.gather(*(amb.enqueue(f"t{i}", source="test") for i in range(10)))
+        return await asyncio.gather(*(amb.claim() for _ in range(12)))
+
+    claimed = [t for t in asyncio.run(scenario()) if t is not None]
+    amb.close()
+    assert sorted(t["content"] for t in claimed) == sorted(f"t{i}" for i in range(10))
+
+
+def test_claim_takes_only_the_given_task(tmp_path):
+    mb = Mailbox(tmp_path / "data" / "test.db")
+    first = mb.enqueue("first", source="test")
+    second = mb.enqueue("second", source="test")
+    task = mb.claim(second)
+    assert task["id"] == second
+    assert task["status"] == TaskStatus.PROCESSING
+    assert mb.claim(second) is None
+    assert mb.dequeue()["id"] == first
+
+
+def test_incremental_auto_vacuum_enabled(tmp_path):
+    mb = Mailbox(tmp_path / "data" / "test.db")
+    assert mb.conn.execute("PRAGMA auto_vacuum").fetchone()[0] == 2
+
+
+def test_existing_database_is_converted_by_vacuum_not_on_open(tmp_path):
+    db = _version_three_db(tmp_path)
+    mb = Mailbox(db)
+    assert mb.conn.execute("PRAGMA auto_vacuum").fetchone()[0] == 0
+    mb.enqueue("kept", source="test")
+    mb.vacuum()
+    assert mb.conn.execute("PRAGMA auto_vacuum").fetchone()[0] == 2
+    assert [t["content"] for t in mb.history()] == ["kept"]
+
+
+def _version_three_db(tmp_path):
+    db = tmp_path / "data" / "test.db"
+    db.parent.mkdir(parents=True)
+    conn = sqlite3.connect(str(db))
+    for statements in MIGRATIONS[:3]:
+        for sql in statements:
+            conn.execute(sql)
+    conn.execute("PRAGMA user_version = 3")
+    conn.commit()
+    conn.close()
+    return db
+
+
+def test_failed_migration_leaves_schema_untouched(tmp_path, monkeypatch):
+    db = _version_three_db(tmp_path)
+    broken = list(MIGRATIONS)
+    broken[3] = (*MIGRATIONS[3][:2], "THIS IS NOT SQL")
+    monkeypatch.setattr("agentkit.mailbox.MIGRATIONS", broken)
+    try:
+        Mailbox(db)
+    except sqlite3.OperationalError:
+        pass
+    monkeypatch.undo()
+    # The half-applied migration was rolled back, so a retry can add `priority` again.
+    mb = Mailbox(db)
+    assert mb.schema_version == len(MIGRATIONS)
+
+
+def test_concurrent_openers_migrate_once(tmp_path):
+    db = _version_three_db(tmp_path)
+    start = threading.Barrier(4)
+    errors = []
+
+    def open_mailbox():
+        start.wait()
+        try:
+            Mailbox(db)
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=open_mailbox) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert errors == []
+    assert Mailbox(db).schema_version == len(MIGRATIONS)
@@ -1,8 +1,9 @@
 """Tests for memory system."""
 
 from datetime import date, timedelta
+from unittest.mock import patch
 
-from agentkit.memory import Memory
+from agentkit.memory import FsyncPolicy, Memory
 
 
 def test_read_long_term_empty(tmp_path):
@@ -57,3 +58,51 @@ def test_read_recent_days(tmp_path):
     recent = mem.read_recent(days=3)
     assert "today entry" in recent
     assert "yesterday entry" in recent
+
+
+def test_append_long_term_format(tmp_path):
+    mem = Memory(tmp_path / "memory")
+    mem.append_long_term("first")
+    mem.append_long_term("second")
+    assert mem.read_long_term() == "first\n\nsecond"
+
+
+def test_append_today_format(tmp_path):
+    mem = Memory(tmp_path / "memory")
+    mem.append_today("first")
+    mem.append_today("second")
+    assert mem.read_today() == f"# {date.today().isoformat()}\n\nfirst\n\nsecond\n"
+
+
+def test_write_long_term_is_atomic_rename(tmp_path):
+    mem = Memory(tmp_path / "memory")
+    mem.write_long_term("old")
+    mem.write_long_term("new")
+    assert mem.read_long_term() == "new"
+    assert sorted(p.name for p in (tmp_path / "memory").iterdir()) == ["MEMORY.md", "daily"]
+
+
+def test_fsync_policy_always(tmp_path):
+    mem = Memory(tmp_path / "memory", fsync=FsyncPolicy.ALWAYS)
+    with patch("agentkit.memory.os.fsync") as mock_fsync:
+        mem.append_today("entry")
+        mem.append_long_term("fact")
+        mem.write_long_term("rewrite")
+    assert mock_fsync.call_count == 3
+
+
+def test_fsync_policy_never(tmp_path):
+    mem = Memory(tmp_path / "memory")
+    with patch("agentkit.memory.os.fsync") as mock_fsync:
+        mem.append_today("entry")
+    mock_fsync.assert_not_called()
+
+
+def test_reads_served_from_cache_until_write(tmp_path):
+    mem = Memory(tmp_path / "memory")
+    mem.append_long_term("fact")
+    mem.read_long_term()
+    mem.read_long_term()
+    assert mem.files.hits == 1
+    mem.append_long_term("another")
+    assert mem.read_long_term() == "fact\n\nanother"
@@ -0,0 +1,76 @@
+"""Tests for the FTS5 memory index."""
+
+from agentkit.memory import Memory
+from agentkit.memory_index import MemoryIndex
+
+
+def _memory(tmp_path):
+    memory_dir = tmp_path / "memory"
+    memory_dir.mkdir()
+    index = MemoryIndex(tmp_path / "data" / "memory_index.db", memory_dir)
+    return Memory(memory_dir, index=index)
+
+
+def test_search_finds_appended_entries(tmp_path):
+    mem = _memory(tmp_path)
+    mem.append_long_term("the staging database lives on host db-3")
+    mem.append_today("Task: rotate logs\nResult: rotated nginx logs")
+    hits = mem.search("which host runs the staging database?")
+    assert hits[0]["source"] == "MEMORY.md"
+    assert "db-3" in hits[0]["content"]
+    assert mem.search("nginx")[0]["source"].startswith("daily/")
+
+
+def test_search_respects_k(tmp_path):
+    mem = _memory(tmp_path)
+    for i in range(5):
+        mem.append_long_term(f"deploy note {i}")
+    assert len(mem.search("deploy", k=2)) == 2
+
+
+def test_search_empty_query(tmp_path):
+    mem = _memory(tmp_path)
+    mem.append_long_term("something")
+    assert mem.search("?!") == []
+
+
+def test_appends_do_not_reindex_whole_file(tmp_path):
+    mem = _memory(tmp_path)
+    mem.append_long_term("first")
+    mem.append_long_term("second")
+    assert mem.index.sync(mem.paths()) == 0
+    count = mem.index.conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+    assert count == 2
+
+
+def test_sync_picks_up_external_edits(tmp_path):
+    mem = _memory(tmp_path)
+    mem.append_long_term("stale fact")
+    (tmp_path / "memory" / "MEMORY.md").write_text("# Long-Term Memory\n\nfresh fact about kiwis")
+    hits = mem.search("kiwis")
+    assert [h["content"] for h in hits] == ["fresh fact about kiwis"]
+    assert mem.search("stale") == []
+
+
+def test_write_long_term_reindexes(tmp_path):
+    mem = _memory(tmp_path)
+    mem.append_long_term("old apples")
+    mem.write_long_term("new bananas")
+    assert mem.search("apples") == []
+    assert mem.search("bananas")[0]["content"] == "new bananas"
+
+
+def test_sync_drops_deleted_files(tmp_path):
+    mem = _memory(tmp_path)
+    mem.append_today("ephemeral observation")
+    for path in (tmp_path / "memory" / "daily").glob("*.md"):
+        path.unlink()
+    assert mem.search("ephemeral") == []
+
+
+def test_search_without_index_falls_back_to_bm25(tmp_path):
+    mem = Memory(tmp_path / "memory")
+    mem.append_long_term("cron job runs at midnight")
+    mem.append_long_term("unrelated")
+    hits = mem.search("when does the cron job run")
+    assert [h["content"] for h in hits] == ["cron job runs at midnight"]
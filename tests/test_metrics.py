@@ -0,0 +1,62 @@
+"""Tests for the Prometheus metrics endpoint."""
+
+import urllib.error
+import urllib.request
+
+import pytest
+
+from agentkit.metrics import Counter, Histogram, MetricsServer, Registry, gauge
+
+
+def test_counter_renders_labelled_values():
+    counter = Counter("jobs_total", "Jobs.", ("outcome",))
+    counter.inc(outcome="ok")
+    counter.inc(2, outcome="ok")
+    counter.inc(outcome='bad "quote"')
+    lines = counter.render()
+    assert "# TYPE jobs_total counter" in lines
+    assert 'jobs_total{outcome="ok"} 3.0' in lines
+    assert 'jobs_total{outcome="bad \\"quote\\""} 1.0' in lines
+
+
+def test_histogram_buckets_are_cumulative():
+    histogram = Histogram("latency_seconds", "Latency.", buckets=(1, 5))
+    for value in (0.5, 1, 3, 10):
+        histogram.observe(value)
+    lines = histogram.render()
+    assert 'latency_seconds_bucket{le="1"} 2' in lines
+    assert 'latency_seconds_bucket{le="5"} 3' in lines
+    assert 'latency_seconds_bucket{le="+Inf"} 4' in lines
+    assert "latency_seconds_sum 14.5" in lines
+    assert "latency_seconds_count 4" in lines
+    assert histogram.count() == 4
+
+
+def test_registry_survives_broken_collector():
+    registry = Registry()
+    registry.register(Counter("ok_total", "Ok."))
+
+    def broken():
+        raise RuntimeError("db gone")
+
+    registry.add_collector(broken)
+    registry.add_collector(lambda: gauge("depth", "Depth.", {(): 3}))
+    text = registry.render()
+    assert "ok_total" in text
+    assert "depth 3" in text
+
+
+def test_server_serves_metrics():
+    registry = Registry()
+    registry.register(Counter("hits_total", "Hits.")).inc()
+    server = MetricsServer(0, registry=registry)
+    server.start()
+    try:
+        url = f"http://127.0.0.1:{server.port}"
+        with urllib.request.urlopen(f"{url}/metrics", timeout=5) as response:
+            assert response.headers["Content-Type"].startswith("text/plain")
+            assert "hits_total 1.0" in response.read().decode()
+        with pytest.raises(urllib.error.HTTPError):
+            urllib.request.urlopen(f"{url}/other", timeout=5)
+    finally:
+        server.close()
@@ -0,0 +1,231 @@
+"""Tests for the outbound Telegram send queue."""
+
+import asyncio
+import sqlite3
+import time
+from datetime import timedelta
+from unittest.mock import AsyncMock, MagicMock
+
+from telegram.error import BadRequest, NetworkError, RetryAfter
+
+from agentkit.metrics import TELEGRAM_MESSAGES
+from agentkit.outbox import MIGRATIONS, Outbox, SendLimits, SendQueue, TokenBucket
+
+
+def _make_queue(tmp_path, deliver, **limits):
+    bot = MagicMock(chat_id="owner")
+    bot.deliver = AsyncMock(side_effect=deliver)
+    outbox = Outbox(tmp_path / "data" / "outbox.db")
+    return SendQueue(bot, outbox, SendLimits(**limits)), bot
+
+
+def test_messages_are_delivered_in_order_per_chat(tmp_path):
+    queue, bot = _make_queue(tmp_path, lambda text, chat_id: 1, chat_burst=10)
+
+    async def scenario():
+        for text in ("one", "two", "three"):
+            await queue.send(text, "a")
+        await queue.send("other", "b")
+        await queue.send("note")  # default chat
+        await queue.flush()
+
+    asyncio.run(scenario())
+    sent = [(c.args[1], c.args[0]) for c in bot.deliver.call_args_list]
+    assert [text for chat, text in sent if chat == "a"] == ["one", "two", "three"]
+    assert ("b", "other") in sent and ("owner", "note") in sent
+    assert len(queue.outbox) == 0
+
+
+def test_unsent_messages_survive_a_restart(tmp_path):
+    outbox = Outbox(tmp_path / "outbox.db")
+    outbox.add("a", "still here")
+    outbox.close()
+
+    bot = MagicMock(chat_id="a")
+    bot.deliver = AsyncMock(return_value=1)
+    queue = SendQueue(bot, Outbox(tmp_path / "outbox.db"))
+    assert asyncio.run(queue.flush()) == 1
+    bot.deliver.assert_awaited_once_with("still here", "a")
+
+
+def test_retry_after_defers_by_the_requested_time(tmp_path):
+    queue, bot = _make_queue(tmp_path, RetryAfter(timedelta(seconds=7)))
+    before = TELEGRAM_MESSAGES.value(outcome="retried")
+
+    async def scenario():
+        await queue.send("hi", "a")
+        await queue.flush()
+
+    asyncio.run(scenario())
+    assert bot.deliver.await_count == 1  # not due again until retry_after passes
+    assert queue.outbox.next_due() - time.time() > 6
+    assert TELEGRAM_MESSAGES.value(outcome="retried") == before + 1
+
+
+def test_network_error_is_retried_until_sent(tmp_path):
+    outcomes = [NetworkError("blip"), 1]
+
+    def deliver(text, chat_id):
+        outcome = outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+    queue, bot = _make_queue(tmp_path, deliver)
+    queue.limits.backoff.base_delay = 0.0
+
+    async def scenario():
+        await queue.send("hi", "a")
+        await queue.flush()
+
+    asyncio.run(scenario())
+    assert bot.deliver.await_count == 2
+    assert len(queue.outbox) == 0
+
+
+def test_bad_request_is_dropped(tmp_path):
+    queue, bot = _make_queue(tmp_path, BadRequest("chat not found"))
+    before = TELEGRAM_MESSAGES.value(outcome="dropped")
+
+    async def scenario():
+        await queue.send("hi", "a")
+        await queue.send("next", "a")
+        await queue.flush()
+
+    asyncio.run(scenario())
+    assert bot.deliver.await_count == 2
+    assert len(queue.outbox) == 0
+    assert TELEGRAM_MESSAGES.value(outcome="dropped") == before + 2
+
+
+def test_gives_up_after_max_attempts(tmp_path):
+    queue, bot = _make_queue(tmp_path, NetworkError("down"), max_attempts=2)
+    queue.limits.backoff.base_delay = 0.0
+
+    async def scenario():
+        await queue.send("hi", "a")
+        await queue.flush()
+
+    asyncio.run(scenario())
+    assert bot.deliver.await_count == 2
+    assert len(queue.outbox) == 0
+
+
+def test_claimed_message_is_hidden_from_other_senders(tmp_path):
+    outbox = Outbox(tmp_path / "outbox.db")
+    outbox.add("a", "one")
+    assert [row["text"] for row in outbox.claim_due()] == ["one"]
+    assert outbox.claim_due() == []
+
+
+def test_token_bucket_limits_rate():
+    bucket = TokenBucket(rate=50.0, capacity=2)
+
+    async def take(n):
+        started = time.monotonic()
+        for _ in range(n):
+            await bucket.acquire()
+        return time.monotonic() - started
+
+    # Two come from the burst, the other three wait 1/50 s each.
+    assert asyncio.run(take(5)) >= 0.05
+
+
+def test_direct_sends_share_the_chat_bucket(tmp_path):
+    queue, bot = _make_queue(tmp_path, lambda text, chat_id: 1, chat_rate=20.0, chat_burst=1)
+
+    async def scenario():
+        await queue.acquire("a")  # e.g. a live-status edit takes the only burst token
+        started = time.monotonic()
+        await queue.send("hi", "a")
+        await queue.flush()
+        return time.monotonic() - started
+
+    assert asyncio.run(scenario()) >= 0.04
+    bot.deliver.assert_awaited_once_with("hi", "a")
+
+
+def test_run_delivers_new_messages(tmp_path):
+    queue, bot = _make_queue(tmp_path, lambda text, chat_id: 1)
+
+    async def scenario():
+        sender = asyncio.create_task(queue.run())
+        await asyncio.sleep(0.01)
+        await queue.send("wake up", "a")
+        for _ in range(100):
+            if bot.deliver.await_count:
+                break
+            await asyncio.sleep(0.01)
+        sender.cancel()
+
+    asyncio.run(scenario())
+    bot.deliver.assert_awaited_once_with("wake up", "a")
+
+
+def test_long_reply_is_sent_as_ordered_chunks(tmp_path):
+    queue, bot = _make_queue(tmp_path, lambda text, chat_id: 1, chat_burst=20)
+    reply = "\n\n".join(f"section {i}\n" + "x" * 1500 for i in range(6))
+
+    async def scenario():
+        await queue.send(reply, "a")
+        await queue.flush()
+
+    asyncio.run(scenario())
+    chunks = [c.args[0] for c in bot.deliver.call_args_list]
+    assert len(chunks) > 1
+    assert all(len(chunk) <= 4096 for chunk in chunks)
+    assert "\n\n".join(chunks) == reply
+    assert len(queue.outbox) == 0
+
+
+def test_very_long_reply_is_uploaded_as_document(tmp_path):
+    queue, bot = _make_queue(tmp_path, lambda text, chat_id: 1)
+    bot.deliver_document = AsyncMock(return_value=1)
+    queue.document_threshold = 1000
+
+    async def scenario():
+        await queue.send("x" * 5000, "a")
+        await queue.flush()
+
+    asyncio.run(scenario())
+    bot.deliver_document.assert_awaited_once_with("x" * 5000, "a")
+    bot.deliver.assert_not_awaited()
+
+
+def test_deferred_chunk_holds_back_the_rest_of_its_chat(tmp_path):
+    outcomes = {"two": [RetryAfter(timedelta(seconds=60))]}
+
+    def deliver(text, chat_id):
+        if outcomes.get(text):
+            raise outcomes[text].pop()
+        return 1
+
+    queue, bot = _make_queue(tmp_path, deliver, chat_burst=10)
+
+    async def scenario():
+        await asyncio.to_thread(queue.outbox.add_many, "a", ["one", "two", "three"])
+        await queue.flush()
+
+    asyncio.run(scenario())
+    assert [c.args[0] for c in bot.deliver.call_args_list] == ["one", "two"]
+    remaining = queue.outbox.conn.execute(
+        "SELECT text, attempts FROM outbox ORDER BY id"
+    ).fetchall()
+    assert remaining == [("two", 1), ("three", 0)]
+    assert queue.outbox.claim_due() == []  # "three" waits behind the deferred "two"
+
+
+def test_outbox_migrates_a_version_one_database(tmp_path):
+    path = tmp_path / "outbox.db"
+    conn = sqlite3.connect(path)
+    for sql in MIGRATIONS[0]:
+        conn.execute(sql)
+    conn.execute(
+        "INSERT INTO outbox (chat_id, text, next_attempt, created_at) VALUES ('a', 'old', 0, 0)"
+    )
+    conn.execute("PRAGMA user_version = 1")
+    conn.commit()
+    conn.close()
+
+    rows = Outbox(path).claim_due()
+    assert [(row["text"], row["kind"]) for row in rows] == [("old", "text")]
@@ -0,0 +1,34 @@
+"""Tests for token estimation and BM25 ranking."""
+
+from agentkit.ranking import BM25, estimate_tokens, select_within_budget, split_entries
+
+
+def test_estimate_tokens():
+    assert estimate_tokens("") == 0
+    assert estimate_tokens("abcd") == 1
+    assert estimate_tokens("x" * 400) == 100
+
+
+def test_split_entries():
+    text = "# Header\n\nfirst entry\nsecond line\n\n\n  \nsecond entry\n"
+    assert split_entries(text) == ["# Header", "first entry\nsecond line", "second entry"]
+
+
+def test_bm25_prefers_matching_entry():
+    docs = ["the cat sat on the mat", "stock prices fell sharply", "dogs chase cats"]
+    scores = BM25(docs).scores("why did stock prices fall")
+    assert scores.index(max(scores)) == 1
+
+
+def test_bm25_no_overlap_scores_zero():
+    assert BM25(["alpha beta", "gamma"]).scores("delta") == [0.0, 0.0]
+
+
+def test_select_within_budget_keeps_order():
+    entries = ["a" * 40, "b" * 40, "c" * 40]
+    assert select_within_budget(entries, [0.1, 0.0, 0.9], budget=20) == ["a" * 40, "c" * 40]
+
+
+def test_select_within_budget_ties_favour_newest():
+    entries = ["old" * 10, "mid" * 10, "new" * 10]
+    assert select_within_budget(entries, [0.0, 0.0, 0.0], budget=8) == ["new" * 10]
@@ -0,0 +1,51 @@
+"""Tests for the on-disk response cache."""
+
+from agentkit.response_cache import ResponseCache, cache_key
+
+
+def test_cache_key_depends_on_every_part():
+    base = cache_key("model", "readonly", "system", "task")
+    assert base == cache_key("model", "readonly", "system", "task")
+    assert base != cache_key("model", "readwrite", "system", "task")
+    assert base != cache_key("model", "readonly", "system2", "task")
+    assert base != cache_key("model", "readonly", "system", "task2")
+    assert cache_key("m", "r", "ab", "c") != cache_key("m", "r", "a", "bc")
+
+
+def test_get_put_and_counters(tmp_path):
+    cache = ResponseCache(tmp_path / "cache.db")
+    assert cache.get("k") is None
+    cache.put("k", "answer")
+    assert cache.get("k") == "answer"
+    assert cache.stats() == {"hits": 1, "misses": 1, "entries": 1}
+
+
+def test_entries_persist_across_instances(tmp_path):
+    ResponseCache(tmp_path / "cache.db").put("k", "answer")
+    assert ResponseCache(tmp_path / "cache.db").get("k") == "answer"
+
+
+def test_expired_entry_is_a_miss(tmp_path, monkeypatch):
+    clock = [1000.0]
+    monkeypatch.setattr("agentkit.response_cache.time.time", lambda: clock[0])
+    cache = ResponseCache(tmp_path / "cache.db", ttl=60)
+    cache.put("k", "answer")
+    clock[0] += 61
+    assert cache.get("k") is None
+    assert cache.stats()["entries"] == 0
+
+
+def test_least_recently_used_entry_is_evicted(tmp_path, monkeypatch):
+    clock = [1000.0]
+    monkeypatch.setattr("agentkit.response_cache.time.time", lambda: clock[0])
+    cache = ResponseCache(tmp_path / "cache.db", max_entries=2)
+    for key in ("a", "b"):
+        clock[0] += 1
+        cache.put(key, key.upper())
+    clock[0] += 1
+    cache.get("a")  # "b" is now the least recently used
+    clock[0] += 1
+    cache.put("c", "C")
+    assert cache.get("b") is None
+    assert cache.get("a") == "A"
+    assert cache.get("c") == "C"
@@ -0,0 +1,63 @@
+"""Tests for retry backoff and the circuit breaker."""
+
+from agentkit.retry import CircuitBreaker, RetryPolicy
+
+
+def test_delay_is_jittered_and_capped():
+    policy = RetryPolicy(base_delay=1.0, max_delay=5.0)
+    for attempt in range(6):
+        delays = [policy.delay(attempt) for _ in range(50)]
+        assert all(0 <= d <= min(5.0, 2**attempt) for d in delays)
+    assert len({policy.delay(3) for _ in range(10)}) > 1
+
+
+def test_breaker_opens_at_threshold_and_closes_on_success():
+    breaker = CircuitBreaker(threshold=3, cooldown=60)
+    breaker.record_failure()
+    breaker.record_failure()
+    assert not breaker.is_open()
+    breaker.record_failure()
+    assert breaker.is_open()
+    breaker.record_success()
+    assert not breaker.is_open()
+    assert breaker.failures == 0
+
+
+def test_breaker_allows_trial_after_cooldown(monkeypatch):
+    clock = [100.0]
+    monkeypatch.setattr("agentkit.retry.time.monotonic", lambda: clock[0])
+    breaker = CircuitBreaker(threshold=1, cooldown=60)
+    breaker.record_failure()
+    assert breaker.is_open()
+    clock[0] += 61
+    assert not breaker.is_open()
+    assert breaker.allow()  # the one trial
+    assert breaker.is_open()
+    assert not breaker.allow()  # everyone else waits for its outcome
+    breaker.record_failure()  # the trial failed: open for another cooldown
+    assert breaker.is_open()
+    clock[0] += 61
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.allow() and breaker.allow()
+
+
+def test_breaker_trial_can_be_released_or_go_stale(monkeypatch):
+    clock = [100.0]
+    monkeypatch.setattr("agentkit.retry.time.monotonic", lambda: clock[0])
+    breaker = CircuitBreaker(threshold=1, cooldown=60)
+    breaker.record_failure()
+    clock[0] += 61
+    assert breaker.allow()
+    breaker.release()  # e.g. there was no task to run
+    assert breaker.allow()
+    clock[0] += 61  # the trial's outcome never arrived
+    assert breaker.allow()
+    assert not breaker.allow()
+
+
+def test_breaker_disabled_with_zero_threshold():
+    breaker = CircuitBreaker(threshold=0)
+    for _ in range(10):
+        breaker.record_failure()
+    assert not breaker.is_open()
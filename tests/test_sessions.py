@@ -0,0 +1,42 @@
+"""Tests for the per-chat session store."""
+
+from agentkit.sessions import SessionStore
+
+
+def test_get_returns_stored_session():
+    store = SessionStore()
+    store.put("chat-1", "sess-a")
+    assert store.get("chat-1") == "sess-a"
+    assert store.get("chat-2") is None
+
+
+def test_least_recently_used_chat_is_evicted():
+    store = SessionStore(max_sessions=2)
+    store.put("a", "1")
+    store.put("b", "2")
+    store.get("a")  # "b" is now the least recently used
+    store.put("c", "3")
+    assert store.get("b") is None
+    assert store.get("a") == "1"
+    assert store.get("c") == "3"
+    assert len(store) == 2
+
+
+def test_idle_session_expires(monkeypatch):
+    clock = [1000.0]
+    monkeypatch.setattr("agentkit.sessions.time.monotonic", lambda: clock[0])
+    store = SessionStore(idle_expiry=60)
+    store.put("chat", "sess")
+    clock[0] += 59
+    assert store.get("chat") == "sess"
+    clock[0] += 61
+    assert store.get("chat") is None
+    assert len(store) == 0
+
+
+def test_drop_forgets_session():
+    store = SessionStore()
+    store.put("chat", "sess")
+    store.drop("chat")
+    store.drop("missing")
+    assert store.get("chat") is None
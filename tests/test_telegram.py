@@ -1,8 +1,9 @@
 """Tests for Telegram integration."""
 
-from unittest.mock import AsyncMock, patch
+import asyncio
+from unittest.mock import AsyncMock, MagicMock, patch
 
-from agentkit.telegram_bot import TelegramBot, MAX_MESSAGE_LENGTH
+from agentkit.telegram_bot import MAX_MESSAGE_LENGTH, TelegramBot, split_message
 
 
 def test_telegram_bot_init():
@@ -27,17 +28,109 @@ def test_truncate_long_message():
 
 
 @patch("agentkit.telegram_bot.Bot")
-def test_send_sync_calls_bot_api(MockBot):
+def test_run_sync_calls_bot_api(MockBot):
     mock_instance = MockBot.return_value
     mock_instance.send_message = AsyncMock()
     bot = TelegramBot("fake-token", "123")
-    bot.send_sync("hello sync")
+    bot.run_sync(bot.send("hello sync"))
     mock_instance.send_message.assert_called_once_with(chat_id="123", text="hello sync")
 
 
 @patch("agentkit.telegram_bot.Bot")
-def test_send_sync_swallows_errors(MockBot):
+def test_send_swallows_errors(MockBot):
     mock_instance = MockBot.return_value
     mock_instance.send_message = AsyncMock(side_effect=Exception("net"))
     bot = TelegramBot("fake-token", "123")
-    bot.send_sync("hello")  # must not raise
+    assert asyncio.run(bot.send("hello")) is None
+
+
+@patch("agentkit.telegram_bot.Bot")
+def test_send_returns_message_id(MockBot):
+    mock_instance = MockBot.return_value
+    mock_instance.send_message = AsyncMock(return_value=MagicMock(message_id=7))
+    bot = TelegramBot("fake-token", "123")
+    assert asyncio.run(bot.send("hi")) == 7
+
+
+@patch("agentkit.telegram_bot.Bot")
+def test_edit_calls_bot_api(MockBot):
+    mock_instance = MockBot.return_value
+    mock_instance.edit_message_text = AsyncMock()
+    bot = TelegramBot("fake-token", "123")
+    asyncio.run(bot.edit(7, "updated"))
+    mock_instance.edit_message_text.assert_called_once_with(
+        chat_id="123", message_id=7, text="updated"
+    )
+
+
+@patch("agentkit.telegram_bot.Bot")
+def test_bot_shares_one_pooled_request(MockBot):
+    MockBot.return_value.send_message = AsyncMock()
+    bot = TelegramBot("fake-token", "123", pool_size=3)
+    assert MockBot.call_args.kwargs["request"] is bot._request
+    bot.run_sync(bot.send("first"))
+    bot.run_sync(bot.send("second"))  # reopens the client closed by the first call
+    assert MockBot.call_count == 1
+
+
+@patch("agentkit.telegram_bot.Bot")
+def test_wraps_an_existing_bot(MockBot):
+    existing = MagicMock()
+    existing.send_message = AsyncMock(return_value=MagicMock(message_id=3))
+    bot = TelegramBot("fake-token", "123", bot=existing)
+    MockBot.assert_not_called()
+    assert bot._request is existing.request
+    assert asyncio.run(bot.send("hi")) == 3
+
+
+def test_split_message_short_text_is_one_message():
+    assert split_message("hello") == ["hello"]
+
+
+def test_split_message_breaks_between_paragraphs():
+    paragraphs = [f"paragraph {i} " + "x" * 30 for i in range(10)]
+    chunks = split_message("\n\n".join(paragraphs), limit=100)
+    assert all(len(chunk) <= 100 for chunk in chunks)
+    assert "\n\n".join(chunks) == "\n\n".join(paragraphs)
+
+
+def test_split_message_keeps_code_blocks_fenced():
+    code = "```python\n" + "\n".join(f"print({i})" for i in range(40)) + "\n```"
+    chunks = split_message("Here is the script:\n\n" + code, limit=120)
+    assert all(len(chunk) <= 120 for chunk in chunks)
+    assert len(chunks) > 2
+    for chunk in chunks:
+        if "print(" in chunk:
+            assert chunk.count("```") == 2
+    printed = [line for chunk in chunks for line in chunk.split("\n") if line.startswith("print")]
+    assert printed == [f"print({i})" for i in range(40)]
+
+
+def test_split_message_fences_code_that_follows_a_lead_in_line():
+    code = "\n".join(f"result_{i} = compute({i})  # " + "x" * 40 for i in range(80))
+    text = f"Here is the fix:\n```python\n{code}\n```\nThat should do it."
+    chunks = split_message(text)
+    assert len(chunks) > 1
+    assert all(len(chunk) <= MAX_MESSAGE_LENGTH for chunk in chunks)
+    assert all(chunk.count("```") % 2 == 0 for chunk in chunks)
+    assert chunks[0].startswith("Here is the fix:\n```python\n")
+    assert chunks[-1].endswith("```\nThat should do it.")
+
+
+def test_split_message_cuts_overlong_lines_at_spaces():
+    text = " ".join(["word"] * 100)
+    chunks = split_message(text, limit=50)
+    assert all(len(chunk) <= 50 for chunk in chunks)
+    assert "".join(chunks) == text
+
+
+@patch("agentkit.telegram_bot.Bot")
+def test_deliver_document_uploads_text(MockBot):
+    mock_instance = MockBot.return_value
+    mock_instance.send_document = AsyncMock(return_value=MagicMock(message_id=9))
+    bot = TelegramBot("fake-token", "123")
+    assert asyncio.run(bot.deliver_document("# Report\n\n" + "x" * 500)) == 9
+    kwargs = mock_instance.send_document.call_args.kwargs
+    assert kwargs["chat_id"] == "123"
+    assert kwargs["document"].startswith(b"# Report")
+    assert kwargs["caption"].startswith("# Report") and kwargs["caption"].endswith("…")
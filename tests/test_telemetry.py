@@ -0,0 +1,65 @@
+"""Tests for per-task telemetry."""
+
+import time
+
+import pytest
+
+from agentkit.mailbox import Mailbox
+from agentkit.telemetry import TaskMetrics, summarize
+
+
+def test_phase_accumulates_milliseconds():
+    metrics = TaskMetrics(1, "cli", "test")
+    for _ in range(2):
+        with metrics.phase("prompt"):
+            time.sleep(0.01)
+    assert metrics.prompt_ms >= 20
+
+
+def test_record_result_takes_usage_and_cost():
+    metrics = TaskMetrics(1, "cli", "test")
+    metrics.record_result({
+        "type": "result",
+        "usage": {
+            "input_tokens": 10, "output_tokens": 5,
+            "cache_read_input_tokens": 100, "cache_creation_input_tokens": 7,
+        },
+        "total_cost_usd": 0.25,
+        "num_turns": 3,
+    })
+    assert (metrics.input_tokens, metrics.output_tokens) == (10, 5)
+    assert (metrics.cache_read_tokens, metrics.cache_creation_tokens) == (100, 7)
+    assert metrics.cost_usd == 0.25
+    assert metrics.num_turns == 3
+
+
+def _row(task_id, source, total_ms, created_at, status="done", profile="p"):
+    metrics = TaskMetrics(task_id, source, profile, status=status, created_at=created_at)
+    metrics.total_ms = total_ms
+    metrics.input_tokens = 10
+    return metrics.as_row()
+
+
+def test_summarize_groups_by_profile_and_source():
+    rows = [
+        _row(i, "telegram", float(i), f"2026-01-01T{i % 24:02d}:00:00+00:00")
+        for i in range(1, 101)
+    ]
+    rows.append(_row(200, "cron", 5.0, "2026-01-01T00:00:00+00:00", status="failed"))
+    telegram, cron = sorted(summarize(rows), key=lambda s: s["source"], reverse=True)
+    assert telegram["tasks"] == 100
+    assert (telegram["p50_ms"], telegram["p95_ms"], telegram["p99_ms"]) == (50, 95, 99)
+    assert telegram["input_tokens"] == 1000
+    # 100 tasks started 00:00..23:00; the last (23:00) took 23ms to finish
+    assert telegram["tasks_per_hour"] == pytest.approx(100 / (23 + 0.023 / 3600))
+    assert cron["failed"] == 1
+    assert cron["tasks_per_hour"] == pytest.approx(3600 / 0.005)
+
+
+def test_mailbox_stores_and_filters_metrics(tmp_path):
+    mb = Mailbox(tmp_path / "data" / "test.db")
+    mb.record_metrics(_row(1, "cli", 10.0, "2026-01-01T00:00:00+00:00", profile="a"))
+    mb.record_metrics(_row(2, "cli", 20.0, "2026-01-02T00:00:00+00:00", profile="b"))
+    assert [r["task_id"] for r in mb.metrics()] == [1, 2]
+    assert [r["task_id"] for r in mb.metrics(since="2026-01-01T12:00:00+00:00")] == [2]
+    assert [r["task_id"] for r in mb.metrics(profile="a")] == [1]
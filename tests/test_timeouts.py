@@ -0,0 +1,29 @@
+"""Tests for the per-source timeout policy."""
+
+from agentkit.timeouts import TimeoutPolicy, percentile
+
+
+def test_percentile_nearest_rank():
+    values = list(range(1, 101))
+    assert percentile(values, 50) == 50
+    assert percentile(values, 95) == 95
+    assert percentile(values, 99) == 99
+    assert percentile([7.0], 95) == 7.0
+
+
+def test_default_without_history():
+    policy = TimeoutPolicy(default=1800, min_samples=10)
+    assert policy.timeout_for("telegram", [30.0] * 9) == 1800
+
+
+def test_learned_from_history_within_bounds():
+    policy = TimeoutPolicy(default=1800, headroom=4, floor=300, min_samples=10)
+    assert policy.timeout_for("telegram", [100.0] * 20) == 400
+    assert policy.timeout_for("telegram", [10.0] * 20) == 300
+    assert policy.timeout_for("telegram", [1000.0] * 20) == 1800
+
+
+def test_explicit_source_timeout_wins_by_longest_prefix():
+    policy = TimeoutPolicy(per_source={"cron": 3600, "cron-evaluate": 900})
+    assert policy.timeout_for("cron-evaluate", [10.0] * 50) == 900
+    assert policy.timeout_for("cron-digest", []) == 3600
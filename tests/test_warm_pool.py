@@ -0,0 +1,126 @@
+"""Tests for the warm Claude CLI process pool."""
+
+import sys
+import time
+
+from agentkit.claude import _invoke_with_progress
+from agentkit.warm_pool import WarmPool
+
+ECHO_SCRIPT = (
+    "import json, sys\n"
+    "prompt = sys.stdin.read()\n"
+    "print(json.dumps({'type': 'result', 'result': prompt.upper()}), flush=True)\n"
+)
+CMD = [sys.executable, "-c", ECHO_SCRIPT]
+
+
+def _wait_for_idle(pool, n=1, timeout=10.0):
+    deadline = time.monotonic() + timeout
+    while pool.stats()["idle"] < n:
+        assert time.monotonic() < deadline, "pool never refilled"
+        time.sleep(0.01)
+
+
+def _run(process, text):
+    out, _ = process.communicate(text)
+    return out
+
+
+def test_first_acquire_is_cold_then_warm():
+    pool = WarmPool(size=1)
+    try:
+        process, warm = pool.acquire(CMD)
+        assert warm is False
+        assert "HI" in _run(process, "hi")
+        _wait_for_idle(pool)
+        process, warm = pool.acquire(CMD)
+        assert warm is True
+        assert "AGAIN" in _run(process, "again")
+        assert pool.stats()["warm_hits"] == 1
+        assert pool.stats()["cold_spawns"] == 1
+    finally:
+        pool.close()
+
+
+def test_different_command_discards_idle_processes():
+    pool = WarmPool(size=1)
+    try:
+        _run(pool.acquire(CMD)[0], "")
+        _wait_for_idle(pool)
+        other = [sys.executable, "-c", "print('other')"]
+        process, warm = pool.acquire(other)
+        assert warm is False
+        _run(process, "")
+    finally:
+        pool.close()
+
+
+def test_expired_processes_are_not_reused():
+    pool = WarmPool(size=1, max_age=0)
+    try:
+        _run(pool.acquire(CMD)[0], "")
+        _wait_for_idle(pool)
+        process, warm = pool.acquire(CMD)
+        assert warm is False
+        _run(process, "")
+    finally:
+        pool.close()
+
+
+def test_expired_processes_are_replaced_in_the_background():
+    pool = WarmPool(size=1, max_age=0.3, refresh_interval=0.05)
+    try:
+        _run(pool.acquire(CMD)[0], "")
+        _wait_for_idle(pool)
+        first = pool._idle[0].process
+        deadline = time.monotonic() + 10
+        while first.poll() is None or not pool._idle or pool._idle[0].process is first:
+            assert time.monotonic() < deadline, "expired process was never replaced"
+            time.sleep(0.01)
+        # The replacement is fresh, so the next task gets a warm process.
+        process, warm = pool.acquire(CMD)
+        assert warm is True
+        _run(process, "")
+    finally:
+        pool.close()
+
+
+def test_dead_processes_are_not_reused():
+    pool = WarmPool(size=1)
+    try:
+        _run(pool.acquire(CMD)[0], "")
+        _wait_for_idle(pool)
+        idle = pool._idle[0].process
+        idle.kill()
+        idle.wait()
+        process, warm = pool.acquire(CMD)
+        assert warm is False
+        _run(process, "")
+    finally:
+        pool.close()
+
+
+def test_close_kills_idle_processes():
+    pool = WarmPool(size=2)
+    _run(pool.acquire(CMD)[0], "")
+    _wait_for_idle(pool, n=2)
+    idle = [w.process for w in pool._idle]
+    pool.close()
+    assert all(p.poll() is not None for p in idle)
+    assert pool.stats()["idle"] == 0
+
+
+def test_invoke_with_pool_records_first_event_latency():
+    pool = WarmPool(size=1)
+    try:
+        result = _invoke_with_progress(
+            CMD, stdin_text="ping", timeout=30, progress_path=None, pool=pool
+        )
+        assert result == "PING"
+        _wait_for_idle(pool)
+        _invoke_with_progress(CMD, stdin_text="pong", timeout=30, progress_path=None, pool=pool)
+        stats = pool.stats()
+        assert stats["cold_first_event_ms"] > 0
+        assert stats["warm_first_event_ms"] > 0
+    finally:
+        pool.close()
@@ -0,0 +1,54 @@
+"""Tests for the worker pool."""
+
+from unittest.mock import patch
+
+from agentkit.agent import Agent
+from agentkit.claude import ClaudeError
+from agentkit.config import Config
+from agentkit.mailbox import TaskStatus
+from agentkit.workers import WorkerStats, run_pool
+
+
+def _make_agent(tmp_path):
+    (tmp_path / "profiles" / "test").mkdir(parents=True)
+    (tmp_path / "data").mkdir(exist_ok=True)
+    config = Config(profile="test", project_root=tmp_path)
+    return Agent(config)
+
+
+@patch("agentkit.agent.invoke_claude")
+def test_run_pool_processes_every_task_once(mock_claude, tmp_path):
+    mock_claude.return_value = "done"
+    agent = _make_agent(tmp_path)
+    for i in range(12):
+        agent.mailbox.enqueue(f"task-{i}", source="test")
+    stats = run_pool(agent, workers=3)
+    assert len(stats) == 3
+    assert sum(s.processed for s in stats) == 12
+    assert mock_claude.call_count == 12
+    assert all(t["status"] == TaskStatus.DONE for t in agent.mailbox.history(limit=20))
+
+
+@patch("agentkit.agent.invoke_claude")
+def test_run_pool_counts_failures_and_keeps_draining(mock_claude, tmp_path):
+    mock_claude.side_effect = [ClaudeError("boom", retryable=False), "ok", "ok"]
+    agent = _make_agent(tmp_path)
+    for i in range(3):
+        agent.mailbox.enqueue(f"task-{i}", source="test")
+    stats = run_pool(agent, workers=2)
+    assert sum(s.failed for s in stats) == 1
+    assert sum(s.processed for s in stats) == 2
+
+
+@patch("agentkit.agent.invoke_claude")
+def test_run_all_with_workers(mock_claude, tmp_path):
+    mock_claude.return_value = "done"
+    agent = _make_agent(tmp_path)
+    for i in range(5):
+        agent.mailbox.enqueue(f"task-{i}", source="test")
+    assert agent.run_all(workers=2) == 5
+
+
+def test_worker_stats_throughput():
+    assert WorkerStats(worker_id=0, processed=4, elapsed_seconds=2.0).throughput == 2.0
+    assert WorkerStats(worker_id=0).throughput == 0.0